@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import time
+
+from torch.utils.data import DataLoader
+
+from src.data.datamodule import FinancialDataModule
+
+MODES = ("per-sample", "batched")
+
+
+def make_loader(dm, mode):
+    """per-sample: __getitem__ per index + default collate; batched: the datamodule's loader (one gather per batch)."""
+    if mode == "batched":
+        return dm.train_dataloader()
+    return DataLoader(dm.train_dataset, batch_size=dm.batch_size, shuffle=True,
+                      num_workers=dm.num_workers, persistent_workers=dm.persistent_workers)
+
+
+def time_loader(loader, epochs, warmup=1):
+    """Samples/s of iterating `loader` for `epochs` full passes (after `warmup` untimed ones)."""
+    for _ in range(warmup):
+        for _ in loader:
+            pass
+    samples = 0
+    start = time.perf_counter()
+    for _ in range(epochs):
+        for batch in loader:
+            samples += len(batch["temporal"])
+    seconds = time.perf_counter() - start
+    return {"samples": samples, "seconds": round(seconds, 3), "samples_per_s": round(samples / seconds, 1)}
+
+
+def run_benchmark(csv_path, json_path, modes, batch_size=128, num_workers=0, epochs=3, text_cache=False):
+    dm = FinancialDataModule(csv_path, json_path, window_size=5, batch_size=batch_size, num_workers=num_workers,
+                             persistent_workers=num_workers > 0, text_cache=text_cache)
+    start = time.perf_counter()
+    dm.setup()
+    setup_seconds = time.perf_counter() - start
+    print(f"setup: {setup_seconds:.2f}s ({len(dm.train_dataset)} train samples)")
+
+    results = []
+    for mode in modes:
+        row = {"mode": mode, "batch_size": batch_size, "num_workers": num_workers,
+               **time_loader(make_loader(dm, mode), epochs)}
+        results.append(row)
+        print(f"{mode:10s} batch={batch_size:4d} workers={num_workers}  {row['samples_per_s']:12.1f} samples/s", flush=True)
+    return {"setup_seconds": round(setup_seconds, 3), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure training DataLoader throughput (samples/s) of FinancialDataModule.")
+    parser.add_argument("--csv", type=str, default="market_data.csv", help="Path to market_data.csv.")
+    parser.add_argument("--json", type=str, default="narratives.json", help="Path to narratives.json.")
+    parser.add_argument("--modes", type=str, default=",".join(MODES), help="Comma-separated modes (per-sample, batched).")
+    parser.add_argument("--batch-size", type=int, default=128, help="Batch size (default: 128, as in train.py).")
+    parser.add_argument("--num-workers", type=int, default=0, help="DataLoader workers.")
+    parser.add_argument("--epochs", type=int, default=3, help="Timed passes over the training set.")
+    parser.add_argument("--text-cache", action="store_true", help="Yield cached [CLS] embeddings instead of token ids.")
+    parser.add_argument("--json-out", type=str, default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.csv, args.json,
+        modes=[m.strip() for m in args.modes.split(",") if m.strip()],
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        epochs=args.epochs,
+        text_cache=args.text_cache,
+    )
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"csv": os.path.abspath(args.csv), **report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
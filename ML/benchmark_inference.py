@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+import torch
+
+from src.models.export import export_dir_for, export_pipeline, example_batch, load_pipeline, read_export_manifest
+from src.models.registry import CheckpointRegistry
+from src.serving.backends import BACKENDS, load_backend
+
+DEFAULT_BATCH_SIZES = "1,2,4,8,16,32,64,128,256"
+
+def time_backend(backend, batch, iterations, warmup):
+    """Per-call latencies (seconds) of `backend` on one fixed batch."""
+    with torch.no_grad():
+        for _ in range(warmup):
+            backend(batch)
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend(batch)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+def summarize(latencies, batch_size):
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "samples_per_s": round(batch_size / statistics.fmean(ordered), 1),
+    }
+
+def run_benchmark(checkpoint_path, backends, batch_sizes, graph="numeric", iterations=50, warmup=5, export=True):
+    """Latency and throughput of each backend at each batch size, on the same inputs."""
+    model = load_pipeline(checkpoint_path)
+    out_dir = export_dir_for(checkpoint_path)
+    manifest = read_export_manifest(out_dir)
+    missing = [b for b in backends if b != "eager" and (manifest is None or f"{graph}.{b}" not in manifest["artifacts"])]
+    if missing and export:
+        manifest = export_pipeline(model, out_dir, formats=missing, graphs=(graph,), checkpoint_path=checkpoint_path)
+
+    runners = {}
+    for name in backends:
+        try:
+            runners[name] = load_backend(name, model, out_dir, graph=graph, manifest=manifest or {})
+        except Exception as e:
+            print(f"WARNING: Skipping {name}: {e}")
+
+    results = []
+    for batch_size in batch_sizes:
+        batch = example_batch(model, graph, batch_size=batch_size)
+        for name, runner in runners.items():
+            row = {"backend": name, "batch_size": batch_size, **summarize(time_backend(runner, batch, iterations, warmup), batch_size)}
+            results.append(row)
+            print(f"{name:12s} batch={batch_size:4d}  p50={row['p50_ms']:9.3f} ms  p95={row['p95_ms']:9.3f} ms  {row['samples_per_s']:10.1f} samples/s", flush=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare eager PyTorch, TorchScript and ONNX Runtime latency/throughput on CPU.")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Checkpoint to benchmark (default: best registered checkpoint).")
+    parser.add_argument("--backends", type=str, default=",".join(BACKENDS), help="Comma-separated backends (eager, torchscript, onnx).")
+    parser.add_argument("--batch-sizes", type=str, default=DEFAULT_BATCH_SIZES, help=f"Comma-separated batch sizes (default: {DEFAULT_BATCH_SIZES}).")
+    parser.add_argument("--graph", type=str, default="numeric", choices=["numeric", "full"], help="numeric = cached z_text (serving path), full = with BERT.")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed calls per backend and batch size.")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed calls before timing.")
+    parser.add_argument("--threads", type=int, default=None, help="torch / ONNX Runtime intra-op threads (default: torch default).")
+    parser.add_argument("--no-export", action="store_true", help="Only use existing exports, never export missing ones.")
+    parser.add_argument("--json", type=str, default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    checkpoint_path = args.checkpoint
+    if checkpoint_path is None:
+        registry = CheckpointRegistry()
+        entry = registry.best()
+        if entry is None:
+            parser.error("no registered checkpoint; pass --checkpoint")
+        checkpoint_path = registry.resolve(entry)
+
+    print(f"Benchmarking {args.graph} graph of {checkpoint_path} with {torch.get_num_threads()} threads")
+    results = run_benchmark(
+        checkpoint_path,
+        backends=[b.strip() for b in args.backends.split(",") if b.strip()],
+        batch_sizes=[int(b) for b in args.batch_sizes.split(",") if b.strip()],
+        graph=args.graph,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        export=not args.no_export,
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"checkpoint": os.path.abspath(checkpoint_path), "graph": args.graph,
+                       "threads": torch.get_num_threads(), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
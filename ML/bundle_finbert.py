@@ -0,0 +1,44 @@
+import argparse
+import json
+import os
+from src.models.bundle import BUNDLE_MANIFEST, FINBERT_MODEL_NAME, finbert_bundle_dir
+from src.models.registry import sha256_file
+
+def resolve_revision(revision: str):
+    """Commit sha the hub currently serves for `revision` (a branch, tag or sha)."""
+    from huggingface_hub import HfApi
+    return HfApi().model_info(FINBERT_MODEL_NAME, revision=revision).sha
+
+def build_bundle(out_dir: str, revision: str):
+    """Download FinBERT weights + tokenizer at a pinned revision into a self-contained directory.
+    The revision is resolved to its commit sha first, so a moving branch like main is recorded
+    as the exact commit that was downloaded. Serving and training load from the directory with
+    local_files_only=True after checking the recorded file hashes (see src/models/bundle.py).
+    """
+    from transformers import AutoModel, AutoTokenizer
+
+    commit = resolve_revision(revision)
+    os.makedirs(out_dir, exist_ok=True)
+    AutoTokenizer.from_pretrained(FINBERT_MODEL_NAME, revision=commit).save_pretrained(out_dir)
+    AutoModel.from_pretrained(FINBERT_MODEL_NAME, revision=commit).save_pretrained(out_dir)
+
+    files = {
+        name: sha256_file(os.path.join(out_dir, name))
+        for name in sorted(os.listdir(out_dir))
+        if name != BUNDLE_MANIFEST and os.path.isfile(os.path.join(out_dir, name))
+    }
+    with open(os.path.join(out_dir, BUNDLE_MANIFEST), "w") as f:
+        json.dump({"model_name": FINBERT_MODEL_NAME, "revision": commit, "requested_revision": revision,
+                   "files": files}, f, indent=2)
+    return commit, files
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the offline FinBERT bundle used at startup.")
+    parser.add_argument("--out", type=str, default=finbert_bundle_dir(), help="Bundle directory (default: FINBERT_BUNDLE_DIR or ML/bundles/finbert-pretrain).")
+    parser.add_argument("--revision", type=str, default="main", help="Hub revision to pin; resolved to and recorded as its commit sha.")
+    args = parser.parse_args()
+    commit, files = build_bundle(args.out, args.revision)
+    print(f"Bundle written to {args.out} ({len(files)} files, revision {commit})")
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,10 @@ import os
 import torch
 from src.models.pipeline import FinancialIntelligencePipeline
 from src.data.datamodule import MarketDataset
-import pandas as pd
+from src.data.snapshot import load_market_frame
+from src.data.narrative_store import load_narrative_store
+from src.data.features import FeatureSchema
+from src.data.feature_store import load_feature_store
 
 def load_checkpoint(checkpoint_path: str) -> FinancialIntelligencePipeline:
     """Load the trained Lightning model from a checkpoint file.
@@ -19,19 +22,19 @@ def load_checkpoint(checkpoint_path: str) -> FinancialIntelligencePipeline:
     model.eval()
     return model
 
-def prepare_sample(csv_path: str, json_path: str, ticker: str, window_size: int = 5):
+def prepare_sample(csv_path: str, json_path: str, ticker: str, window_size: int = 5, feature_schema=None):
     """Create a single sample batch for the given ticker.
-    This mirrors the preprocessing logic used during training.
+    Reads the versioned feature store training materialized (built once if missing); pass the
+    checkpoint's ``FeatureSchema`` so features are selected by name and normalized with the
+    training statistics (without one, a schema is fitted on the whole CSV).
     """
-    df = pd.read_csv(csv_path)
-    with open(json_path, "r") as f:
-        narratives = json.load(f)
-    # Filter rows for the ticker
-    ticker_df = df[df["ticker"] == ticker]
-    if ticker_df.empty:
+    store = load_feature_store(csv_path, feature_schema, window_size=window_size)
+    if ticker not in store:
         raise ValueError(f"Ticker '{ticker}' not found in market data.")
-    # Build a temporary MarketDataset to reuse the same preprocessing steps
-    dataset = MarketDataset(ticker_df.reset_index(drop=True), narratives, window_size=window_size)
+    # Samples straight from the store's normalized arrays; text comes from the shared
+    # pre-tokenized store, so no tokenizer is loaded per call
+    token_store = load_narrative_store(json_path)
+    dataset = MarketDataset.from_store(store, [ticker], token_store=token_store)
     # Use the last element of the dataset as the sample
     sample = dataset[len(dataset) - 1]
     # ---- Add batch dimensions expected by the model (no transpose) ----
@@ -55,7 +58,11 @@ def run_inference(
     the raw prediction and reliability score.
     """
     model = load_checkpoint(checkpoint_path)
-    sample = prepare_sample(csv_path, json_path, ticker, window_size=window_size)
+    feature_schema = FeatureSchema.from_dict(model.hparams.get("feature_schema"))
+    if feature_schema is None:
+        # Older checkpoints: the first tabular_dim tabular columns, as the API serves them
+        feature_schema = FeatureSchema.for_legacy_checkpoint(load_market_frame(csv_path), model.hparams.tabular_dim, window_size)
+    sample = prepare_sample(csv_path, json_path, ticker, window_size=window_size, feature_schema=feature_schema)
     with torch.no_grad():
         out = model(sample)
     prediction = out["prediction"].cpu().numpy()
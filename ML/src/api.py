@@ -1,33 +1,139 @@
 import os
 import json
+import hashlib
 import math
 import shutil
-import subprocess
 import asyncio
+import time
 import pandas as pd
-import numpy as np
-import torch
-from fastapi import FastAPI, HTTPException
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Response, Header, Depends
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from pydantic import BaseModel
 from contextlib import asynccontextmanager
-from transformers import AutoTokenizer
 import redis
-import yfinance as yf
-from src.models.pipeline import FinancialIntelligencePipeline
+import redis.asyncio as aioredis
+# torch, Lightning (src.models.pipeline), transformers and yfinance are imported on first use,
+# so the server binds immediately and /ready, /tickers answer while they load
+from src.models.bundle import FINBERT_MODEL_NAME, pretrained_source
+from src.models.registry import CheckpointRegistry
+from src.data.ticker_index import TickerIndex, TickerSlice, TEMPORAL_FEATURES
+from src.data.features import FeatureSchema, ModelInputs
+from src.data.feature_store import load_feature_store
+from src.data.snapshot import load_market_frame
+from src.data.narrative_store import load_narrative_store
+from src.serving.batcher import MicroBatcher
+from src.serving.quotes import QuoteSnapshot
+from src.serving.market_publisher import MarketPublisher
+from src.serving.history_cache import HistoryCache, YahooHistoryProvider, LocalHistoryProvider
+from src.serving.executor import InferenceExecutor, ExecutorSaturated, configure_torch_threads
+from src.serving.text_cache import TextEmbeddingCache
+from src.serving.prediction_cache import PredictionCache
+from src.serving.readiness import ReadinessTracker
+from src.serving.model_holder import ModelHolder, ModelVersion, validate_outputs
+from src.serving.training_jobs import TrainingJobManager, TrainingBusy, RedisTrainingLock, LocalTrainingLock
+from src.serving.metrics import MetricsRegistry
+from src.serving.profiling import ProfilingController, ARTIFACTS as PROFILE_ARTIFACTS
+from src.serving.payloads import (
+    FastJSONResponse, HistoryPayloads, PayloadCache, dumps, etag_matches, history_points, make_etag, with_history
+)
 
 app = FastAPI()
 
 # Global variables to store loaded components
 market_data = None
+ticker_index = None
 narratives_data = {}
-model = None
-tokenizer = None
-is_retraining = False
-expected_tabular_dim = 0
-training_process = None
-expected_tabular_dim = 0
-training_process = None
-expected_tabular_dim = 0
 redis_client = None
+data_version = "none"
+# Chart history per indexed ticker, serialized once per data load
+history_payloads = HistoryPayloads()
+# Serialized /tickers body, rebuilt when the quote snapshot or the data changes
+tickers_payload = PayloadCache()
+
+# Serving model (+ tokenizer and z_text cache), double-buffered so retraining never interrupts /predict
+model_holder = ModelHolder()
+
+# Inference runs on a dedicated pool with a bounded backlog, off the event loop
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+TORCH_NUM_THREADS = os.getenv("TORCH_NUM_THREADS")
+TORCH_INTEROP_THREADS = os.getenv("TORCH_INTEROP_THREADS", "1")
+inference_executor = InferenceExecutor(workers=INFERENCE_WORKERS, max_pending=INFERENCE_MAX_PENDING)
+
+# Forward-pass engine for cached-z_text batches: eager PyTorch, or the checkpoint's exported
+# TorchScript / ONNX Runtime graph (python -m src.models.export; exported on load when missing)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager").lower()
+INFERENCE_EXPORT_ON_LOAD = os.getenv("INFERENCE_EXPORT_ON_LOAD", "1") == "1"
+
+# MODEL_QUANTIZATION=int8 serves a dynamic int8 copy (BERT, TemporalEncoder, head) only if its
+# prediction / reliability_score drift vs fp32 over every indexed ticker is within tolerance
+MODEL_QUANTIZATION = os.getenv("MODEL_QUANTIZATION", "none").lower()
+QUANTIZATION_MAX_PREDICTION_DRIFT = float(os.getenv("QUANTIZATION_MAX_PREDICTION_DRIFT", "0.01"))
+QUANTIZATION_MAX_RELIABILITY_DRIFT = float(os.getenv("QUANTIZATION_MAX_RELIABILITY_DRIFT", "0.05"))
+
+# Re-hash the registered checkpoint before loading it (costs a full file read)
+CHECKPOINT_VERIFY_SHA256 = os.getenv("CHECKPOINT_VERIFY_SHA256", "0") == "1"
+
+# Startup stages timed for /ready; a capability is live as soon as the stages it needs succeeded
+readiness = ReadinessTracker(
+    stages=["import", "data", "weights", "tokenizer", "warmup"],
+    capabilities={
+        "quotes": [],
+        "history": ["data"],
+        "predict": ["import", "data", "weights", "tokenizer", "warmup"],
+    }
+)
+
+# Prometheus metrics for /metrics: request-path timings are recorded inline, component
+# counters (caches, batcher, training, versions) are read from their stats() at scrape time
+metrics = MetricsRegistry(namespace="ml")
+predict_stage_seconds = metrics.histogram(
+    "predict_stage_seconds",
+    "Latency of each /predict stage (data_lookup, yfinance_fallback, text_encoding, inference, model_forward, history_serialization).",
+    ["stage"]
+)
+predict_request_seconds = metrics.histogram("predict_request_seconds", "End-to-end /predict latency, cache hits included.")
+predict_requests = metrics.counter("predict_requests_total", "/predict responses by outcome.", ["outcome"])
+broadcast_loop_seconds = metrics.histogram("broadcast_loop_seconds", "Duration of one market data broadcast cycle (fetch + publish).")
+broadcast_fetch_failures = metrics.counter("broadcast_fetch_failures_total", "Failed quote fetches in the broadcast loop (per ticker or whole batch).", ["scope"])
+broadcast_loop_errors = metrics.counter("broadcast_loop_errors_total", "Broadcast cycles that raised.")
+redis_publish_seconds = metrics.histogram("redis_publish_seconds", "Latency of one pipelined quote publish to Redis.")
+
+# On-demand torch.profiler + cProfile captures of live /predict requests (see /admin/profiling).
+# PROFILING_TOKEN enables the per-request X-Profile-Token header and the admin routes (404 without it).
+profiling = ProfilingController(
+    os.getenv("PROFILING_DIR", os.path.join(os.getcwd(), "cache", "profiles")),
+    token=os.getenv("PROFILING_TOKEN") or None,
+    max_requests=int(os.getenv("PROFILING_MAX_REQUESTS", "20")),
+    max_seconds=float(os.getenv("PROFILING_MAX_SECONDS", "600")),
+    min_interval_seconds=float(os.getenv("PROFILING_MIN_INTERVAL", "1")),
+    max_captures=int(os.getenv("PROFILING_MAX_CAPTURES", "20"))
+)
+
+# Micro-batching for /predict: concurrent requests share one forward pass
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "32"))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+PREDICT_BATCH_MAX_TICKERS = int(os.getenv("PREDICT_BATCH_MAX_TICKERS", "500"))
+
+# z_text per narrative, persisted so restarts skip FinBERT (one cache per model version)
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", os.path.join(os.getcwd(), "cache", "text_embeddings"))
+
+# Fallback price history for tickers outside market_data.csv.
+# HISTORY_PROVIDER=local serves <HISTORY_LOCAL_DIR>/<TICKER>.csv instead of Yahoo (offline/tests).
+HISTORY_CACHE_DIR = os.getenv("HISTORY_CACHE_DIR", os.path.join(os.getcwd(), "cache", "history"))
+if os.getenv("HISTORY_PROVIDER", "yahoo") == "local":
+    history_provider = LocalHistoryProvider(directory=os.getenv("HISTORY_LOCAL_DIR"))
+else:
+    history_provider = YahooHistoryProvider()
+history_cache = HistoryCache(
+    history_provider,
+    HISTORY_CACHE_DIR,
+    intraday_ttl=float(os.getenv("HISTORY_INTRADAY_TTL", "900")),
+    max_entries=int(os.getenv("HISTORY_CACHE_MAX_ENTRIES", "512")),
+    # Enforce strict 15-second timeout to prevent service hang (Increased from 3s)
+    timeout=15.0
+)
 
 # Using 'redis' as hostname because of Docker networking
 try:
@@ -35,13 +141,82 @@ try:
 except Exception as e:
     print(f"WARNING: Redis connection failed: {e}")
 
+# Async client for the broadcaster: per-ticker state hashes + delta-only pub/sub.
+# MARKET_UPDATES_ENCODING=msgpack switches to compact binary messages on their own channel,
+# since the Node subscriber on 'market_updates' expects JSON. The publisher picks the channel
+# from the encoding it actually uses (JSON if msgpack is missing) unless MARKET_UPDATES_CHANNEL is set.
+MARKET_UPDATES_ENCODING = os.getenv("MARKET_UPDATES_ENCODING", "json")
+market_publisher = None
+try:
+    market_publisher = MarketPublisher(
+        aioredis.Redis(host='redis', port=6379, db=0),
+        channel=os.getenv("MARKET_UPDATES_CHANNEL") or None,
+        encoding=MARKET_UPDATES_ENCODING
+    )
+except Exception as e:
+    print(f"WARNING: Async Redis setup failed: {e}")
+
+# /predict result cache: in-process LRU + optional shared Redis tier
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+PREDICTION_CACHE_REDIS = os.getenv("PREDICTION_CACHE_REDIS", "1") == "1"
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    ttl_seconds=PREDICTION_CACHE_TTL,
+    redis_client=redis_client if PREDICTION_CACHE_REDIS else None
+)
+
+# Retraining runs as managed jobs: one per cluster (Redis lock), at lowered priority on an
+# optional CPU subset with capped threads so it can't starve inference.
+# TRAINING_CPUS takes a list like "2,3" or "2-5"; TRAINING_LOCK=local skips Redis.
+def parse_cpu_list(spec):
+    cpus = set()
+    for part in (spec or "").split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.update(range(int(lo), int(hi) + 1))
+        elif part.strip():
+            cpus.add(int(part))
+    return cpus or None
+
+TRAINING_LOCK = os.getenv("TRAINING_LOCK", "redis")
+TRAINING_LOCK_TTL = float(os.getenv("TRAINING_LOCK_TTL", "120"))
+CHECKPOINT_WATCH_SECONDS = float(os.getenv("CHECKPOINT_WATCH_SECONDS", "30"))
+
+def make_training_lock():
+    if TRAINING_LOCK == "redis" and redis_client is not None:
+        return RedisTrainingLock(redis_client, ttl_seconds=TRAINING_LOCK_TTL)
+    return LocalTrainingLock(ttl_seconds=TRAINING_LOCK_TTL)
+
+training_manager = TrainingJobManager(
+    make_training_lock,
+    cwd=os.getcwd(),
+    progress_dir=os.path.join(os.getcwd(), "cache", "training"),
+    nice=int(os.getenv("TRAINING_NICE", "10")),
+    cpus=parse_cpu_list(os.getenv("TRAINING_CPUS")),
+    threads=os.getenv("TRAINING_THREADS", "2"),
+    num_workers=os.getenv("TRAINING_NUM_WORKERS", "2"),
+    # New weights go live through the same validated hot swap
+    on_success=lambda job: swap_in_trained_model(job)
+)
+
 import random
 
+# Live Tickers List (Popular Tech & Finance), tracked by the broadcaster and listed by /tickers
+LIVE_TICKERS = [
+    "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", 
+    "AMD", "INTC", "NFLX", "JPM", "V", "WMT", "DIS"
+]
+
+# Latest quotes fetched by broadcast_market_data, served by /tickers
+quote_snapshot = QuoteSnapshot()
+
 def fetch_market_data_snapshot(tickers_list):
     """Blocking function to fetch market data and apply demo jitter."""
     tickers_str = " ".join(tickers_list)
     updates = {}
     try:
+        import yfinance as yf
         ticker_objects = yf.Tickers(tickers_str)
         
         for ticker in tickers_list:
@@ -64,8 +239,10 @@ def fetch_market_data_snapshot(tickers_list):
                         "news": [] 
                     }
             except Exception:
+                broadcast_fetch_failures.inc(scope="ticker")
                 continue
     except Exception as e:
+        broadcast_fetch_failures.inc(scope="batch")
         print(f"Error in fetching batch: {e}")
         
     return updates
@@ -74,72 +251,37 @@ async def broadcast_market_data():
     """Background task to fetch and broadcast live market data."""
     print("INFO: Starting Market Data Broadcast Service...", flush=True)
     while True:
+        loop_start = time.perf_counter()
         try:
             # 1. Get list of tickers to track
-            BASE_TICKERS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "AMD", "NFLX"]
-            
-            if market_data is not None:
-                cached_tickers = market_data['ticker'].unique().tolist()
-                ALL_TICKERS = list(set(BASE_TICKERS + cached_tickers))
+            if ticker_index is not None:
+                cached_tickers = ticker_index.tickers
+                ALL_TICKERS = list(dict.fromkeys(LIVE_TICKERS + cached_tickers))
             else:
-                ALL_TICKERS = BASE_TICKERS
+                ALL_TICKERS = LIVE_TICKERS
             
             # 2. Fetch Data (Non-Blocking)
             # Run the blocking IO in a separate thread so we don't freeze the API
             updates = await asyncio.to_thread(fetch_market_data_snapshot, ALL_TICKERS)
             
-            if updates and redis_client:
-                # Publish the entire batch as one message to reduce overhead
-                redis_client.publish('market_updates', json.dumps(updates))
-                print(f"DEBUG: Published updates for {len(updates)} tickers", flush=True)
+            # 3. Refresh the shared snapshot that /tickers serves from
+            quote_snapshot.update(updates)
+            
+            if updates and market_publisher is not None:
+                # Only tickers whose price/change moved are published (one pipelined round trip)
+                with redis_publish_seconds.time():
+                    published = await market_publisher.publish(updates)
+                print(f"DEBUG: Published updates for {published}/{len(updates)} tickers", flush=True)
             else:
                 print(f"DEBUG: No updates found or Redis not connected. Updates: {len(updates)}", flush=True)
                 
         except Exception as e:
+            broadcast_loop_errors.inc()
             print(f"ERROR in Broadcast Loop: {e}", flush=True)
+        broadcast_loop_seconds.observe(time.perf_counter() - loop_start)
             
         await asyncio.sleep(5) # Update every 5 seconds
 
-class FeaturePruner:
-    """Intersects incoming feature columns with expected model weights to prevent size mismatches."""
-    @staticmethod
-    def prune(input_tensor, current_dim, expected_dim):
-        if current_dim == expected_dim:
-            return input_tensor
-        
-        if current_dim > expected_dim:
-            print(f"Pruning features: Input {current_dim} -> Expected {expected_dim}")
-            return input_tensor[:, :expected_dim]
-        
-        if current_dim < expected_dim:
-            print(f"Padding features: Input {current_dim} -> Expected {expected_dim}")
-            # Pad the last dimension with zeros
-            # input_tensor is (Batch, Features)
-            padding_size = expected_dim - current_dim
-            # torch.cat with zeros
-            batch_size = input_tensor.shape[0]
-            zeros = torch.zeros((batch_size, padding_size), dtype=input_tensor.dtype, device=input_tensor.device)
-            return torch.cat([input_tensor, zeros], dim=1)
-        
-        return input_tensor
-
-def run_data_alignment_check(csv_cols, model_weights_shape):
-    """Runs on startup to verify data-model alignment."""
-    print("============================================")
-    print("      DATA-MODEL ALIGNMENT CHECK            ")
-    print("============================================")
-    print(f"CSV Columns detected:       {len(csv_cols)}")
-    print(f"Model Tabular Weights:      {model_weights_shape}")
-    
-    if len(csv_cols) != model_weights_shape:
-        print(f"STATUS: MISMATCH DETECTED")
-        print(f"ACTION: FeaturePruner Interceptor ACTIVATED")
-        print(f"DETAIL: Will adjust {len(csv_cols)} features -> {model_weights_shape} expectations.")
-    else:
-        print("STATUS: ALIGNMENT CONFIRMED")
-        print("DETAIL: CSV and Model matches are perfect.")
-    print("============================================")
-
 def load_state_with_strict_fix(model, state_dict):
     """Helper to fix state dict prefix issues and shape mismatches."""
     # 1. Clean prefixes
@@ -162,57 +304,50 @@ def load_state_with_strict_fix(model, state_dict):
         
     model.load_state_dict(filtered_state_dict, strict=False)
 
-def trigger_retraining():
-    """Triggers the training script in a separate process."""
-    global is_retraining, training_process
-    if is_retraining and training_process is not None:
-        if training_process.poll() is None:
-            print("INFO: Training already in progress.")
-            return
-
-    print("INFO: Triggering background retraining...", flush=True)
-    is_retraining = True
-    # Using subprocess to run train.py independently
-    training_process = subprocess.Popen(["python", "train.py"])
-
-async def monitor_training_process():
-    """Polls the training process and reloads model when finished."""
-    global is_retraining, training_process
-    print("INFO: Started training monitor.", flush=True)
+async def start_retraining(reason):
+    """Starts a managed training job unless one is running here or on another replica."""
+    try:
+        return await training_manager.start(reason=reason)
+    except TrainingBusy as e:
+        print(f"INFO: Retraining not started: {e}")
+        return None
+
+async def watch_checkpoint_registry():
+    """Picks up checkpoints registered by any replica's training run (one stat per poll)."""
+    last_mtime = None
     while True:
-        if is_retraining and training_process:
-            ret_code = training_process.poll()
-            if ret_code is not None:
-                print(f"INFO: Training finished with code {ret_code}.")
-                training_process = None
-                if ret_code == 0:
-                    print("INFO: Reloading model after training...")
-                    try:
-                         # Re-run resource loading logic
-                         # Note: In a real app we might want to be more careful about concurrency,
-                         # but here we just need to refresh the global model.
-                         await load_resources() 
-                         is_retraining = False
-                         print("INFO: Model reloaded successfully.")
-                    except Exception as e:
-                        print(f"ERROR: Failed to reload after training: {e}")
-                        # Keep is_retraining=True or False? False so we don't block forever, even if old model
-                        is_retraining = False
-                else:
-                    print("ERROR: Training failed.")
-                    is_retraining = False
-        
-        
-        await asyncio.sleep(5) # Check every 5 seconds
+        try:
+            mtime = os.stat(CheckpointRegistry().path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if training_manager.busy:
+            # This replica's own run is training or being swapped in by its post-training hook
+            pass
+        elif last_mtime is not None and mtime != last_mtime and model_holder.current is not None:
+            print("INFO: Checkpoint registry changed, reloading model...", flush=True)
+            try:
+                await reload_model()
+            except Exception as e:
+                print(f"ERROR: Failed to reload after registry change: {e}")
+        last_mtime = mtime
+        await asyncio.sleep(CHECKPOINT_WATCH_SECONDS)
 
-def load_resources_blocking():
-    """Blocking function to load model and tokenizer."""
-    print("INFO: Loading resources in blocking thread...", flush=True)
-    
+def import_model_stack():
+    """Blocking import of the inference stack (torch, Lightning, transformers) plus torch thread setup."""
+    configure_torch_threads(intra_op_threads=TORCH_NUM_THREADS, interop_threads=TORCH_INTEROP_THREADS)
+    import transformers  # noqa: F401
+    from src.models.pipeline import FinancialIntelligencePipeline  # noqa: F401
+
+def resolve_checkpoint(checkpoint_id=None, newest=False):
+    """
+    Picks the checkpoint to serve and the model dims for it -> (path or "", (temporal, tabular, latent)).
+    Default is the best valid registry entry; `newest` takes the most recently registered valid one,
+    `checkpoint_id` that exact entry (no legacy / CHECKPOINT_PATH fallback).
+    """
     base_dir = os.getcwd()
     checkpoint_dir = os.path.join(base_dir, "mlruns")
-    
-    # Dynamic Checkpoint Finder
+
+    # Legacy finder, only used when no registry exists yet (stats every .ckpt, picks by mtime)
     def find_latest_checkpoint(mlruns_dir):
         best_ckpt = None
         best_time = 0
@@ -229,11 +364,40 @@ def load_resources_blocking():
                         best_ckpt = full_path
         return best_ckpt
 
-    checkpoint_path = find_latest_checkpoint(checkpoint_dir)
-    if checkpoint_path:
-        print(f"INFO: Detected latest checkpoint at {checkpoint_path}")
+    # Model dims default to the legacy serving shape unless the registry records them
+    _temporal_dim = 8
+    _tabular_dim = 10
+    _latent_dim = 128
+
+    # Checkpoint from the registry written by train.py (one file read, no scan)
+    registry = CheckpointRegistry()
+    if checkpoint_id is not None:
+        entry = registry.get(checkpoint_id)
+        if entry is None:
+            print(f"WARNING: Checkpoint {checkpoint_id} is not in the registry.")
+            return "", (_temporal_dim, _tabular_dim, _latent_dim)
     else:
-        # Fallback to env var if dynamic search failed
+        entry = registry.latest() if newest else registry.best()
+    checkpoint_path = ""
+    if entry is not None and (not CHECKPOINT_VERIFY_SHA256 or registry.verify(entry)):
+        checkpoint_path = registry.resolve(entry)
+        _temporal_dim = entry["temporal_dim"] or _temporal_dim
+        _tabular_dim = entry["tabular_dim"] or _tabular_dim
+        _latent_dim = entry["latent_dim"] or _latent_dim
+        print(f"INFO: Using registered checkpoint {entry['id']} (val_loss={entry['val_loss']}) at {checkpoint_path}")
+    elif entry is not None:
+        print(f"WARNING: Registered checkpoint {entry['id']} failed its sha256 check, ignoring it.")
+
+    if checkpoint_id is not None:
+        return checkpoint_path, (_temporal_dim, _tabular_dim, _latent_dim)
+
+    if not checkpoint_path and not os.path.exists(registry.path):
+        checkpoint_path = find_latest_checkpoint(checkpoint_dir) or ""
+        if checkpoint_path:
+            print(f"INFO: Detected latest checkpoint at {checkpoint_path}")
+
+    if not checkpoint_path:
+        # Fallback to env var if the registry / dynamic search found nothing
         env_ckpt = os.getenv("CHECKPOINT_PATH")
         if env_ckpt and os.path.exists(env_ckpt):
              checkpoint_path = env_ckpt
@@ -242,39 +406,211 @@ def load_resources_blocking():
              print("WARNING: No checkpoint found. Model will be uninitialized.")
              checkpoint_path = ""
 
-    # 1. Initialize Model structure
-    _temporal_dim = 8
-    _tabular_dim = 10 
-    
+    return checkpoint_path, (_temporal_dim, _tabular_dim, _latent_dim)
+
+def load_model_blocking(resolved=None):
+    """Blocking function to build the model and load the resolved (default: best) checkpoint into it."""
+    import torch
+    from src.models.pipeline import FinancialIntelligencePipeline
+    print("INFO: Loading model in blocking thread...", flush=True)
+    checkpoint_path, (_temporal_dim, _tabular_dim, _latent_dim) = resolved or resolve_checkpoint()
+
+    # 1. Read the checkpoint first: its hyperparameters carry the feature schema
+    checkpoint = None
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        try:
+            checkpoint = torch.load(checkpoint_path, map_location=torch.device('cpu'))
+        except Exception as e:
+            print(f"WARNING: Failed to load checkpoint: {e}")
+    feature_schema = (checkpoint or {}).get('hyper_parameters', {}).get('feature_schema')
+
+    # 2. Initialize Model structure
     model_instance = FinancialIntelligencePipeline(
         temporal_dim=_temporal_dim,
         tabular_dim=_tabular_dim,
-        latent_dim=128
+        latent_dim=_latent_dim,
+        feature_schema=feature_schema
     )
+    # Serving always runs in eval mode (BatchNorm/Dropout), even without a checkpoint
+    model_instance.eval()
     
-    # 2. Load Checkpoint
+    # 3. Load weights
     _needs_retraining = True
-    if checkpoint_path and os.path.exists(checkpoint_path):
+    if checkpoint is not None:
         try:
-            checkpoint = torch.load(checkpoint_path, map_location=torch.device('cpu'))
             load_state_with_strict_fix(model_instance, checkpoint['state_dict'])
             model_instance.eval()
             print(f"Successfully loaded model from {checkpoint_path}")
             _needs_retraining = False
         except Exception as e:
             print(f"WARNING: Failed to load checkpoint: {e}")
-    
-    # 3. Load Tokenizer
+
+    return model_instance, _needs_retraining, checkpoint_path
+
+def load_tokenizer_blocking():
+    """Blocking function to load the FinBERT tokenizer (local bundle when present)."""
+    from transformers import AutoTokenizer
     print("INFO: Loading Tokenizer...", flush=True)
-    tokenizer_instance = None
+    source, load_kwargs = pretrained_source(FINBERT_MODEL_NAME)
+    return AutoTokenizer.from_pretrained(source, **load_kwargs)
+
+def load_token_store_blocking(tokenizer_instance):
+    """Pre-tokenized narratives (shared with training/inference); None without narratives.json."""
+    narratives_json_path = os.path.join(os.getcwd(), "narratives.json")
+    if tokenizer_instance is None or not os.path.exists(narratives_json_path):
+        return None
     try:
-        tokenizer_instance = AutoTokenizer.from_pretrained('yiyanghkust/finbert-pretrain')
+        return load_narrative_store(narratives_json_path, tokenizer=tokenizer_instance)
     except Exception as e:
-         print(f"WARNING: Tokenizer download failed: {e}. using fallback.", flush=True)
-         # In a real scenario, we might want to fail hard, or use a local fallback
-         # raise e
-    
-    return model_instance, tokenizer_instance, _needs_retraining
+        print(f"WARNING: Narrative token store unavailable, tokenizing on demand: {e}")
+        return None
+
+def canned_inputs(version, count=4):
+    """Validation batch: model inputs of the first few indexed tickers (zeros without data)."""
+    import torch
+    if version.inputs is not None and len(version.inputs):
+        tickers = ticker_index.tickers[:count]
+        temporal, tabular = version.inputs.rows(tickers)
+        z_texts = [version.text_cache.get(get_narrative_text(t)) for t in tickers]
+        if all(z is not None for z in z_texts):
+            z_text = torch.cat(z_texts, dim=0)
+        else:
+            z_text = torch.zeros((len(tickers), version.latent_dim))
+        return {"temporal": temporal, "tabular": tabular, "z_text": z_text}
+    return {
+        "temporal": torch.zeros((1, WINDOW_SIZE, len(TEMPORAL_FEATURES))),
+        "tabular": torch.zeros((1, version.tabular_dim)),
+        "z_text": torch.zeros((1, version.latent_dim))
+    }
+
+def build_model_inputs_blocking(model_instance, tabular_dim):
+    """
+    The model's feature schema and every indexed ticker's normalized inputs for it, read from the
+    feature store of (market data, schema) that training materialized (built here if missing).
+    Checkpoints without a schema get one from the current data (first `tabular_dim` tabular columns by name).
+    """
+    schema = FeatureSchema.from_dict(model_instance.hparams.get("feature_schema"))
+    if schema is None and market_data is not None:
+        schema = FeatureSchema.for_legacy_checkpoint(market_data, tabular_dim, WINDOW_SIZE)
+        print(f"WARNING: Checkpoint has no feature schema; using the first {tabular_dim} tabular columns and data stats.")
+    if schema is None or ticker_index is None:
+        return schema, None
+    store = load_feature_store(os.path.join(os.getcwd(), "market_data.csv"), schema)
+    inputs = ModelInputs.from_store(store)
+    print(f"INFO: Model inputs ready ({len(inputs)} tickers, {inputs.stats()['bytes']} bytes, feature store {store.version}).", flush=True)
+    return schema, inputs
+
+def load_inference_backend_blocking(version, checkpoint_path):
+    """
+    The INFERENCE_BACKEND runner for a checkpoint's numeric graph, exported into the checkpoint's
+    export directory when missing. Any failure (no onnxruntime, parity failure) falls back to
+    eager PyTorch with a warning.
+    """
+    from src.models.export import export_dir_for, export_pipeline, read_export_manifest
+    from src.serving.backends import EagerBackend, load_backend
+    model_instance = version.model
+    if INFERENCE_BACKEND == "eager" or not checkpoint_path:
+        return EagerBackend(model_instance)
+    if version.precision != "fp32":
+        print(f"WARNING: Inference backend {INFERENCE_BACKEND} exports fp32 graphs only; serving the {version.precision} model eagerly.")
+        return EagerBackend(model_instance)
+    try:
+        out_dir = export_dir_for(checkpoint_path)
+        manifest = read_export_manifest(out_dir)
+        if INFERENCE_EXPORT_ON_LOAD and (manifest is None or f"numeric.{INFERENCE_BACKEND}" not in manifest["artifacts"]):
+            print(f"INFO: Exporting numeric graph to {INFERENCE_BACKEND} in {out_dir}...", flush=True)
+            manifest = export_pipeline(model_instance, out_dir, formats=(INFERENCE_BACKEND,), graphs=("numeric",),
+                                       checkpoint_path=checkpoint_path)
+        backend = load_backend(INFERENCE_BACKEND, model_instance, out_dir, graph="numeric", manifest=manifest or {})
+        print(f"INFO: Inference backend {backend.name} ({backend.path}).", flush=True)
+        return backend
+    except Exception as e:
+        print(f"WARNING: Inference backend {INFERENCE_BACKEND} unavailable, serving eager PyTorch: {e}")
+        return EagerBackend(model_instance)
+
+def quantize_model_version_blocking(version):
+    """
+    Swaps the version's model for its int8 copy if the drift gate passes: prediction and
+    reliability_score of both models over every indexed ticker (full pipeline, BERT included)
+    must stay within QUANTIZATION_MAX_*_DRIFT. Otherwise the fp32 model is kept.
+    """
+    from src.models.quantize import compare_models, drift_problems, evaluation_batch, quantize_pipeline
+    if version.inputs is None or version.tokenizer is None:
+        version.quantization = {"mode": "int8", "accepted": False, "problems": ["no data or tokenizer to evaluate drift"]}
+    else:
+        start = time.perf_counter()
+        quantized = quantize_pipeline(version.model)
+        batch, tickers = evaluation_batch(
+            version.inputs, get_narrative_text,
+            lambda texts: version.text_cache.tokenize(version.tokenizer, texts)
+        )
+        report = compare_models(version.model, quantized, batch, tickers)
+        problems = drift_problems(report, QUANTIZATION_MAX_PREDICTION_DRIFT, QUANTIZATION_MAX_RELIABILITY_DRIFT)
+        version.quantization = {
+            "mode": "int8", "accepted": not problems, "problems": problems,
+            "seconds": round(time.perf_counter() - start, 2), **report
+        }
+        if not problems:
+            version.model = quantized
+            version.precision = "int8"
+    if version.quantization["accepted"]:
+        print(f"INFO: Serving int8 model (max prediction drift {version.quantization['prediction']['max_abs_diff']:.3g} "
+              f"over {version.quantization['tickers']} tickers).", flush=True)
+    else:
+        print(f"WARNING: Refusing int8 model, serving fp32: {version.quantization['problems']}")
+
+def prepare_model_version_blocking(model_instance, tokenizer_instance, checkpoint_path):
+    """
+    Builds a ModelVersion off the serving path: normalized inputs for every indexed ticker, the
+    int8 drift gate (MODEL_QUANTIZATION), z_text for every narrative and the inference backend,
+    then a forward pass on canned inputs that doubles as warmup and as validation (finite
+    outputs required).
+    """
+    version = ModelVersion(
+        model_instance,
+        tokenizer_instance,
+        checkpoint_identity(checkpoint_path),
+        checkpoint_path,
+        TextEmbeddingCache(TEXT_CACHE_DIR, token_store=load_token_store_blocking(tokenizer_instance))
+    )
+    version.schema, version.inputs = build_model_inputs_blocking(model_instance, version.tabular_dim)
+    if MODEL_QUANTIZATION == "int8":
+        quantize_model_version_blocking(version)
+    version.text_cache.bind(version.model, version.model_key)
+    if tokenizer_instance is not None:
+        transcripts = [n.get("transcript", "") for n in narratives_data.values()]
+        computed = version.text_cache.compute(version.model, tokenizer_instance, transcripts)
+        print(f"INFO: Text embedding cache ready ({len(version.text_cache)} entries, {computed} computed).", flush=True)
+    version.backend = load_inference_backend_blocking(version, checkpoint_path)
+
+    start = time.perf_counter()
+    try:
+        problems = validate_outputs(run_model_batch(canned_inputs(version), version))
+    except Exception as e:
+        problems = [f"forward pass failed: {e}"]
+    version.validation = {
+        "ok": not problems,
+        "problems": problems,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    return version
+
+def checkpoint_identity(checkpoint_path):
+    """Stable id for the loaded weights (path + mtime + size); used to scope caches."""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return "uninitialized"
+    stat = os.stat(checkpoint_path)
+    raw = f"{os.path.abspath(checkpoint_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+def compute_data_version(paths):
+    """Short id of the data files' current state (path, mtime, size); changes whenever they are rewritten."""
+    h = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            h.update(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size};".encode("utf-8"))
+    return h.hexdigest()[:12]
 
 def load_data_blocking():
     """Fast data loader."""
@@ -283,21 +619,17 @@ def load_data_blocking():
     narratives_json_path = os.path.join(base_dir, "narratives.json")
     
     _market_data = None
+    _ticker_index = None
+    _data_version = compute_data_version([market_csv_path, narratives_json_path])
     if os.path.exists(market_csv_path):
-        df = pd.read_csv(market_csv_path)
-        df = df.ffill().bfill().fillna(0)
-        # Robust Cleaning
-        if 'ticker' in df.columns:
-            df['ticker'] = df['ticker'].astype(str).str.strip().str.upper()
-        if 'date' in df.columns:
-            df['date'] = df['date'].astype(str)
-            
+        # mmap'd columnar snapshot (rebuilt from the CSV only when the CSV changes)
+        df = load_market_frame(market_csv_path)
         print(f"Loaded market data from {market_csv_path}. Counts: {len(df)}")
-        # Debug cols
-        if not df.empty:
-             df.columns = [c.lower() for c in df.columns]
-             
+
         _market_data = df
+        # Build the per-ticker lookup once so request handlers never scan the frame
+        _ticker_index = TickerIndex.from_frame(df)
+        print(f"Indexed {len(_ticker_index)} tickers.")
     else:
         print("WARNING: market_data.csv missing")
 
@@ -306,51 +638,301 @@ def load_data_blocking():
         with open(narratives_json_path, "r") as f:
              narratives_list = json.load(f)
              _narratives_data = {item["ticker"]: item for item in narratives_list}
+
+    _history_payloads = HistoryPayloads(_data_version)
+    if _ticker_index is not None:
+        _history_payloads = HistoryPayloads.build(_ticker_index, _data_version)
+        print(f"Serialized chart history for {len(_ticker_index)} tickers ({_history_payloads.stats()['bytes']} bytes).")
              
-    return _market_data, _narratives_data
+    return _market_data, _narratives_data, _ticker_index, _data_version, _history_payloads
 
 
-async def load_resources():
-    """Loads resources in stages."""
-    global market_data, narratives_data, model, tokenizer, is_retraining
-    
+def run_model_batch(batch, version):
+    """Blocking forward pass of `version`'s model over a stacked batch (called by the MicroBatcher)."""
+    import torch
+    runner = version.backend or version.model
+    with predict_stage_seconds.time(stage="model_forward"), torch.no_grad():
+        return runner(batch)
+
+inference_batcher = MicroBatcher(
+    run_model_batch,
+    max_batch_size=PREDICT_MAX_BATCH_SIZE,
+    max_wait_ms=PREDICT_MAX_WAIT_MS,
+    executor=inference_executor
+)
+
+async def run_stage(name, fn, *args):
+    """Runs a blocking loader in a worker thread, timed as readiness stage `name`."""
+    with readiness.stage(name):
+        return await asyncio.to_thread(fn, *args)
+
+async def load_data_stage():
+    global market_data, ticker_index, narratives_data, data_version, history_payloads
     print("INFO: Starting background data loading...", flush=True)
     try:
-        data_res = await asyncio.to_thread(load_data_blocking)
+        data_res = await run_stage("data", load_data_blocking)
         market_data = data_res[0]
         narratives_data = data_res[1]
+        ticker_index = data_res[2]
+        data_version = data_res[3]
+        history_payloads = data_res[4]
+        prediction_cache.invalidate()
         print("INFO: Data loading COMPLETE.", flush=True)
     except Exception as e:
         print(f"CRITICAL: Data loading failed: {e}")
 
+async def load_tokenizer_stage():
+    try:
+        return await run_stage("tokenizer", load_tokenizer_blocking)
+    except Exception as e:
+        print(f"WARNING: Tokenizer load failed: {e}. using fallback.", flush=True)
+        # In a real scenario, we might want to fail hard, or use a local fallback
+        return None
+
+async def load_model_stages(data_task):
     print("INFO: Starting background AI loading...", flush=True)
     try:
-        ai_res = await asyncio.to_thread(load_resources_blocking)
-        model = ai_res[0]
-        tokenizer = ai_res[1]
-        needs_retraining = ai_res[2]
+        await run_stage("import", import_model_stack)
+        # Weights and tokenizer are independent; load both at once
+        (model_instance, needs_retraining, checkpoint_path), tokenizer_instance = await asyncio.gather(
+            run_stage("weights", load_model_blocking),
+            load_tokenizer_stage()
+        )
         print("INFO: AI loading COMPLETE.", flush=True)
-        
+
+        # Warmup needs the narratives, so wait for the data stage here
+        await data_task
+        with readiness.stage("warmup"):
+            version = await asyncio.to_thread(
+                prepare_model_version_blocking, model_instance, tokenizer_instance, checkpoint_path
+            )
+        if not version.validation["ok"]:
+            # Nothing else to serve at startup, so it goes live anyway
+            print(f"WARNING: Model failed validation: {version.validation['problems']}")
+        model_holder.swap(version)
+        prediction_cache.invalidate()
+
         if needs_retraining:
-            trigger_retraining()
+            await start_retraining("no valid checkpoint")
     except Exception as e:
         print(f"CRITICAL: AI loading failed: {e}")
 
+async def reload_model(checkpoint_id=None, wait=False):
+    """
+    Loads a checkpoint next to the serving model, warms and validates it in a worker thread,
+    then swaps it in. The checkpoint is registry entry `checkpoint_id`, else the most recently
+    registered valid one; a newer model with a worse val loss still goes live (roll back via
+    /model/rollback). While another reload runs, returns at once unless `wait` is set, in which
+    case it runs right after it. Returns {"swapped", "serving", "checkpoint", "reason"}, where
+    `serving` says whether that checkpoint is live afterwards.
+    """
+    def result(swapped, reason, checkpoint=None, serving=None):
+        return {"swapped": swapped, "serving": swapped if serving is None else serving,
+                "checkpoint": checkpoint, "reason": reason}
+
+    if model_holder.reload_lock.locked() and not wait:
+        print("INFO: Model reload already in progress.")
+        return result(False, "reload already in progress")
+    async with model_holder.reload_lock:
+        return await _reload_model_locked(checkpoint_id, result)
+
+async def _reload_model_locked(checkpoint_id, result):
+    model_holder.loading = True
+    try:
+        current = model_holder.current
+        resolved = await asyncio.to_thread(resolve_checkpoint, checkpoint_id, True)
+        checkpoint_path = resolved[0]
+        if not checkpoint_path:
+            reason = f"checkpoint {checkpoint_id} not found" if checkpoint_id else "no trained checkpoint found"
+            model_holder.reject(reason)
+            return result(False, reason)
+        if current is not None and checkpoint_identity(checkpoint_path) == current.checkpoint_id:
+            print("INFO: Checkpoint is already serving.")
+            return result(False, "already serving", checkpoint_path, serving=True)
+        model_instance, _, checkpoint_path = await asyncio.to_thread(load_model_blocking, resolved)
+
+        # Same FinBERT tokenizer for every checkpoint
+        tokenizer_instance = current.tokenizer if current is not None and current.tokenizer is not None else None
+        if tokenizer_instance is None:
+            tokenizer_instance = await asyncio.to_thread(load_tokenizer_blocking)
+
+        version = await asyncio.to_thread(
+            prepare_model_version_blocking, model_instance, tokenizer_instance, checkpoint_path
+        )
+        if not version.validation["ok"]:
+            reason = f"validation failed: {version.validation['problems']}"
+            model_holder.reject(reason)
+            print(f"WARNING: New model {version.checkpoint_id} rejected, keeping {current.checkpoint_id if current else 'none'}.")
+            return result(False, reason, checkpoint_path)
+
+        model_holder.swap(version)
+        prediction_cache.invalidate()
+        print(f"INFO: Swapped in model {version.checkpoint_id} (previous kept for rollback).", flush=True)
+        return result(True, "swapped", checkpoint_path)
+    finally:
+        model_holder.loading = False
+
+async def swap_in_trained_model(job):
+    """Post-training hook: hot-swaps the checkpoint the job registered; the outcome becomes job.result."""
+    if job.checkpoint is None:
+        print(f"WARNING: Training job {job.id} registered no checkpoint, nothing to swap in.")
+        return {"swapped": False, "serving": False, "checkpoint": None, "reason": "job registered no checkpoint"}
+    # Waits out any reload already running rather than reporting this checkpoint as not swapped
+    result = await reload_model(job.checkpoint["checkpoint_id"], wait=True)
+    if not result["serving"]:
+        print(f"INFO: Checkpoint {job.checkpoint['checkpoint_id']} from job {job.id} not swapped in: {result['reason']}")
+    return result
+
+async def load_resources():
+    """Loads data and the model concurrently; every stage is timed for /ready."""
+    data_task = asyncio.create_task(load_data_stage())
+    await load_model_stages(data_task)
+    await data_task
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Start loading in background to unblock startup."""
+    inference_batcher.start()
     asyncio.create_task(load_resources())
-    asyncio.create_task(monitor_training_process())
+    asyncio.create_task(watch_checkpoint_registry())
     asyncio.create_task(broadcast_market_data())
     yield
+    await training_manager.shutdown()
+    await inference_batcher.stop()
+    inference_executor.shutdown()
+
+# orjson for every JSON response; hot paths below send pre-serialized bytes directly
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc):
+    """Fast 503 with Retry-After when the inference backlog is full."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Inference capacity exhausted, please retry.", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+WINDOW_SIZE = 5
+REGIMES = ["Stable Growth", "Volatile", "Crisis"]
+
+def get_narrative_text(ticker):
+    """Transcript used as the text modality (and summary) for a ticker; empty if none."""
+    narrative_info = narratives_data.get(ticker)
+    if not narrative_info:
+        for k, v in narratives_data.items():
+            if k.upper() == ticker:
+                narrative_info = v
+                break
+    
+    if not narrative_info:
+        narrative_info = {"transcript": "", "alignment_flag": False}
+    return narrative_info.get("transcript", "")
+
+def format_prediction(ticker_slice, text, outputs=None, row=0):
+    """Shapes model outputs (row `row` of a batch, or None when inference was skipped) into the /predict schema."""
+    prediction = 0.0
+    rel_score = 0.0
+    regime_id = 1 # Volatile default or Unknown
+    is_consistent = False
+    regime_label = "Live Tracking Only"
+
+    if outputs is not None:
+        prediction = outputs['prediction'][row].item()
+        rel_score = outputs['reliability_score'][row].item()
+        regime_id = outputs['regime_id']
+        is_consistent = outputs['is_consistent'][row].item()
+
+        # Map regime_id to label
+        regime_label = REGIMES[regime_id] if regime_id < len(REGIMES) else "Unknown"
+
+    if math.isnan(prediction) or math.isnan(rel_score):
+         # raise ValueError("Model produced NaN output")
+         prediction = 0
+         rel_score = 0
+    
+    result = {
+        "reliability_score": round(rel_score * 100, 2),
+        "regime": regime_label,
+        "regime_id": regime_id,
+        "prediction": round(prediction, 4),
+        "narrative_summary": text,
+        "is_consistent": is_consistent
+    }
+    # History for Charting (Last 30 entries). Indexed tickers leave it out: their history is
+    # pre-serialized at data load and spliced in by prediction_body at response time.
+    if ticker_slice.ticker not in history_payloads:
+        result["history"] = history_points(ticker_slice)
+    return result
+
+def prediction_body(ticker, result):
+    """/predict JSON bytes for a result, with the ticker's cached history bytes when it has none of its own."""
+    if "history" in result:
+        return dumps(result)
+    history = history_payloads.get(ticker)
+    return with_history(result, history if history is not None else b"[]")
+
+def batch_item_body(result):
+    """/predict/batch entry bytes: successful predictions get chart history, error entries stay {ticker, error, ...}."""
+    if "error" in result:
+        return dumps(result)
+    return prediction_body(result["ticker"], result)
+
+def prediction_etag(ticker):
+    """ETag of the /predict answer for an indexed ticker: fixed by (ticker, data, model). None if not stable."""
+    version = model_holder.current
+    if market_data is None or ticker not in history_payloads:
+        return None
+    if training_manager.running and (version is None or not version.trained):
+        return None
+    model_key = version.model_key if (version is not None and version.ready) else "no-model"
+    return make_etag("predict", ticker, data_version, model_key)
 
-app = FastAPI(lifespan=lifespan)
 @app.get("/predict/{ticker}")
-async def get_prediction(ticker: str):
+async def predict_ticker(ticker: str, x_profile_token: Optional[str] = Header(None), if_none_match: Optional[str] = Header(None)):
+    """
+    Prediction + chart history for one ticker. Answers for indexed tickers carry an ETag
+    (ticker, data version, model), so a conditional GET with If-None-Match gets a 304.
+    """
+    ticker = ticker.upper()
+    etag = prediction_etag(ticker)
+    if etag_matches(if_none_match, etag):
+        predict_requests.inc(outcome="not_modified")
+        return Response(status_code=304, headers={"ETag": etag, "X-Data-Version": data_version})
+
+    result = await get_prediction(ticker, x_profile_token)
+    with predict_stage_seconds.time(stage="history_serialization"):
+        body = prediction_body(ticker, result)
+    headers = {"X-Data-Version": data_version}
+    if etag is not None and "status" not in result:
+        headers["ETag"] = etag
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def get_prediction(ticker, profile_token=None):
+    """/predict result dict for one ticker (timed and counted for /metrics)."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await _get_prediction(ticker, profile_token)
+        outcome = result.get("status", "ok")
+        return result
+    except HTTPException as he:
+        outcome = "not_found" if he.status_code == 404 else str(he.status_code)
+        raise
+    except ExecutorSaturated:
+        outcome = "saturated"
+        raise
+    finally:
+        predict_request_seconds.observe(time.perf_counter() - start)
+        predict_requests.inc(outcome=outcome)
+
+async def _get_prediction(ticker, profile_token=None):
     ticker = ticker.upper()
+    # One model version for the whole request, even if a swap happens meanwhile
+    version = model_holder.current
     
-    if is_retraining:
+    if training_manager.running and (version is None or not version.trained):
          # Return a successful response but with status indicating training
          # This prevents 503 errors on the frontend
         return {
@@ -363,202 +945,138 @@ async def get_prediction(ticker: str):
             "narrative_summary": "System is calibrating to new data..."
         }
 
+    # Check if we have at least DATA. If model is missing, we can still show graphs.
+    if market_data is None:
+        # Trigger load if completely missing (shouldn't happen with split loading)
+        return {
+            "status": "training",
+            "message": "Market Data is initializing...",
+            "reliability_score": 0,
+            "regime": "System Calibration",
+            "prediction": 0,
+            "history": [],
+            "narrative_summary": "Loading data..."
+        }
+
+    # Same (ticker, data, weights) -> same answer; concurrent misses share one computation
+    model_key = version.model_key if (version is not None and version.ready) else "no-model"
+
+    # Opt-in profiling (armed session or X-Profile-Token): bypasses the cache, runs inline
+    if model_key != "no-model" and version.inputs is not None and ticker in version.inputs:
+        capture = profiling.claim(profile_token)
+        if capture is not None:
+            return await profile_prediction(ticker, version, capture)
+
+    cache_key = PredictionCache.make_key(ticker, data_version, model_key)
+    return await prediction_cache.get_or_compute(
+        cache_key,
+        lambda: compute_prediction(ticker, version),
+        cacheable=lambda result: "status" not in result
+    )
+
+def profile_prediction_blocking(ticker, version, text_encoder=False):
+    """
+    The whole /predict computation for an indexed ticker on one thread, so both profilers see all
+    of it. With text_encoder, BERT runs on the narrative's tokens even if its z_text is cached.
+    """
+    from torch.autograd.profiler import record_function
+    with record_function("data_prep"):
+        ticker_slice = ticker_index.get(ticker)
+        temp_input, tab_input = version.inputs.get(ticker)
+        text = get_narrative_text(ticker)
+    batch = {"temporal": temp_input, "tabular": tab_input}
+    with record_function("text_inputs"):
+        if text_encoder:
+            batch["text_input_ids"], batch["text_attn_mask"] = version.text_cache.tokenize(version.tokenizer, [text])
+        else:
+            z_text = version.text_cache.get(text)
+            batch["z_text"] = z_text if z_text is not None else version.text_cache.encode(version.model, version.tokenizer, text)
+    outputs = run_model_batch(batch, version)
+    with record_function("format_prediction"):
+        return format_prediction(ticker_slice, text, outputs)
+
+async def profile_prediction(ticker, version, capture):
+    """Runs one /predict under torch.profiler + cProfile; the response carries the capture id."""
+    with inference_executor.admission():
+        result = await inference_executor.run(
+            capture.run, version.model, f"/predict/{ticker}",
+            profile_prediction_blocking, ticker, version, capture.text_encoder
+        )
+    return {**result, "profile_id": capture.id}
+
+async def compute_prediction(ticker, version):
+    """Builds the /predict response for one ticker with the given model version (data lookup, inference, chart history)."""
     try:
-        # Check if we have at least DATA. If model is missing, we can still show graphs.
-        if market_data is None:
-            # Trigger load if completely missing (shouldn't happen with split loading)
-            return {
-                "status": "training",
-                "message": "Market Data is initializing...",
-                "reliability_score": 0,
-                "regime": "System Calibration",
-                "prediction": 0,
-                "history": [],
-                "narrative_summary": "Loading data..."
-            }
-            
         # If model is missing, we proceed but will skip inference
-        model_ready = (model is not None and tokenizer is not None)
+        model_ready = (version is not None and version.ready)
 
         # 1. Fetch Ticker Data
-        ticker_df = pd.DataFrame()
+        ticker_slice = None
         is_analyzed = False
         
-        if market_data is not None:
-             # Direct lookup with cleaned data
-             ticker_df = market_data[market_data['ticker'] == ticker].copy()
+        if ticker_index is not None:
+             # O(1) lookup into the per-ticker index (views, no copies)
+             with predict_stage_seconds.time(stage="data_lookup"):
+                 ticker_slice = ticker_index.get(ticker)
         
-        if not ticker_df.empty:
+        if ticker_slice is not None and len(ticker_slice) > 0:
             is_analyzed = True
         else:
-            # Fallback: Fetch history from YFinance for graphs
+            # Fallback: history for graphs from the local history cache (yfinance behind it)
+            ticker_slice = None
             try:
                 print(f"Fetching fallback history for {ticker}...", flush=True)
-                
-                def fetch_history_sync():
-                    yf_ticker = yf.Ticker(ticker)
-                    # Fetch 3 months
-                    return yf_ticker.history(period="3mo")
-
-                try:
-                    # Enforce strict 15-second timeout to prevent service hang (Increased from 3s)
-                    hist = await asyncio.wait_for(asyncio.to_thread(fetch_history_sync), timeout=15.0)
-                except asyncio.TimeoutError:
-                    print(f"WARNING: History fetch timed out for {ticker}. Using synthetic data.", flush=True)
-                    hist = pd.DataFrame() # Trigger synthetic generation below
-                
-                if not hist.empty:
-                     hist.reset_index(inplace=True)
-                     # Standardize columns
-                     hist.columns = [c.lower() for c in hist.columns]
-                     # Rename Date to date if needed
-                     if 'date' not in hist.columns and 'datetime' in hist.columns:
-                         hist.rename(columns={'datetime': 'date'}, inplace=True)
-                     
-                     # Fill missing cols
-                     for col in ['rsi', 'macd', 'atr', 'ema_20']:
-                         hist[col] = 0.0
-                         
-                     ticker_df = hist
-                     # Handle datetimes
-                     if pd.api.types.is_datetime64_any_dtype(ticker_df['date']):
-                        ticker_df['date'] = ticker_df['date'].dt.strftime('%Y-%m-%d')
-                     else:
-                        ticker_df['date'] = ticker_df['date'].astype(str)
-                else:
+                with predict_stage_seconds.time(stage="yfinance_fallback"):
+                    hist = await history_cache.get(ticker, period="3mo")
+                if hist.empty:
                     raise Exception("Empty or Timed Out")
-
+                ticker_slice = TickerSlice.from_frame(hist, ticker)
             except Exception as e:
                 print(f"Fallback history fetch failed: {e}. Graph will be empty.", flush=True)
-                ticker_df = pd.DataFrame() # Empty
-
-
+                ticker_slice = None
 
-        if ticker_df.empty:
+        if ticker_slice is None or len(ticker_slice) == 0:
             raise HTTPException(status_code=404, detail=f"Ticker {ticker} not found in market data or live source")
 
-        narrative_info = narratives_data.get(ticker)
-        if not narrative_info:
-            for k, v in narratives_data.items():
-                if k.upper() == ticker:
-                    narrative_info = v
-                    break
-        
-        if not narrative_info:
-            narrative_info = {"transcript": "", "alignment_flag": False}
+        text = get_narrative_text(ticker)
 
-        # 2. Prepare Inputs
-        window_size = 5
-        if len(ticker_df) < window_size:
-            window_df = ticker_df.tail(len(ticker_df))
-        else:
-            window_df = ticker_df.tail(window_size)
-        
-        # Temporal
-        # FIXED: Use 'close' instead of 'price', and 'ema_20' instead of 'bb_width' to match CSV/Helpers
-        temporal_features = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr', 'ema_20']
-        temp_data = window_df[temporal_features].values.astype(np.float32)
-        temp_data = np.nan_to_num(temp_data, nan=0.0, posinf=0.0, neginf=0.0)
-        
-        if temp_data.shape[0] < window_size:
-            pad_size = window_size - temp_data.shape[0]
-            temp_data = np.vstack([np.zeros((pad_size, 8), dtype=np.float32), temp_data])
-        
-        temp_input = torch.tensor(temp_data, dtype=torch.float).unsqueeze(0)
+        # 2. Inference
+        outputs = None
+        if is_analyzed and model_ready and version.inputs is not None:
+             # Precomputed, normalized rows (views into the version's input batch)
+             temp_input, tab_input = version.inputs.get(ticker)
 
-        # Tabular
-        temporal_features = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr', 'ema_20']
-        exclude = temporal_features + ['ticker', 'date', 'return_5d_forward', 'return_20d_forward', 'volatility_5d', 'trend_label', 'bb_middle']
-        tabular_features = [col for col in market_data.columns if col not in exclude]
-        
-        last_row = ticker_df.iloc[-1]
-        tab_array = last_row[tabular_features].values.astype(np.float32)
-        tab_array = np.nan_to_num(tab_array, nan=0.0, posinf=0.0, neginf=0.0)
-        tab_input = torch.tensor([tab_array], dtype=torch.float)
-        
-        # Pruning / Padding
-        tab_input = FeaturePruner.prune(tab_input, tab_input.shape[1], expected_tabular_dim)
-
-        # Text
-        encoding = {'input_ids': None, 'attention_mask': None}
-        if model_ready:
-            text = narrative_info.get("transcript", "")
-            encoding = tokenizer.encode_plus(
-                text,
-                add_special_tokens=True,
-                max_length=64,
-                padding='max_length',
-                truncation=True,
-                return_attention_mask=True,
-                return_tensors='pt'
-            )
+             # Bounded admission: raises ExecutorSaturated (-> 503) when the backlog is full
+             with inference_executor.admission():
+                 # Text: cached z_text, so BERT only runs for narratives not seen before
+                 with predict_stage_seconds.time(stage="text_encoding"):
+                     z_text = version.text_cache.get(text)
+                     if z_text is None:
+                         z_text = await inference_executor.run(version.text_cache.encode, version.model, version.tokenizer, text)
 
-        # 3. Inference
-        prediction = 0.0
-        rel_score = 0.0
-        regime_id = 1 # Volatile default or Unknown
-        is_consistent = False
-        regime_label = "Live Tracking Only"
-
-        if is_analyzed and model_ready:
-             with torch.no_grad():
-                outputs = model({
-                    "temporal": temp_input,
-                    "tabular": tab_input,
-                    "text_input_ids": encoding['input_ids'],
-                    "text_attn_mask": encoding['attention_mask']
-                })
-
-             prediction = outputs['prediction'].item()
-             rel_score = outputs['reliability_score'].item()
-             regime_id = outputs['regime_id']
-             is_consistent = outputs['is_consistent'].item()
-
-             # Map regime_id to label
-             regimes = ["Stable Growth", "Volatile", "Crisis"]
-             regime_label = regimes[regime_id] if regime_id < len(regimes) else "Unknown"
+                 # Queued into the micro-batcher; concurrent requests share one forward pass
+                 # (inference = queue wait + batched forward; model_forward is the forward alone)
+                 with predict_stage_seconds.time(stage="inference"):
+                     outputs = await inference_batcher.submit({
+                         "temporal": temp_input,
+                         "tabular": tab_input,
+                         "z_text": z_text
+                     }, context=version)
         else:
              print(f"Skipping inference for {ticker} (Model Ready: {model_ready})", flush=True)
 
-        if math.isnan(prediction) or math.isnan(rel_score):
-             # raise ValueError("Model produced NaN output")
-             prediction = 0
-             rel_score = 0
-        
-        # History for Charting (Last 30 entries)
-        # Use 'close' from CSV but rename to 'price' for frontend compatibility
-        history_df = ticker_df.tail(30).copy()
-        if 'date' in history_df.columns:
-             history_df = history_df[['date', 'close']].copy()
-             history_df['date'] = history_df['date'].astype(str)
-        else:
-             # Fallback if date is missing
-             history_df = history_df[['close']].copy()
-             history_df['date'] = pd.Timestamp.now().isoformat()
-
-        history_df.rename(columns={'close': 'price'}, inplace=True)
-        history = history_df.to_dict(orient='records')
+        return format_prediction(ticker_slice, text, outputs)
 
-        return {
-            "reliability_score": round(rel_score * 100, 2),
-            "regime": regime_label,
-            "regime_id": regime_id,
-            "prediction": round(prediction, 4),
-            "history": history,
-            "narrative_summary": text,
-            "is_consistent": is_consistent
-        }
-
-    except HTTPException as he:
-        raise he
+    except (HTTPException, ExecutorSaturated):
+        raise
     except Exception as e:
         print(f"CRITICAL INFERENCE ERROR for {ticker}: {e}")
         import traceback
         traceback.print_exc()
         
         # Fallback to Training Mode for Self-Healing
-        # if not is_retraining:
-             # trigger_retraining()
+        # if not training_manager.running:
+             # await start_retraining("inference anomaly")
              
         return {
             "status": "training",
@@ -570,94 +1088,425 @@ async def get_prediction(ticker: str):
             "narrative_summary": "System recalibration in progress..."
         }
 
-@app.get("/tickers")
-def get_tickers():
-    """Returns a list of available tickers with summary stats (Live + Analyzed)."""
-    
-    # 1. Define Live Tickers List (Popular Tech & Finance)
-    LIVE_TICKERS = [
-        "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", 
-        "AMD", "INTC", "NFLX", "JPM", "V", "WMT", "DIS"
+class BatchPredictionRequest(BaseModel):
+    tickers: List[str]
+
+async def _single_prediction_entry(ticker):
+    """Runs the single-ticker path (status responses, yfinance fallback) and tags the result."""
+    try:
+        result = await get_prediction(ticker)
+        return {"ticker": ticker, **result}
+    except HTTPException as he:
+        return {"ticker": ticker, "error": he.detail, "status_code": he.status_code}
+    except ExecutorSaturated as e:
+        return {"ticker": ticker, "error": "Inference capacity exhausted, please retry.", "status_code": 503, "retry_after": e.retry_after}
+
+async def _predict_indexed_chunk(chunk, version):
+    """One batched forward pass of `version` over tickers that are all present in the index."""
+    import torch
+    temp_input, tab_input = version.inputs.rows(chunk)
+
+    texts = [get_narrative_text(t) for t in chunk]
+    with inference_executor.admission():
+        await inference_executor.run(version.text_cache.compute, version.model, version.tokenizer, texts) # no-op when all cached
+        z_text = torch.cat([version.text_cache.get(text) for text in texts], dim=0)
+
+        outputs = await inference_executor.run(run_model_batch, {
+            "temporal": temp_input,
+            "tabular": tab_input,
+            "z_text": z_text
+        }, version)
+    return [
+        format_prediction(ticker_index.get(t), text, outputs, row=i)
+        for i, (t, text) in enumerate(zip(chunk, texts))
     ]
-    
+
+async def iter_batch_predictions(tickers):
+    """Yields one tagged /predict result per ticker as soon as it is available (order not preserved)."""
+    version = model_holder.current
+    model_ready = (version is not None and version.ready)
+    serving_untrained = training_manager.running and (version is None or not version.trained)
+    if serving_untrained or market_data is None or ticker_index is None:
+        indexed = []
+    else:
+        indexed = [t for t in tickers if t in ticker_index]
+    indexed_set = set(indexed)
+
+    # Everything outside the index goes through the single path concurrently
+    fallback_tasks = [
+        asyncio.create_task(_single_prediction_entry(t))
+        for t in tickers if t not in indexed_set
+    ]
+
+    model_key = version.model_key if model_ready else "no-model"
+    keys = {t: PredictionCache.make_key(t, data_version, model_key) for t in indexed}
+    cached = await prediction_cache.get_many(list(keys.values()))
+
+    pending = []
+    for t in indexed:
+        hit = cached.get(keys[t])
+        if hit is not None:
+            yield {"ticker": t, **hit}
+        else:
+            pending.append(t)
+
+    for i in range(0, len(pending), PREDICT_MAX_BATCH_SIZE):
+        chunk = pending[i:i + PREDICT_MAX_BATCH_SIZE]
+        try:
+            if model_ready and version.inputs is not None:
+                results = await _predict_indexed_chunk(chunk, version)
+            else:
+                results = [format_prediction(ticker_index.get(t), get_narrative_text(t)) for t in chunk]
+        except ExecutorSaturated as e:
+            for t in chunk:
+                yield {"ticker": t, "error": "Inference capacity exhausted, please retry.", "status_code": 503, "retry_after": e.retry_after}
+            continue
+        except Exception as e:
+            print(f"CRITICAL BATCH INFERENCE ERROR for {chunk}: {e}")
+            for t in chunk:
+                yield {"ticker": t, "error": "Inference failed for this batch.", "status_code": 500}
+            continue
+
+        for t, result in zip(chunk, results):
+            await prediction_cache.put(keys[t], result)
+            yield {"ticker": t, **result}
+
+    for task in asyncio.as_completed(fallback_tasks):
+        yield await task
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictionRequest, stream: bool = False):
+    """
+    Predictions for many tickers in one round trip; per-ticker entries follow the /predict schema
+    (plus `ticker`), or carry `error`/`status_code`. With ?stream=true, results are sent as NDJSON
+    lines in completion order.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in request.tickers if t and t.strip()))
+    if len(tickers) > PREDICT_BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=413, detail=f"At most {PREDICT_BATCH_MAX_TICKERS} tickers per batch")
+    # Reject up front (503) rather than mid-stream when the backlog is already full
+    inference_executor.check_capacity()
+
+    if stream:
+        async def ndjson_lines():
+            async for result in iter_batch_predictions(tickers):
+                yield batch_item_body(result) + b"\n"
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    results = {result["ticker"]: result async for result in iter_batch_predictions(tickers)}
+    body = b'{"results":[' + b",".join(batch_item_body(results[t]) for t in tickers) + b"]}"
+    return Response(content=body, media_type="application/json")
+
+def _historical_summary(ticker):
+    """Builds a /tickers entry from the last indexed CSV row, or None if the ticker is not indexed."""
+    ticker_slice = ticker_index.get(ticker) if ticker_index is not None else None
+    if ticker_slice is None or len(ticker_slice) == 0:
+        return None
+    last_close = float(ticker_slice.close[-1])
+    last_open = float(ticker_slice.open[-1])
+    return {
+        "ticker": ticker,
+        "name": ticker,
+        "price": round(last_close, 2),
+        "change": round((last_close - last_open) / last_open * 100, 2) if last_open else 0.0,
+        "is_analyzed": True
+    }
+
+def build_tickers_summary():
+    """The /tickers list: live quotes where the snapshot has them, last CSV row otherwise."""
     unique_tickers = []
-    if market_data is not None:
-        unique_tickers = market_data['ticker'].unique().tolist()
+    if ticker_index is not None:
+        unique_tickers = ticker_index.tickers
     
     # Combine lists (avoid duplicates)
-    all_tickers = list(set(LIVE_TICKERS + unique_tickers))
+    all_tickers = list(dict.fromkeys(LIVE_TICKERS + unique_tickers))
     
     summary = []
     
-    # 2. Fetch Live Data via YFinance (Batch fetching is faster)
-    try:
-        import yfinance as yf
-        # Fetch data for alltickers at once
-        tickers_str = " ".join(all_tickers)
-        live_data = yf.Tickers(tickers_str)
-        
-        for ticker in all_tickers:
+    # Live prices come from the broadcaster's in-memory snapshot (no network calls here)
+    quotes = quote_snapshot.quotes
+    for ticker in all_tickers:
+        quote = quotes.get(ticker)
+        if quote is not None:
             # FIXED: Always mark as analyzed to allow frontend to fetch predictions/fallback graphs
             # The /predict endpoint handles the fallback if CSV data is missing.
-            is_analyzed = True 
-            
-            try:
-                # Try to get live data first
-                info = live_data.tickers[ticker].fast_info
-                # Fallback to market_data if live fetch fails or is strangely empty (though fast_info usually reliable)
-                if info is None or not hasattr(info, 'last_price'):
-                    raise ValueError("No live data")
-                
-                price = round(info.last_price, 2)
-                prev_close = info.previous_close
-                if prev_close:
-                    change_pct = round(((price - prev_close) / prev_close) * 100, 2)
-                else:
-                    change_pct = 0.0
-                     
-                summary.append({
-                    "ticker": ticker,
-                    "name": ticker, # simplified, can get full name if needed but requires .info which is slower
-                    "price": price,
-                    "change": change_pct,
-                    "is_analyzed": is_analyzed
-                })
-                
-            except Exception as e:
-                # Fallback to local CSV data if live fails
-                if is_analyzed:
-                    ticker_df = market_data[market_data['ticker'] == ticker]
-                    if not ticker_df.empty:
-                        last_row = ticker_df.iloc[-1]
-                        summary.append({
-                            "ticker": ticker,
-                            "name": ticker,
-                            "price": round(last_row['close'], 2),
-                            "change": round((last_row['close'] - last_row['open']) / last_row['open'] * 100, 2),
-                            "is_analyzed": True,
-                            "source": "historical_fallback"
-                        })
-    except ImportError:
-        # Fallback if yfinance not installed (should verify installation first)
-        print("WARNING: yfinance not installed. Returning only csv data.")
-        if market_data is not None:
-            for ticker in unique_tickers:
-                ticker_df = market_data[market_data['ticker'] == ticker]
-                if not ticker_df.empty:
-                    last_row = ticker_df.iloc[-1]
-                    summary.append({
-                        "ticker": ticker,
-                        "name": ticker,
-                        "price": round(last_row['close'], 2),
-                        "change": round((last_row['close'] - last_row['open']) / last_row['open'] * 100, 2),
-                        "is_analyzed": True
-                    })
+            summary.append({
+                "ticker": ticker,
+                "name": ticker, # simplified, can get full name if needed but requires .info which is slower
+                "price": quote["price"],
+                "change": quote["change_percent"],
+                "is_analyzed": True,
+                "as_of": quote["timestamp"]
+            })
+        else:
+            # Fallback to local CSV data when the snapshot has no quote for this ticker
+            entry = _historical_summary(ticker)
+            if entry is not None:
+                entry["source"] = "historical_fallback"
+                summary.append(entry)
     return summary
 
+@app.get("/tickers")
+async def get_tickers(if_none_match: Optional[str] = Header(None)):
+    """
+    Returns a list of available tickers with summary stats (Live + Analyzed). The body is
+    serialized once per (quote snapshot, data) version and served with an ETag for conditional GETs.
+    """
+    body, etag = tickers_payload.get((quote_snapshot.version, data_version), build_tickers_summary)
+
+    # Staleness of the snapshot as a whole (per-entry timestamps are in `as_of`)
+    headers = {"ETag": etag, "X-Quotes-Version": str(quote_snapshot.version), "X-Data-Version": data_version}
+    age = quote_snapshot.age_seconds()
+    if age is not None:
+        headers["X-Quotes-Age"] = str(age)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/ready")
+def get_readiness(response: Response, capability: str = None):
+    """
+    Startup progress with per-stage timings. 200 once every stage is done (or, with
+    ?capability=predict|history|quotes, once that capability is live), 503 before.
+    """
+    report = readiness.report()
+    if capability is None:
+        is_ready = report["ready"]
+    elif capability in readiness.capabilities:
+        is_ready = report["capabilities"][capability]
+    else:
+        raise HTTPException(status_code=404, detail=f"Unknown capability {capability}")
+    response.status_code = 200 if is_ready else 503
+    return report
+
+@app.get("/model/stats")
+def get_model_stats():
+    """Serving / previous model versions and swap history."""
+    return model_holder.stats()
+
+@app.post("/model/rollback")
+def rollback_model():
+    """Instantly swaps the previously served model back in."""
+    if not model_holder.rollback():
+        raise HTTPException(status_code=409, detail="No previous model to roll back to")
+    print(f"INFO: Rolled back to model {model_holder.current.checkpoint_id}.", flush=True)
+    return model_holder.stats()
+
+class ReloadRequest(BaseModel):
+    checkpoint_id: Optional[str] = None
+
+@app.post("/model/reload")
+async def reload_model_endpoint(request: ReloadRequest = None):
+    """Swaps in a registry checkpoint (default: the newest registered); reports why if nothing changed."""
+    return await reload_model(request.checkpoint_id if request else None)
+
+class TrainingJobRequest(BaseModel):
+    reason: str = "manual"
+
+@app.post("/training/jobs", status_code=202)
+async def start_training_job(request: TrainingJobRequest = None):
+    """Starts a retraining run; 409 if one is already running here or on another replica."""
+    try:
+        job = await training_manager.start(reason=request.reason if request else "manual")
+    except TrainingBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.describe()
+
+@app.get("/training/jobs")
+def list_training_jobs():
+    return training_manager.status()
+
+@app.get("/training/jobs/{job_id}")
+def get_training_job(job_id: str):
+    job = training_manager.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training job {job_id}")
+    return job.describe()
+
+@app.post("/training/jobs/{job_id}/cancel")
+async def cancel_training_job(job_id: str):
+    try:
+        job = await training_manager.cancel(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown training job {job_id}")
+    return job.describe()
+
+@app.get("/training/jobs/{job_id}/events")
+def stream_training_job(job_id: str, follow: bool = True):
+    """Progress events (start/step/epoch_end/validation/end) as NDJSON, followed live until the run ends."""
+    if job_id not in training_manager.jobs:
+        raise HTTPException(status_code=404, detail=f"Unknown training job {job_id}")
+
+    async def ndjson_lines():
+        async for event in training_manager.stream_events(job_id, follow=follow):
+            yield json.dumps(event) + "\n"
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@app.get("/quotes/stats")
+def get_quote_stats():
+    """Version and age of the live quote snapshot, plus Redis publishing counters."""
+    stats = quote_snapshot.stats()
+    if market_publisher is not None:
+        stats["publisher"] = market_publisher.stats()
+    return stats
+
+@app.get("/history/{ticker}")
+async def get_history(ticker: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Chart history alone. Indexed tickers are served from the pre-serialized payloads with an
+    ETag (304 on a matching If-None-Match); others go through the fallback history cache.
+    """
+    ticker = ticker.upper()
+    body = history_payloads.get(ticker)
+    if body is not None:
+        etag = history_payloads.etag(ticker)
+        headers = {"ETag": etag, "X-Data-Version": data_version}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    hist = await history_cache.get(ticker, period="3mo")
+    if hist.empty:
+        raise HTTPException(status_code=404, detail=f"No history for {ticker}")
+    return Response(content=dumps(history_points(TickerSlice.from_frame(hist, ticker))), media_type="application/json")
+
+@app.get("/cache/history/stats")
+def get_history_cache_stats():
+    """Hit/stale/miss counters of the fallback history cache, plus the pre-serialized payloads."""
+    return {**history_cache.stats(), "payloads": history_payloads.stats(), "tickers_payload_builds": tickers_payload.builds}
+
+@app.get("/batcher/stats")
+def get_batcher_stats():
+    """Queue depth and batch-size distribution of the /predict micro-batcher."""
+    return {**inference_batcher.stats(), "executor": inference_executor.stats()}
+
+@app.get("/cache/text/stats")
+def get_text_cache_stats():
+    """Hit/miss counters of the narrative embedding cache."""
+    version = model_holder.current
+    return version.text_cache.stats() if version is not None else {}
+
+@app.get("/cache/predictions/stats")
+def get_prediction_cache_stats():
+    """Hit rates of the two-tier /predict cache."""
+    return prediction_cache.stats()
+
+@metrics.add_collector
+def collect_service_metrics():
+    """Scrape-time view of the components that already keep their own counters."""
+    version = model_holder.current
+    holder = model_holder.stats()
+    families = [
+        ("model_info", "gauge", "Serving model version (value is always 1).",
+         [({"checkpoint_id": version.checkpoint_id, "trained": str(version.trained).lower(), "precision": version.precision,
+            "backend": version.backend.name if version.backend is not None else "eager"}, 1)] if version is not None else []),
+        ("model_swaps_total", "counter", "Hot swaps to a new model version.", [({}, holder["swaps"])]),
+        ("model_rollbacks_total", "counter", "Rollbacks to the previous model version.", [({}, holder["rollbacks"])]),
+        ("model_rejected_total", "counter", "Candidate models rejected by validation.", [({}, holder["rejected"])]),
+        ("data_info", "gauge", "Loaded market data / narratives version (value is always 1).", [({"data_version": data_version}, 1)]),
+        ("ready", "gauge", "1 once a capability's startup stages have succeeded.",
+         [({"capability": name}, int(readiness.capability_ready(name))) for name in readiness.capabilities]),
+    ]
+
+    active = training_manager.active if training_manager.running else None
+    progress = (active.progress or {}) if active is not None else {}
+    job_states = {}
+    for job in training_manager.jobs.values():
+        job_states[job.state] = job_states.get(job.state, 0) + 1
+    families += [
+        ("training_running", "gauge", "1 while a retraining job runs on this replica.", [({}, int(active is not None))]),
+        ("training_epoch", "gauge", "Epoch of the running retraining job.", [({}, progress.get("epoch"))] if active is not None else []),
+        ("training_step", "gauge", "Global step of the running retraining job.", [({}, progress.get("step"))] if active is not None else []),
+        ("training_jobs", "gauge", "Retained retraining jobs by state.", [({"state": k}, v) for k, v in job_states.items()]),
+    ]
+
+    predictions = prediction_cache.stats()
+    history = history_cache.stats()
+    families += [
+        ("prediction_cache_lookups_total", "counter", "/predict cache lookups by result.",
+         [({"result": "local_hit"}, predictions["local_hits"]), ({"result": "remote_hit"}, predictions["remote_hits"]),
+          ({"result": "miss"}, predictions["misses"])]),
+        ("prediction_cache_hit_ratio", "gauge", "Share of /predict cache lookups served from a cache tier.", [({}, predictions["hit_rate"])]),
+        ("prediction_cache_entries", "gauge", "Entries in the in-process /predict cache.", [({}, predictions["entries"])]),
+        ("history_cache_lookups_total", "counter", "Fallback history cache lookups by result.",
+         [({"result": "hit"}, history["hits"]), ({"result": "stale_hit"}, history["stale_hits"]), ({"result": "miss"}, history["misses"])]),
+        ("history_cache_fetch_errors_total", "counter", "Failed fallback history fetches.", [({}, history["fetch_errors"])]),
+    ]
+    if version is not None:
+        text = version.text_cache.stats()
+        families += [
+            ("text_cache_lookups_total", "counter", "Narrative embedding cache lookups by result.",
+             [({"result": "hit"}, text["hits"]), ({"result": "miss"}, text["misses"])]),
+            ("text_cache_entries", "gauge", "Cached narrative embeddings.", [({}, text["entries"])]),
+        ]
+
+    batcher = inference_batcher.stats()
+    executor = inference_executor.stats()
+    families += [
+        ("batcher_queue_depth", "gauge", "Requests waiting in the /predict micro-batcher.", [({}, batcher["queue_depth"])]),
+        ("batcher_batches_total", "counter", "Forward passes run by the micro-batcher.", [({}, batcher["total_batches"])]),
+        ("executor_in_flight", "gauge", "Inference tasks admitted and not yet finished.", [({}, executor["in_flight"])]),
+        ("executor_rejected_total", "counter", "Requests rejected because the inference backlog was full.", [({}, executor["rejected"])]),
+        ("quotes_age_seconds", "gauge", "Age of the live quote snapshot.", [({}, quote_snapshot.age_seconds())]),
+    ]
+    if market_publisher is not None:
+        publisher = market_publisher.stats()
+        families += [
+            ("publisher_tickers_total", "counter", "Tickers considered for Redis publishing, by result.",
+             [({"result": "published"}, publisher["published_tickers"]), ({"result": "skipped"}, publisher["skipped_tickers"])]),
+            ("publisher_bytes_total", "counter", "Bytes published to Redis.", [({}, publisher["bytes_published"])]),
+            ("publisher_errors_total", "counter", "Failed Redis publishes.", [({}, publisher["errors"])]),
+        ]
+    return families
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    """Admin profiling routes: hidden (404) unless PROFILING_TOKEN is set, then X-Profile-Token must match."""
+    if not profiling.token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+class ProfilingRequest(BaseModel):
+    requests: int = 5
+    seconds: float = 60.0
+    text_encoder: bool = False
+
+@app.post("/admin/profiling", dependencies=[Depends(require_profiling_token)])
+def arm_profiling(request: ProfilingRequest = None):
+    """Profiles the next `requests` /predict calls within `seconds` (both clamped to the configured limits)."""
+    request = request or ProfilingRequest()
+    session = profiling.arm(request.requests, request.seconds, request.text_encoder)
+    print(f"INFO: Profiling armed for {session.requests} requests / {round(session.expires_at - session.started_at)}s.", flush=True)
+    return profiling.stats()
+
+@app.delete("/admin/profiling", dependencies=[Depends(require_profiling_token)])
+def disarm_profiling():
+    profiling.disarm()
+    return profiling.stats()
+
+@app.get("/admin/profiling", dependencies=[Depends(require_profiling_token)])
+def get_profiling():
+    """Current session, limits and the captures on disk (newest first)."""
+    return {**profiling.stats(), "captures": profiling.captures()}
+
+@app.get("/admin/profiling/captures/{capture_id}/{artifact}", dependencies=[Depends(require_profiling_token)])
+def download_profile(capture_id: str, artifact: str):
+    """One artifact of a capture: trace (Chrome trace JSON), pstats (cProfile), ops / python (text summaries)."""
+    path = profiling.path(capture_id, artifact)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown capture artifact {capture_id}/{artifact}")
+    return FileResponse(path, media_type=PROFILE_ARTIFACTS[artifact][1], filename=os.path.basename(path))
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of latencies, counters and versions."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/news/{ticker}")
 def get_news(ticker: str):
     """Fetches latest news for a specific ticker via Yahoo Finance."""
     try:
+        import yfinance as yf
         ticker_obj = yf.Ticker(ticker.upper())
         news = ticker_obj.news
         
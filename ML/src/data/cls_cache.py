@@ -0,0 +1,143 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from src.data.narrative_store import load_narrative_store
+from src.models.bundle import FINBERT_MODEL_NAME, pretrained_source
+
+CACHE_FORMAT = 1
+DEFAULT_BATCH_SIZE = 32
+
+
+def cls_cache_dir_for(json_path):
+    """Default cache location: <json dir>/cache/text_cls/<json stem>, one subdirectory per backbone id."""
+    base_dir = os.path.dirname(os.path.abspath(json_path))
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    return os.path.join(base_dir, "cache", "text_cls", stem)
+
+
+def load_backbone(model_name=FINBERT_MODEL_NAME):
+    """The frozen BERT that TextEncoder wraps, from the local bundle when present, in eval mode."""
+    from transformers import AutoModel
+    source, load_kwargs = pretrained_source(model_name)
+    return AutoModel.from_pretrained(source, **load_kwargs).eval()
+
+
+def backbone_id(bert):
+    """Content id of a backbone: its config and every weight, so any change invalidates the cache."""
+    h = hashlib.sha256(bert.config.to_json_string(use_diff=False).encode("utf-8"))
+    for name, tensor in bert.state_dict().items():
+        h.update(name.encode("utf-8"))
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def compute_cls(bert, input_ids, attention_mask, batch_size=DEFAULT_BATCH_SIZE):
+    """[CLS] hidden state of each row (exactly what TextEncoder projects) -> float32 (n, hidden)."""
+    import torch
+    bert.eval()
+    out = np.zeros((len(input_ids), bert.config.hidden_size), dtype=np.float32)
+    with torch.no_grad():
+        for i in range(0, len(input_ids), batch_size):
+            ids = torch.as_tensor(np.asarray(input_ids[i:i + batch_size]), dtype=torch.long)
+            mask = torch.as_tensor(np.asarray(attention_mask[i:i + batch_size]), dtype=torch.long)
+            hidden = bert(input_ids=ids, attention_mask=mask).last_hidden_state
+            out[i:i + len(ids)] = hidden[:, 0, :].numpy()
+    return out
+
+
+class ClsEmbeddings:
+    """
+    CLS embeddings aligned with a NarrativeTokenStore's rows: a ticker's row in the token store
+    is its row here, so the dataset looks up a (hidden,) vector instead of token ids.
+    """
+
+    def __init__(self, token_store, embeddings, backbone):
+        self.token_store = token_store
+        self.embeddings = embeddings
+        self.backbone = backbone
+
+    @property
+    def hidden_size(self):
+        return self.embeddings.shape[1]
+
+    def get(self, ticker, date=None):
+        import torch
+        return torch.from_numpy(np.array(self.embeddings[self.token_store.row(ticker, date)]))
+
+
+def _read_cache(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "hashes.json"), "r") as f:
+            meta = json.load(f)
+        if meta.get("format") != CACHE_FORMAT:
+            return {}
+        embeddings = np.load(os.path.join(cache_dir, "embeddings.npy"), mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError):
+        return {}
+    if embeddings.shape[0] != len(meta["text_hashes"]):
+        return {}
+    return {h: embeddings[i] for i, h in enumerate(meta["text_hashes"])}
+
+
+def _write_cache(cache_dir, text_hashes, embeddings):
+    """Embeddings first, then hashes.json swapped in; a reader never pairs a new array with old hashes."""
+    os.makedirs(cache_dir, exist_ok=True)
+    suffix = f".tmp{os.getpid()}"
+    with open(os.path.join(cache_dir, "embeddings.npy" + suffix), "wb") as f:
+        np.save(f, np.ascontiguousarray(embeddings))
+    with open(os.path.join(cache_dir, "hashes.json" + suffix), "w") as f:
+        json.dump({"format": CACHE_FORMAT, "text_hashes": list(text_hashes)}, f)
+    for name in ("embeddings.npy", "hashes.json"):
+        os.replace(os.path.join(cache_dir, name + suffix), os.path.join(cache_dir, name))
+
+
+_cache_lock = threading.Lock()
+
+
+def load_cls_embeddings(json_path, token_store=None, bert=None, cache_dir=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    CLS embeddings for every transcript of narratives.json. Transcripts already cached for this
+    backbone (by content hash) are reused; only new ones run through BERT, once, and are
+    appended to the on-disk cache.
+    """
+    token_store = token_store or load_narrative_store(json_path)
+    bert = bert if bert is not None else load_backbone()
+    backbone = backbone_id(bert)
+    cache_dir = os.path.join(cache_dir or cls_cache_dir_for(json_path), backbone)
+
+    with _cache_lock:
+        cached = _read_cache(cache_dir)
+        missing = [i for i, h in enumerate(token_store.text_hashes) if h not in cached]
+        if missing:
+            computed = compute_cls(bert, token_store.input_ids[missing], token_store.attention_mask[missing], batch_size)
+            for row, vector in zip(missing, computed):
+                cached[token_store.text_hashes[row]] = vector
+            hashes = list(cached)
+            try:
+                _write_cache(cache_dir, hashes, np.stack([cached[h] for h in hashes]))
+            except OSError as e:
+                print(f"WARNING: Could not write CLS embedding cache to {cache_dir}: {e}")
+        print(f"CLS embeddings for {len(token_store)} transcripts ({len(missing)} computed, backbone {backbone})")
+
+    embeddings = np.stack([np.asarray(cached[h], dtype=np.float32) for h in token_store.text_hashes])
+    return ClsEmbeddings(token_store, embeddings, backbone)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute frozen FinBERT [CLS] embeddings for every transcript in narratives.json.")
+    parser.add_argument("--json", type=str, default="narratives.json", help="Path to narratives.json.")
+    parser.add_argument("--out", type=str, default=None, help="Cache directory (default: <json dir>/cache/text_cls/<stem>).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="BERT batch size (default: 32).")
+    args = parser.parse_args()
+
+    embeddings = load_cls_embeddings(args.json, cache_dir=args.out, batch_size=args.batch_size)
+    print(f"CLS cache for {args.json}: {embeddings.embeddings.shape[0]} rows x {embeddings.hidden_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,120 +1,234 @@
 import torch
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import BatchSampler, DataLoader, Dataset, IterableDataset, RandomSampler, SequentialSampler, get_worker_info
 import pytorch_lightning as L
-from transformers import AutoTokenizer
 import pandas as pd
 import numpy as np
-import json
-import os
+from src.data.snapshot import clean_market_frame, load_market_frame
+from src.data.narrative_store import NarrativeTokenStore, load_narrative_store, load_tokenizer
+from src.data.features import FeatureSchema
+from src.data.feature_store import FeatureStore, load_feature_store
+from src.data.cls_cache import load_cls_embeddings
+from src.data.shards import load_shards, read_shard, streaming_schema
+
+def split_tickers(tickers):
+    """Split by ticker for a simple train/val split: the first four tickers train, the rest validate."""
+    return list(tickers[:4]), list(tickers[4:])
+
+
+def training_schema(df, window_size=5):
+    """Feature schema (names + normalization stats) fitted on the training split of a cleaned frame."""
+    train_tickers, _ = split_tickers(df['ticker'].unique())
+    return FeatureSchema.from_frame(df[df['ticker'].isin(train_tickers)], window_size, source="dataset")
+
+
+def text_inputs(token_store, text_embeddings, rows):
+    """Textual branch for token store row(s): cached [CLS] embeddings, else the pre-tokenized ids."""
+    if text_embeddings is not None:
+        return {"text_cls": torch.from_numpy(np.asarray(text_embeddings.embeddings[rows]))}
+    # astype copies out of the read-only mapping and widens to what the embedding expects
+    return {
+        "text_input_ids": torch.from_numpy(token_store.input_ids[rows].astype(np.int64)),
+        "text_attn_mask": torch.from_numpy(token_store.attention_mask[rows].astype(np.int64)),
+    }
+
 
 class MarketDataset(Dataset):
-    def __init__(self, df, narratives, window_size=5, tokenizer_name='yiyanghkust/finbert-pretrain', max_len=64):
-        self.df = df.copy()
+    def __init__(self, df, narratives, window_size=5, tokenizer_name='yiyanghkust/finbert-pretrain', max_len=64, token_store=None, feature_schema=None, text_embeddings=None,
+                 feature_store=None, tickers=None):
+        self.df = df.copy() if df is not None else None
         self.narratives = {n['ticker']: n for n in narratives}
         self.window_size = window_size
-        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
         self.max_len = max_len
+        # Narratives are tokenized once up front (pass the shared store to skip even that)
+        if token_store is None:
+            token_store = NarrativeTokenStore.build(narratives, load_tokenizer(tokenizer_name), max_len)
+        self.token_store = token_store
+        # ClsEmbeddings (training text cache): samples carry frozen-BERT [CLS] vectors, not token ids
+        self.text_embeddings = text_embeddings
         
-        # Feature column lists for real data
-        self.temporal_features = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr', 'ema_20']
+        if feature_store is None:
+            # Ad-hoc frame: the same cleanup as the snapshot/feature store path, materialized in memory
+            self.df = clean_market_frame(self.df)
+            # Serving/eval pass the checkpoint's schema (feature names and training stats, not this frame's)
+            schema = feature_schema or FeatureSchema.from_frame(self.df, window_size, source="dataset")
+            feature_store = FeatureStore.build(self.df, schema)
         
-        # Dynamically determine tabular features if not explicit
-        if hasattr(self, 'tabular_features') and self.tabular_features:
-            pass
-        else:
-            exclude = self.temporal_features + ['ticker', 'date', 'return_5d_forward', 'return_20d_forward', 'volatility_5d', 'trend_label', 'bb_middle']
-            self.tabular_features = [col for col in self.df.columns if col not in exclude]
+        # Everything is normalized once into contiguous float32 arrays; samples are views into them
+        self.feature_store = feature_store
+        schema = feature_store.schema
+        self.temporal_features = list(schema.temporal_features)
+        self.tabular_features = list(schema.tabular_features)
+        self.means, self.stds = dict(schema.means), dict(schema.stds)
+        self.temporal = feature_store.temporal
+        self.tabular = feature_store.tabular
+        self.target_return = feature_store.target_return
+        self.target_volatility = feature_store.target_volatility
+        self.target_trend = feature_store.target_trend
         
         print(f"MarketDataset initialized with {len(self.temporal_features)} temporal and {len(self.tabular_features)} tabular features")
         
-        # Fill NaN values
-        # Fill NaN values
-        self.df = self.df.fillna(method='ffill').fillna(method='bfill').fillna(0)
-        
-        # Compute normalization statistics (Z-score normalization)
-        all_features = self.temporal_features + self.tabular_features
-        self.means = {}
-        self.stds = {}
-        for col in all_features:
-            self.means[col] = self.df[col].mean()
-            self.stds[col] = self.df[col].std()
-            # Avoid division by zero
-            if self.stds[col] == 0 or np.isnan(self.stds[col]):
-                self.stds[col] = 1.0
-            if np.isnan(self.means[col]):
-                self.means[col] = 0.0
-        
-        # Prepare valid indices (we need at least window_size history for each sample)
-        self.indices = []
-        for ticker in self.df['ticker'].unique():
-            ticker_indices = self.df.index[self.df['ticker'] == ticker].tolist()
-            if len(ticker_indices) >= window_size:
-                # We can start from the window_size-th index
-                self.indices.extend(ticker_indices[window_size-1:])
-
-    def _normalize(self, value, col):
-        """Normalize a value using Z-score."""
-        return (value - self.means[col]) / self.stds[col]
+        # Prepare valid samples (we need at least window_size history for each sample): the
+        # store row of each sample's last day, and its narrative row in the token store
+        self.ends, owners = feature_store.sample_ends(tickers)
+        text_rows = {t: self.token_store.row(t) for t in set(owners)}
+        self.text_rows = np.array([text_rows[t] for t in owners], dtype=np.int64)
+        self._window_offsets = np.arange(1 - window_size, 1, dtype=np.int64)
+
+    @classmethod
+    def from_store(cls, feature_store, tickers=None, narratives=(), token_store=None, text_embeddings=None):
+        """Samples of `tickers` straight from a materialized FeatureStore (no frame, no normalization)."""
+        return cls(None, narratives, window_size=feature_store.schema.window_size, token_store=token_store,
+                   text_embeddings=text_embeddings, feature_store=feature_store, tickers=tickers)
+
+    def _text(self, rows):
+        return text_inputs(self.token_store, self.text_embeddings, rows)
 
     def __len__(self):
-        return len(self.indices)
+        return len(self.ends)
 
     def __getitem__(self, idx):
-        real_idx = self.indices[idx]
-        row = self.df.iloc[real_idx]
-        ticker = row['ticker']
-        
-        # 1. Temporal Branch: 5-day window with OHLCV + core technical indicators
-        window_df = self.df.iloc[real_idx - self.window_size + 1 : real_idx + 1]
-        
-        # Normalize temporal features
-        temp_data = np.zeros((self.window_size, len(self.temporal_features)), dtype=np.float32)
-        for i, col in enumerate(self.temporal_features):
-            temp_data[:, i] = (window_df[col].values - self.means[col]) / self.stds[col]
-        temp_data = np.nan_to_num(temp_data, nan=0.0, posinf=0.0, neginf=0.0)
-        temp = torch.tensor(temp_data, dtype=torch.float)
+        if not np.isscalar(idx):
+            return self.get_batch(idx)
+        end = int(self.ends[idx])
         
-        # 2. Tabular Branch: Normalized snapshot features
-        tabular_values = []
-        for col in self.tabular_features:
-            val = (row[col] - self.means[col]) / self.stds[col]
-            tabular_values.append(val)
-        tab_array = np.array(tabular_values, dtype=np.float32)
-        tab_array = np.nan_to_num(tab_array, nan=0.0, posinf=0.0, neginf=0.0)
-        tab = torch.tensor(tab_array, dtype=torch.float)
+        # Output a sample dictionary where each key corresponds to a modality. temporal/tabular
+        # are views into the shared arrays (no copies): the 5-day window and the snapshot row
+        return {
+            "temporal": torch.from_numpy(self.temporal[end - self.window_size + 1 : end + 1]),
+            "tabular": torch.from_numpy(self.tabular[end]),
+            **self._text(self.text_rows[idx]),
+            "target_return": torch.tensor(self.target_return[end]),
+            "target_volatility": torch.tensor(self.target_volatility[end]),
+            "target_trend": torch.tensor(self.target_trend[end]),
+        }
 
-        
-        # 3. Textual Branch: transcript
-        narrative = self.narratives.get(ticker, {"transcript": ""})
-        text = narrative['transcript']
-        encoding = self.tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=self.max_len,
-            padding='max_length',
-            truncation=True,
-            return_attention_mask=True,
-            return_tensors='pt'
-        )
-        
-        # Targets: Multiple targets for different prediction tasks
-        target_return = torch.tensor(row['return_5d_forward'], dtype=torch.float)
-        target_volatility = torch.tensor(row['volatility_5d'], dtype=torch.float)
-        target_trend = torch.tensor(row['trend_label'], dtype=torch.long)
-        
-        # Output a batch dictionary where each key corresponds to a modality
+    def get_batch(self, indices):
+        """A whole collated batch in one gather per array (what a BatchSampler-driven DataLoader fetches)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        ends = self.ends[indices]
         return {
-            "temporal": temp,
-            "tabular": tab,
-            "text_input_ids": encoding['input_ids'].flatten(),
-            "text_attn_mask": encoding['attention_mask'].flatten(),
-            "target_return": target_return,
-            "target_volatility": target_volatility,
-            "target_trend": target_trend
+            "temporal": torch.from_numpy(self.temporal[ends[:, None] + self._window_offsets]),
+            "tabular": torch.from_numpy(self.tabular[ends]),
+            **self._text(self.text_rows[indices]),
+            "target_return": torch.from_numpy(self.target_return[ends]),
+            "target_volatility": torch.from_numpy(self.target_volatility[ends]),
+            "target_trend": torch.from_numpy(self.target_trend[ends]),
         }
 
+class StreamingMarketDataset(IterableDataset):
+    """
+    Out-of-core counterpart of MarketDataset: streams ticker-partitioned shards (src.data.shards)
+    one at a time, normalizes each with the schema and yields whole batches, so memory is one
+    shard regardless of how much history there is. Shards are split over distributed ranks by
+    batch count (largest first, to the rank with the fewest batches), then over each rank's
+    DataLoader workers the same way, so each is read by exactly one worker per epoch. Ranks with
+    fewer batches repeat some of their own until every rank yields the same number, since DDP
+    hangs when one rank stops joining the gradient all-reduce. Shuffling permutes shard order and
+    samples within a shard.
+    """
+
+    def __init__(self, shard_dir, manifest, feature_schema, tickers=None, token_store=None, text_embeddings=None,
+                 batch_size=32, shuffle=False, seed=0):
+        self.shard_dir = shard_dir
+        self.schema = feature_schema
+        self.window_size = feature_schema.window_size
+        self.tickers = None if tickers is None else set(tickers)
+        self.token_store = token_store
+        self.text_embeddings = text_embeddings
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        # Only shards holding at least one of the tickers
+        self.shards = [s for s in manifest["shards"] if self.tickers is None or self.tickers.intersection(s["tickers"])]
+        self.columns = list(dict.fromkeys(feature_schema.temporal_features + feature_schema.tabular_features
+                                          + manifest["target_columns"]))
+        self._window_offsets = np.arange(1 - self.window_size, 1, dtype=np.int64)
+
+    def shard_batches(self, shard):
+        """Batches _shard_batches yields for a shard, from the manifest's per-ticker row counts."""
+        window = self.window_size
+        samples = sum(max(0, count - window + 1) for t, count in zip(shard["tickers"], shard["counts"])
+                      if self.tickers is None or t in self.tickers)
+        return -(-samples // self.batch_size)
+
+    @staticmethod
+    def balance(sizes, bins):
+        """Greedy split of item indices into `bins` by size (largest first); deterministic on every rank."""
+        groups, totals = [[] for _ in range(bins)], [0] * bins
+        for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i], i)):
+            b = min(range(bins), key=lambda b: (totals[b], b))
+            groups[b].append(i)
+            totals[b] += sizes[i]
+        return groups, totals
+
+    def _assignment(self):
+        """
+        (this reader's slot, shards it owns, padding batches it adds) across DataLoader workers and
+        distributed ranks. Worker 0 of each rank pads the rank up to the largest rank's batch count.
+        """
+        worker = get_worker_info()
+        num_workers, worker_id = (worker.num_workers, worker.id) if worker is not None else (1, 0)
+        if torch.distributed.is_available() and torch.distributed.is_initialized():
+            rank, world_size = torch.distributed.get_rank(), torch.distributed.get_world_size()
+        else:
+            rank, world_size = 0, 1
+        slot = rank * num_workers + worker_id
+        sizes = [self.shard_batches(s) for s in self.shards]
+        rank_groups, rank_totals = self.balance(sizes, world_size)
+        mine = rank_groups[rank]
+        worker_groups, _ = self.balance([sizes[i] for i in mine], num_workers)
+        shards = [self.shards[mine[j]] for j in worker_groups[worker_id]]
+        padding = max(rank_totals) - rank_totals[rank] if worker_id == 0 else 0
+        # A rank without batches of its own pads from every shard
+        pad_from = [self.shards[i] for i in mine if sizes[i]] or [s for s, n in zip(self.shards, sizes) if n]
+        return slot, shards, padding, pad_from
+
+    def _shard_batches(self, shard, rng):
+        tickers, counts, data = read_shard(self.shard_dir, shard, self.columns)
+        frame = pd.DataFrame(data, copy=False)
+        frame['ticker'] = np.repeat(tickers, counts)
+        store = FeatureStore.build(frame, self.schema)
+        ends, owners = store.sample_ends([t for t in tickers if self.tickers is None or t in self.tickers])
+        rows_by_ticker = {t: self.token_store.row(t) for t in set(owners)}
+        text_rows = np.array([rows_by_ticker[t] for t in owners], dtype=np.int64)
+        order = rng.permutation(len(ends)) if self.shuffle else np.arange(len(ends))
+        for i in range(0, len(order), self.batch_size):
+            idx = order[i:i + self.batch_size]
+            batch_ends = ends[idx]
+            yield {
+                "temporal": torch.from_numpy(store.temporal[batch_ends[:, None] + self._window_offsets]),
+                "tabular": torch.from_numpy(store.tabular[batch_ends]),
+                **text_inputs(self.token_store, self.text_embeddings, text_rows[idx]),
+                "target_return": torch.from_numpy(store.target_return[batch_ends]),
+                "target_volatility": torch.from_numpy(store.target_volatility[batch_ends]),
+                "target_trend": torch.from_numpy(store.target_trend[batch_ends]),
+            }
+
+    def __iter__(self):
+        slot, shards, padding, pad_from = self._assignment()
+        # Differs per epoch: the DataLoader draws a new base seed for fresh workers, and the
+        # epoch counter advances in the main process and in persistent workers
+        worker = get_worker_info()
+        base_seed = worker.seed - worker.id if worker is not None else 0
+        rng = np.random.default_rng([self.seed, self.epoch, base_seed % (2 ** 32), slot])
+        self.epoch += 1
+        if self.shuffle:
+            shards = [shards[i] for i in rng.permutation(len(shards))]
+        for shard in shards:
+            yield from self._shard_batches(shard, rng)
+        while padding > 0 and pad_from:
+            for shard in pad_from:
+                for batch in self._shard_batches(shard, rng):
+                    if padding == 0:
+                        return
+                    padding -= 1
+                    yield batch
+
+
 class FinancialDataModule(L.LightningDataModule):
-    def __init__(self, csv_path, json_path, window_size=5, batch_size=32, num_workers=0, persistent_workers=False):
+    def __init__(self, csv_path, json_path, window_size=5, batch_size=32, num_workers=0, persistent_workers=False,
+                 text_cache=False, streaming=False, shard_dir=None):
         super().__init__()
         self.csv_path = csv_path
         self.json_path = json_path
@@ -122,27 +236,67 @@ class FinancialDataModule(L.LightningDataModule):
         self.batch_size = batch_size
         self.num_workers = num_workers
         self.persistent_workers = persistent_workers
+        # Precompute frozen-BERT [CLS] per transcript once (cached on disk) instead of running BERT every step
+        self.text_cache = text_cache
+        self.text_embeddings = None
+        # Stream ticker-partitioned shards instead of loading the whole CSV (bounded memory)
+        self.streaming = streaming
+        self.shard_dir = shard_dir
+        self.train_dataset = None
+        self.val_dataset = None
+        self.feature_store = None
+        self.feature_schema = None
 
     def setup(self, stage=None):
-        df = pd.read_csv(self.csv_path)
-        with open(self.json_path, 'r') as f:
-            narratives = json.load(f)
+        if self.train_dataset is not None:
+            return
+        # One token store for both splits, persisted next to narratives.json
+        token_store = load_narrative_store(self.json_path)
+        if self.text_cache:
+            self.text_embeddings = load_cls_embeddings(self.json_path, token_store)
+        if self.streaming:
+            self._setup_streaming(token_store)
+            return
             
-        # Split by ticker for simple train/val split
-        tickers = df['ticker'].unique()
-        train_tickers = tickers[:4]
-        val_tickers = tickers[4:]
+        df = load_market_frame(self.csv_path)
+        # Both splits are normalized with the training stats, exactly as serving will be: the
+        # versioned feature store for (data, schema) is materialized once and mapped afterwards
+        self.feature_store = load_feature_store(self.csv_path, training_schema(df, self.window_size))
+        self.feature_schema = self.feature_store.schema
+        train_tickers, val_tickers = split_tickers(self.feature_store.tickers)
         
-        train_df = df[df['ticker'].isin(train_tickers)].reset_index(drop=True)
-        val_df = df[df['ticker'].isin(val_tickers)].reset_index(drop=True)
+        self.train_dataset = MarketDataset.from_store(self.feature_store, train_tickers, token_store=token_store,
+                                                      text_embeddings=self.text_embeddings)
+        self.val_dataset = MarketDataset.from_store(self.feature_store, val_tickers, token_store=token_store,
+                                                    text_embeddings=self.text_embeddings)
+
+    def _setup_streaming(self, token_store):
+        # Shards are written once per CSV version by a chunked pass; stats come from a Welford
+        # pass over the training tickers' shards, so nothing ever holds the whole history
+        shard_dir, manifest = load_shards(self.csv_path, self.shard_dir)
+        tickers = [t for shard in manifest["shards"] for t in shard["tickers"]]
+        train_tickers, val_tickers = split_tickers(tickers)
+        self.feature_schema = streaming_schema(shard_dir, manifest, train_tickers, self.window_size)
+        print(f"Streaming {len(manifest['shards'])} shards ({manifest['rows']} rows, {len(tickers)} tickers) from {shard_dir}")
         
-        self.train_dataset = MarketDataset(train_df, narratives, window_size=self.window_size)
-        self.val_dataset = MarketDataset(val_df, narratives, window_size=self.window_size)
+        self.train_dataset = StreamingMarketDataset(shard_dir, manifest, self.feature_schema, train_tickers, token_store=token_store,
+                                                    text_embeddings=self.text_embeddings, batch_size=self.batch_size, shuffle=True)
+        self.val_dataset = StreamingMarketDataset(shard_dir, manifest, self.feature_schema, val_tickers, token_store=token_store,
+                                                  text_embeddings=self.text_embeddings, batch_size=self.batch_size)
 
-    def train_dataloader(self):
-        return DataLoader(self.train_dataset, batch_size=self.batch_size, shuffle=True, 
+    def _dataloader(self, dataset, shuffle):
+        if isinstance(dataset, IterableDataset):
+            # The dataset yields whole batches and splits shards across workers itself
+            return DataLoader(dataset, batch_size=None, num_workers=self.num_workers,
+                              persistent_workers=self.persistent_workers)
+        # The sampler yields whole index batches, so each fetch is one MarketDataset.get_batch
+        # gather instead of batch_size __getitem__ calls plus a collate
+        sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+        return DataLoader(dataset, sampler=BatchSampler(sampler, self.batch_size, drop_last=False), batch_size=None,
                           num_workers=self.num_workers, persistent_workers=self.persistent_workers)
 
+    def train_dataloader(self):
+        return self._dataloader(self.train_dataset, shuffle=True)
+
     def val_dataloader(self):
-        return DataLoader(self.val_dataset, batch_size=self.batch_size, 
-                          num_workers=self.num_workers, persistent_workers=self.persistent_workers)
+        return self._dataloader(self.val_dataset, shuffle=False)
@@ -0,0 +1,275 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.data.features import FeatureSchema
+from src.data.snapshot import load_market_frame, source_signature
+
+STORE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+TARGET_COLUMNS = {"target_return": "return_5d_forward", "target_volatility": "volatility_5d", "target_trend": "trend_label"}
+ARRAYS = ("temporal", "tabular") + tuple(TARGET_COLUMNS)
+
+
+def feature_store_dir_for(csv_path):
+    """Default store location: <csv dir>/cache/feature_store/<csv stem>, one subdirectory per version."""
+    base_dir = os.path.dirname(os.path.abspath(csv_path))
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(base_dir, "cache", "feature_store", stem)
+
+
+def store_version(source, schema):
+    """Content id of a store: the data it was built from and the schema (features + stats) it applies."""
+    key = json.dumps({"format": STORE_FORMAT, "source": source, "schema": schema.to_dict()}, sort_keys=True)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def normalized_block(df, columns, schema):
+    """Z-scored float32 (rows, len(columns)) block with the schema's stats; absent columns and NaN/inf are 0."""
+    block = np.zeros((len(df), len(columns)), dtype=np.float32)
+    for i, col in enumerate(columns):
+        if col in df.columns:
+            values = df[col].to_numpy(dtype=np.float64)
+            block[:, i] = (values - schema.means.get(col, 0.0)) / schema.stds.get(col, 1.0)
+    np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return block
+
+
+class FeatureStore:
+    """
+    One data version's model inputs, normalized once with one FeatureSchema: temporal (rows, F)
+    and tabular (rows, T) float32 blocks plus the targets, with rows grouped by ticker (original
+    order inside each group, as in TickerIndex). A sample's temporal window is the contiguous
+    slice ending at its row, so windows are views, never copies.
+    """
+
+    def __init__(self, schema, offsets, arrays, version=None, source=None):
+        self.schema = schema
+        self.offsets = dict(offsets)
+        self.temporal = arrays["temporal"]
+        self.tabular = arrays["tabular"]
+        self.target_return = arrays["target_return"]
+        self.target_volatility = arrays["target_volatility"]
+        self.target_trend = arrays["target_trend"]
+        self.version = version
+        self.source = source
+
+    @classmethod
+    def build(cls, df, schema, source=None):
+        """Materializes a cleaned frame; targets the frame lacks are NaN (trend -1)."""
+        codes, uniques = pd.factorize(df['ticker'], sort=False)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+        offsets = {str(t): (int(bounds[i]), int(bounds[i + 1])) for i, t in enumerate(uniques)}
+
+        ordered = df.iloc[order]
+        arrays = {
+            "temporal": normalized_block(ordered, schema.temporal_features, schema),
+            "tabular": normalized_block(ordered, schema.tabular_features, schema),
+        }
+        for name, col in TARGET_COLUMNS.items():
+            dtype = np.int64 if name == "target_trend" else np.float32
+            if col in ordered.columns:
+                arrays[name] = ordered[col].to_numpy(dtype=dtype)
+            else:
+                arrays[name] = np.full(len(ordered), -1 if dtype == np.int64 else np.nan, dtype=dtype)
+        version = store_version(source, schema) if source is not None else None
+        return cls(schema, offsets, arrays, version=version, source=source)
+
+    @property
+    def tickers(self):
+        return list(self.offsets.keys())
+
+    @property
+    def rows(self):
+        return len(self.temporal)
+
+    def __contains__(self, ticker):
+        return ticker in self.offsets
+
+    def sample_ends(self, tickers=None):
+        """
+        Row of every full-window sample (in store order) for `tickers` (default: all), plus the
+        ticker of each sample. Tickers with less history than the window have no samples.
+        """
+        window = self.schema.window_size
+        ends, owners = [], []
+        for ticker in (self.tickers if tickers is None else tickers):
+            bounds = self.offsets.get(ticker)
+            if bounds is None or bounds[1] - bounds[0] < window:
+                continue
+            ends.append(np.arange(bounds[0] + window - 1, bounds[1], dtype=np.int64))
+            owners.extend([ticker] * (bounds[1] - bounds[0] - window + 1))
+        return (np.concatenate(ends) if ends else np.zeros(0, dtype=np.int64)), owners
+
+    def save(self, out_dir):
+        """
+        Writes the arrays and the manifest (schema, stats, ticker offsets) into a temporary
+        directory renamed to out_dir at the end; versions are content ids, so a version
+        directory is never rewritten in place.
+        """
+        tmp_dir = f"{out_dir}.tmp{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        manifest = {
+            "format": STORE_FORMAT,
+            "version": self.version,
+            "source": self.source,
+            "rows": self.rows,
+            "schema": self.schema.to_dict(),
+            "offsets": [[t, start, stop] for t, (start, stop) in self.offsets.items()],
+            "created_at": time.time(),
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+        try:
+            os.replace(tmp_dir, out_dir)
+        except OSError:
+            # Another process published the same version first; its content is identical
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return manifest
+
+    @classmethod
+    def open(cls, out_dir, manifest):
+        arrays = {}
+        for name in ARRAYS:
+            # Copy-on-write mapping: pages are shared and never written back, but the arrays stay
+            # writable so torch.from_numpy can hand out views; asarray drops the np.memmap subclass
+            arrays[name] = np.asarray(np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode='c', allow_pickle=False))
+            if arrays[name].shape[0] != manifest["rows"]:
+                raise ValueError(f"Feature store in {out_dir} has {arrays[name].shape[0]} {name} rows, manifest says {manifest['rows']}")
+        schema = FeatureSchema.from_dict(manifest["schema"])
+        schema.source = "feature_store"
+        offsets = {t: (start, stop) for t, start, stop in manifest["offsets"]}
+        return cls(schema, offsets, arrays, version=manifest["version"], source=manifest["source"])
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "tickers": len(self.offsets),
+            "rows": self.rows,
+            "bytes": int(sum(getattr(self, name).nbytes for name in ARRAYS)),
+            **self.schema.describe(),
+        }
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != STORE_FORMAT:
+        return None
+    return manifest
+
+
+def prune_stale_versions(store_root, source):
+    """Drops versions built from an older state of the CSV (open mmaps keep their pages alive)."""
+    for name in os.listdir(store_root):
+        path = os.path.join(store_root, name)
+        if not os.path.isdir(path) or ".tmp" in name:
+            continue
+        try:
+            manifest = read_manifest(path)
+        except (OSError, ValueError):
+            manifest = None
+        if manifest is None or manifest.get("source") != source:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# Process-wide: every loader in the process shares one store per (data, schema) version. Versions
+# of an older CSV state are evicted as soon as a newer one is loaded, and at most MAX_OPEN_STORES
+# stay cached (LRU); evicted stores stay mapped for as long as someone still holds them.
+MAX_OPEN_STORES = 4
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def _cache_store(out_dir, store):
+    store_root = os.path.dirname(out_dir)
+    for key in [k for k, s in _stores.items() if os.path.dirname(k) == store_root and s.source != store.source]:
+        del _stores[key]
+    _stores[out_dir] = store
+    _stores.move_to_end(out_dir)
+    while len(_stores) > MAX_OPEN_STORES:
+        _stores.popitem(last=False)
+
+
+def load_feature_store(csv_path, schema=None, store_root=None, window_size=5, refresh=True):
+    """
+    Feature store of market_data.csv under `schema` (default: a schema fitted on the whole frame).
+    Returns the in-process store, else maps the persisted version, and only normalizes the frame
+    (then persists it, with refresh) when this data/schema pair has never been materialized.
+    """
+    store_root = store_root or feature_store_dir_for(csv_path)
+    source = source_signature(csv_path)
+    df = None
+    if schema is None:
+        df = load_market_frame(csv_path)
+        schema = FeatureSchema.from_frame(df, window_size)
+    version = store_version(source, schema)
+    out_dir = os.path.join(store_root, version)
+
+    with _stores_lock:
+        store = _stores.get(out_dir)
+        if store is not None:
+            _stores.move_to_end(out_dir)
+            return store
+
+        try:
+            manifest = read_manifest(out_dir)
+            if manifest is not None and manifest.get("source") == source:
+                store = FeatureStore.open(out_dir, manifest)
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable feature store in {out_dir}: {e}")
+
+        if store is None:
+            df = df if df is not None else load_market_frame(csv_path)
+            store = FeatureStore.build(df, schema, source=source)
+            print(f"Materialized feature store {version}: {len(store.offsets)} tickers, {store.rows} rows")
+            if refresh:
+                try:
+                    os.makedirs(store_root, exist_ok=True)
+                    prune_stale_versions(store_root, source)
+                    store.save(out_dir)
+                except OSError as e:
+                    print(f"WARNING: Could not write feature store to {out_dir}: {e}")
+
+        _cache_store(out_dir, store)
+        return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize normalized model inputs of market_data.csv into a memory-mappable feature store.")
+    parser.add_argument("--csv", type=str, default="market_data.csv", help="Path to market_data.csv.")
+    parser.add_argument("--out", type=str, default=None, help="Store root (default: <csv dir>/cache/feature_store/<stem>).")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Use this checkpoint's feature schema (default: training split stats).")
+    parser.add_argument("--window", type=int, default=5, help="Temporal window size (default: 5).")
+    args = parser.parse_args()
+
+    if args.checkpoint:
+        import torch
+        hparams = torch.load(args.checkpoint, map_location="cpu")["hyper_parameters"]
+        schema = FeatureSchema.from_dict(hparams.get("feature_schema"))
+        if schema is None:
+            parser.error("checkpoint has no feature schema")
+    else:
+        from src.data.datamodule import training_schema
+        schema = training_schema(load_market_frame(args.csv), args.window)
+
+    store = load_feature_store(args.csv, schema, store_root=args.out)
+    print(json.dumps(store.describe(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import numpy as np
+
+from src.data.ticker_index import TEMPORAL_FEATURES, tabular_columns_for
+
+SCHEMA_VERSION = 1
+
+
+def feature_stats(df, columns):
+    """Z-score stats exactly as MarketDataset applies them: column mean/std, std 0/NaN -> 1, mean NaN -> 0."""
+    means = {}
+    stds = {}
+    for col in columns:
+        mean = float(df[col].mean())
+        std = float(df[col].std())
+        means[col] = 0.0 if np.isnan(mean) else mean
+        stds[col] = 1.0 if (std == 0 or np.isnan(std)) else std
+    return means, stds
+
+
+class FeatureSchema:
+    """
+    Names, order and normalization stats of the model's numeric inputs. Saved with the checkpoint
+    (hparams["feature_schema"]), so serving selects columns by name and normalizes with the
+    training stats instead of truncating/padding by position.
+    """
+
+    def __init__(self, temporal_features, tabular_features, means, stds, window_size=5, source="checkpoint"):
+        self.temporal_features = list(temporal_features)
+        self.tabular_features = list(tabular_features)
+        self.means = {k: float(v) for k, v in means.items()}
+        self.stds = {k: float(v) for k, v in stds.items()}
+        self.window_size = int(window_size)
+        self.source = source
+
+    @property
+    def temporal_dim(self):
+        return len(self.temporal_features)
+
+    @property
+    def tabular_dim(self):
+        return len(self.tabular_features)
+
+    def to_dict(self):
+        return {
+            "version": SCHEMA_VERSION,
+            "temporal_features": self.temporal_features,
+            "tabular_features": self.tabular_features,
+            "means": self.means,
+            "stds": self.stds,
+            "window_size": self.window_size,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data or data.get("version") != SCHEMA_VERSION:
+            return None
+        return cls(data["temporal_features"], data["tabular_features"], data["means"], data["stds"],
+                   data.get("window_size", 5))
+
+    @classmethod
+    def from_frame(cls, df, window_size=5, source="data"):
+        """Schema fitted on a (cleaned, training) frame: every temporal/tabular column and its stats."""
+        tabular = tabular_columns_for(df.columns)
+        means, stds = feature_stats(df, TEMPORAL_FEATURES + tabular)
+        return cls(TEMPORAL_FEATURES, tabular, means, stds, window_size, source=source)
+
+    @classmethod
+    def for_legacy_checkpoint(cls, df, tabular_dim, window_size=5):
+        """
+        Best-effort schema for checkpoints saved before schemas existed: the first `tabular_dim`
+        tabular columns (the old positional pruning, now by name) and stats from the full frame.
+        Names the data doesn't have become zero inputs.
+        """
+        tabular = tabular_columns_for(df.columns)[:tabular_dim]
+        tabular += [f"__missing_{i}" for i in range(tabular_dim - len(tabular))]
+        present = [c for c in TEMPORAL_FEATURES + tabular if c in df.columns]
+        means, stds = feature_stats(df, present)
+        return cls(TEMPORAL_FEATURES, tabular, means, stds, window_size, source="legacy")
+
+    def describe(self):
+        return {
+            "source": self.source,
+            "temporal": self.temporal_dim,
+            "tabular": self.tabular_dim,
+            "window_size": self.window_size,
+        }
+
+
+class ModelInputs:
+    """
+    Final, normalized model inputs of every ticker in a FeatureStore, built once per (data, model schema):
+    temporal (N, window, F_temporal) and tabular (N, F_tabular) as contiguous float32 batches.
+    A prediction is an index into them; a batch is one fancy-index gather.
+    """
+
+    def __init__(self, tickers, temporal, tabular, schema):
+        self.index = {t: i for i, t in enumerate(tickers)}
+        self.temporal = temporal
+        self.tabular = tabular
+        self.schema = schema
+
+    @classmethod
+    def from_store(cls, store):
+        """Last window and snapshot row of every ticker in a FeatureStore (already normalized with its schema)."""
+        tickers = store.tickers
+        window = store.schema.window_size
+        bounds = np.array([store.offsets[t] for t in tickers], dtype=np.int64).reshape(-1, 2)
+        positions = bounds[:, 1:2] - window + np.arange(window)
+        # Tickers with less history than the window keep zero rows in front (padding, not data)
+        valid = positions >= bounds[:, 0:1]
+        temporal = store.temporal[np.where(valid, positions, 0)]
+        temporal[~valid] = 0.0
+        tabular = store.tabular[bounds[:, 1] - 1]
+        return cls(tickers, np.ascontiguousarray(temporal), np.ascontiguousarray(tabular), store.schema)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def get(self, ticker):
+        """(temporal, tabular) tensors with a batch dimension of 1 (views, no copies)."""
+        import torch
+        i = self.index[ticker]
+        return torch.from_numpy(self.temporal[i:i + 1]), torch.from_numpy(self.tabular[i:i + 1])
+
+    def rows(self, tickers):
+        import torch
+        rows = [self.index[t] for t in tickers]
+        return torch.from_numpy(self.temporal[rows]), torch.from_numpy(self.tabular[rows])
+
+    def stats(self):
+        return {
+            **self.schema.describe(),
+            "tickers": len(self.index),
+            "bytes": int(self.temporal.nbytes + self.tabular.nbytes),
+        }
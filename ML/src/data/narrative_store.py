@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from src.data.snapshot import source_signature
+from src.models.bundle import FINBERT_MODEL_NAME, pretrained_source
+
+STORE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+DEFAULT_MAX_LENGTH = 64
+
+
+def store_dir_for(json_path):
+    """Default store location: <json dir>/cache/narrative_tokens/<json stem>."""
+    base_dir = os.path.dirname(os.path.abspath(json_path))
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    return os.path.join(base_dir, "cache", "narrative_tokens", stem)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def index_key(ticker, date=None):
+    ticker = str(ticker).strip().upper()
+    return f"{ticker}|{date}" if date else ticker
+
+
+def load_tokenizer(tokenizer_name=FINBERT_MODEL_NAME):
+    """FinBERT tokenizer from the local bundle when present; only needed to (re)build a store."""
+    from transformers import AutoTokenizer
+    source, load_kwargs = pretrained_source(tokenizer_name)
+    return AutoTokenizer.from_pretrained(source, **load_kwargs)
+
+
+def tokenize(tokenizer, texts, max_length=DEFAULT_MAX_LENGTH):
+    """Same settings as training: special tokens, fixed max_length padding, truncation."""
+    encoding = tokenizer(
+        list(texts),
+        add_special_tokens=True,
+        max_length=max_length,
+        padding='max_length',
+        truncation=True,
+        return_attention_mask=True,
+        return_tensors='np'
+    )
+    return encoding['input_ids'].astype(np.int32), encoding['attention_mask'].astype(np.int8)
+
+
+class NarrativeTokenStore:
+    """
+    Narratives tokenized once into contiguous input_ids / attention_mask arrays, one row per
+    distinct transcript (row 0 is the empty transcript used for unknown tickers), indexed by
+    ticker and by ticker|date for narratives that carry a date. Later narratives for the same
+    key win, as in MarketDataset's {ticker: narrative} dict.
+    """
+
+    def __init__(self, input_ids, attention_mask, text_hashes, index, max_length=DEFAULT_MAX_LENGTH):
+        self.input_ids = input_ids
+        self.attention_mask = attention_mask
+        self.text_hashes = list(text_hashes)
+        self.index = dict(index)
+        self.max_length = max_length
+        self._rows_by_hash = {h: i for i, h in enumerate(self.text_hashes)}
+
+    @classmethod
+    def build(cls, narratives, tokenizer, max_length=DEFAULT_MAX_LENGTH):
+        texts = [""]
+        rows_by_hash = {text_hash(""): 0}
+        index = {}
+        for item in narratives:
+            text = item.get("transcript", "") or ""
+            key = text_hash(text)
+            row = rows_by_hash.get(key)
+            if row is None:
+                row = rows_by_hash[key] = len(texts)
+                texts.append(text)
+            index[index_key(item["ticker"])] = row
+            if item.get("date"):
+                index[index_key(item["ticker"], item["date"])] = row
+        input_ids, attention_mask = tokenize(tokenizer, texts, max_length)
+        return cls(input_ids, attention_mask, [text_hash(t) for t in texts], index, max_length)
+
+    def __len__(self):
+        return len(self.text_hashes)
+
+    def row(self, ticker, date=None):
+        """Row for (ticker, date), falling back to the ticker's latest narrative, then to row 0."""
+        if date is not None:
+            row = self.index.get(index_key(ticker, date))
+            if row is not None:
+                return row
+        return self.index.get(index_key(ticker), 0)
+
+    def get(self, ticker, date=None):
+        """(input_ids, attention_mask) long tensors of shape (max_length,) for one ticker."""
+        import torch
+        row = self.row(ticker, date)
+        # astype copies out of the read-only mapping and widens to what the embedding expects
+        return (torch.from_numpy(self.input_ids[row].astype(np.int64)),
+                torch.from_numpy(self.attention_mask[row].astype(np.int64)))
+
+    def encode(self, texts, tokenizer=None):
+        """
+        Batched (input_ids, attention_mask) for arbitrary texts: stored rows for known transcripts,
+        the tokenizer only for texts the store has never seen.
+        """
+        import torch
+        rows = [self._rows_by_hash.get(text_hash(t)) for t in texts]
+        if all(r is not None for r in rows):
+            ids, mask = self.input_ids[rows], self.attention_mask[rows]
+        elif tokenizer is None:
+            raise KeyError("Text not in the narrative token store and no tokenizer to encode it")
+        else:
+            ids, mask = tokenize(tokenizer, texts, self.max_length)
+        return torch.from_numpy(ids.astype(np.int64)), torch.from_numpy(mask.astype(np.int64))
+
+    def save(self, out_dir, source=None):
+        """Arrays into a fresh data dir, manifest swapped in last (same layout as the market snapshot)."""
+        tag = hashlib.sha1(json.dumps(source or {}, sort_keys=True).encode()).hexdigest()[:12]
+        data_name = f"data-{tag}-{os.getpid()}"
+        data_dir = os.path.join(out_dir, data_name)
+        os.makedirs(data_dir, exist_ok=True)
+        np.save(os.path.join(data_dir, "input_ids.npy"), np.ascontiguousarray(self.input_ids))
+        np.save(os.path.join(data_dir, "attention_mask.npy"), np.ascontiguousarray(self.attention_mask))
+
+        manifest = {
+            "format": STORE_FORMAT,
+            "rows": len(self),
+            "max_length": self.max_length,
+            "data_dir": data_name,
+            "source": source,
+            "text_hashes": self.text_hashes,
+            "index": self.index,
+        }
+        manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        tmp_path = manifest_path + f".tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+        for name in os.listdir(out_dir):
+            if name.startswith("data-") and name != data_name:
+                shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+        return manifest
+
+    @classmethod
+    def open(cls, out_dir, manifest):
+        data_dir = os.path.join(out_dir, manifest["data_dir"])
+        input_ids = np.load(os.path.join(data_dir, "input_ids.npy"), mmap_mode='r', allow_pickle=False)
+        attention_mask = np.load(os.path.join(data_dir, "attention_mask.npy"), mmap_mode='r', allow_pickle=False)
+        if input_ids.shape[0] != manifest["rows"]:
+            raise ValueError(f"Token store in {out_dir} has {input_ids.shape[0]} rows, manifest says {manifest['rows']}")
+        return cls(np.asarray(input_ids), np.asarray(attention_mask), manifest["text_hashes"],
+                   manifest["index"], manifest["max_length"])
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != STORE_FORMAT:
+        return None
+    return manifest
+
+
+def store_source(json_path, tokenizer_name=FINBERT_MODEL_NAME, max_length=DEFAULT_MAX_LENGTH):
+    """What a store was built from: the narratives file, the tokenizer location and max_length."""
+    source, _ = pretrained_source(tokenizer_name)
+    return {"narratives": source_signature(json_path), "tokenizer": source, "max_length": max_length}
+
+
+# Process-wide: every loader in the process shares one store per narratives file
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def load_narrative_store(json_path, tokenizer=None, store_dir=None, max_length=DEFAULT_MAX_LENGTH,
+                         tokenizer_name=FINBERT_MODEL_NAME, refresh=True):
+    """
+    Token store for narratives.json. Returns the in-process store while the file is unchanged,
+    else maps the persisted one, and only rebuilds (tokenizing every transcript once, with the
+    given tokenizer or a freshly loaded one) when the narratives, tokenizer or max_length changed.
+    """
+    store_dir = store_dir or store_dir_for(json_path)
+    source = store_source(json_path, tokenizer_name, max_length)
+    with _stores_lock:
+        cached = _stores.get(store_dir)
+        if cached is not None and cached[0] == source:
+            return cached[1]
+
+        store = None
+        try:
+            manifest = read_manifest(store_dir)
+            if manifest is not None and manifest.get("source") == source:
+                store = NarrativeTokenStore.open(store_dir, manifest)
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable narrative token store in {store_dir}: {e}")
+
+        if store is None:
+            with open(json_path, "r") as f:
+                narratives = json.load(f)
+            store = NarrativeTokenStore.build(narratives, tokenizer or load_tokenizer(tokenizer_name), max_length)
+            print(f"Tokenized {len(narratives)} narratives into {len(store)} rows")
+            if refresh:
+                try:
+                    store.save(store_dir, source=source)
+                except OSError as e:
+                    print(f"WARNING: Could not write narrative token store to {store_dir}: {e}")
+
+        _stores[store_dir] = (source, store)
+        return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-tokenize narratives.json into a memory-mappable token store.")
+    parser.add_argument("--json", type=str, default="narratives.json", help="Path to narratives.json.")
+    parser.add_argument("--out", type=str, default=None, help="Store directory (default: <json dir>/cache/narrative_tokens/<stem>).")
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH, help="Token sequence length (default: 64).")
+    args = parser.parse_args()
+
+    store = load_narrative_store(args.json, store_dir=args.out, max_length=args.max_length)
+    print(f"Token store for {args.json}: {len(store)} rows, {len(store.index)} keys, max_length={store.max_length}")
+
+
+if __name__ == "__main__":
+    main()
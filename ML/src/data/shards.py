@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+    pq = None
+
+from src.data.features import FeatureSchema
+from src.data.snapshot import source_signature
+from src.data.ticker_index import TEMPORAL_FEATURES, tabular_columns_for
+
+SHARD_FORMAT = 2
+MANIFEST_NAME = "manifest.json"
+SHARD_FORMATS = ("npz", "parquet")
+TARGET_COLUMNS = ("return_5d_forward", "volatility_5d", "trend_label")
+DEFAULT_TICKERS_PER_SHARD = 64
+DEFAULT_CHUNKSIZE = 200_000
+
+
+def shard_dir_for(csv_path):
+    """Default shard location: <csv dir>/cache/shards/<csv stem>."""
+    base_dir = os.path.dirname(os.path.abspath(csv_path))
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(base_dir, "cache", "shards", stem)
+
+
+def _clean_chunk(df):
+    """clean_market_frame's identifier cleanup; gaps are filled per ticker once its rows are complete."""
+    df.columns = [str(c).lower() for c in df.columns]
+    df['ticker'] = df['ticker'].astype(str).str.strip().str.upper()
+    return df
+
+
+def _fill_gaps(df):
+    """ffill -> bfill -> 0 within each ticker (shards hold whole tickers, so nothing leaks across them)."""
+    columns = df.columns.drop('ticker')
+    df[columns] = df.groupby('ticker', sort=False)[columns].ffill()
+    df[columns] = df.groupby('ticker', sort=False)[columns].bfill()
+    return df.fillna(0)
+
+
+class ShardWriter:
+    """Accumulates complete tickers and flushes them as one shard every `tickers_per_shard` tickers."""
+
+    def __init__(self, out_dir, columns, tickers_per_shard=DEFAULT_TICKERS_PER_SHARD, fmt="npz"):
+        if fmt == "parquet" and pq is None:
+            raise RuntimeError("Parquet shards need pyarrow, which is not installed")
+        self.out_dir = out_dir
+        self.columns = columns
+        self.tickers_per_shard = tickers_per_shard
+        self.fmt = fmt
+        self.pending = []
+        self.shards = []
+
+    def add(self, ticker_frame):
+        self.pending.append(ticker_frame)
+        if len(self.pending) >= self.tickers_per_shard:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        df = _fill_gaps(pd.concat(self.pending, ignore_index=True))
+        self.pending = []
+        codes, uniques = pd.factorize(df['ticker'], sort=False)
+        counts = np.bincount(codes, minlength=len(uniques))
+        names = [str(t) for t in uniques]
+        name = f"part-{len(self.shards):05d}.{self.fmt}"
+        path = os.path.join(self.out_dir, name)
+        if self.fmt == "parquet":
+            pq.write_table(pyarrow.Table.from_pandas(df[['ticker'] + self.columns], preserve_index=False), path)
+        else:
+            arrays = {col: df[col].to_numpy(dtype=np.float64) for col in self.columns}
+            np.savez(path, __tickers=np.asarray(names, dtype=str), __counts=counts.astype(np.int64), **arrays)
+        # Per-ticker rows let readers size their share of an epoch without opening the shard
+        self.shards.append({"file": name, "tickers": names, "counts": [int(c) for c in counts], "rows": int(len(df))})
+
+
+def write_shards(csv_path, out_dir, tickers_per_shard=DEFAULT_TICKERS_PER_SHARD, fmt="npz",
+                 chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Streams a ticker-grouped CSV in chunks into ticker-partitioned shards; memory stays at one
+    chunk plus one shard. Every shard holds whole tickers, so windows never span shards.
+    """
+    header = _clean_chunk(pd.read_csv(csv_path, nrows=0)).columns
+    temporal = list(TEMPORAL_FEATURES)
+    tabular = tabular_columns_for(header)
+    targets = [c for c in TARGET_COLUMNS if c in header]
+    columns = list(dict.fromkeys(temporal + tabular + targets))
+
+    tmp_dir = f"{out_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    writer = ShardWriter(tmp_dir, columns, tickers_per_shard, fmt)
+    seen = set()
+    current = None
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk = _clean_chunk(chunk)
+        # groupby would silently merge interleaved rows, so check for one run per ticker first
+        starts = chunk['ticker'][chunk['ticker'] != chunk['ticker'].shift()]
+        repeated = starts[starts.duplicated()]
+        if len(repeated):
+            raise ValueError(f"{csv_path} is not grouped by ticker ({repeated.iloc[0]} appears twice); sort it by ticker first")
+        for ticker, rows in chunk.groupby('ticker', sort=False):
+            if ticker != (current[0] if current else None):
+                if ticker in seen:
+                    raise ValueError(f"{csv_path} is not grouped by ticker ({ticker} appears twice); sort it by ticker first")
+                if current is not None:
+                    writer.add(pd.concat(current[1], ignore_index=True))
+                seen.add(ticker)
+                current = (ticker, [])
+            current[1].append(rows)
+    if current is not None:
+        writer.add(pd.concat(current[1], ignore_index=True))
+    writer.flush()
+
+    manifest = {
+        "format": SHARD_FORMAT,
+        "shard_format": fmt,
+        "source": source_signature(csv_path),
+        "temporal_features": temporal,
+        "tabular_features": tabular,
+        "target_columns": targets,
+        "shards": writer.shards,
+        "rows": sum(s["rows"] for s in writer.shards),
+        "created_at": time.time(),
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+    # The whole shard set is swapped in at once; readers of the old set keep their open files
+    old_dir = f"{out_dir}.old{os.getpid()}"
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SHARD_FORMAT:
+        return None
+    return manifest
+
+
+def load_shards(csv_path, out_dir=None, refresh=True, **write_kwargs):
+    """(shard dir, manifest) for the CSV; shards are rewritten only when the CSV changed."""
+    out_dir = out_dir or shard_dir_for(csv_path)
+    manifest = read_manifest(out_dir)
+    if manifest is not None and manifest.get("source") == source_signature(csv_path):
+        return out_dir, manifest
+    if not refresh:
+        raise FileNotFoundError(f"No up-to-date shards for {csv_path} in {out_dir}")
+    manifest = write_shards(csv_path, out_dir, **write_kwargs)
+    print(f"Wrote {len(manifest['shards'])} shards ({manifest['rows']} rows) to {out_dir}")
+    return out_dir, manifest
+
+
+def read_shard(out_dir, shard, columns):
+    """One shard -> (tickers, per-ticker row counts, {column: float64 array}); absent columns are NaN."""
+    path = os.path.join(out_dir, shard["file"])
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("Parquet shards need pyarrow, which is not installed")
+        df = pq.read_table(path).to_pandas()
+        tickers = list(pd.unique(df['ticker']))
+        counts = df.groupby('ticker', sort=False).size().reindex(tickers).to_numpy(dtype=np.int64)
+        data = {c: df[c].to_numpy(dtype=np.float64) if c in df.columns else np.full(len(df), np.nan) for c in columns}
+        return tickers, counts, data
+    with np.load(path, allow_pickle=False) as npz:
+        tickers = [str(t) for t in npz["__tickers"]]
+        counts = npz["__counts"]
+        rows = int(counts.sum())
+        data = {c: npz[c] if c in npz.files else np.full(rows, np.nan) for c in columns}
+    return tickers, counts, data
+
+
+class RunningStats:
+    """
+    Per-column mean / sample std over a stream of (rows, columns) blocks: Welford's update,
+    merged a block at a time (Chan et al.), so memory is one block regardless of row count.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count = 0
+        self.mean = np.zeros(len(self.columns), dtype=np.float64)
+        self.m2 = np.zeros(len(self.columns), dtype=np.float64)
+
+    def update(self, block):
+        n = len(block)
+        if n == 0:
+            return
+        block_mean = block.mean(axis=0)
+        block_m2 = ((block - block_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + block_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+    def stats(self):
+        """(means, stds) with feature_stats' conventions: std 0/NaN -> 1, mean NaN -> 0."""
+        means, stds = {}, {}
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.full(len(self.columns), np.nan)
+        for i, col in enumerate(self.columns):
+            mean = float(self.mean[i]) if self.count else float("nan")
+            means[col] = 0.0 if np.isnan(mean) else mean
+            stds[col] = 1.0 if (std[i] == 0 or np.isnan(std[i])) else float(std[i])
+        return means, stds
+
+
+def streaming_schema(out_dir, manifest, tickers=None, window_size=5):
+    """FeatureSchema fitted on `tickers` (default: all) in one streaming pass over the shards."""
+    temporal, tabular = manifest["temporal_features"], manifest["tabular_features"]
+    columns = list(dict.fromkeys(temporal + tabular))
+    wanted = None if tickers is None else set(tickers)
+    stats = RunningStats(columns)
+    for shard in manifest["shards"]:
+        if wanted is not None and not wanted.intersection(shard["tickers"]):
+            continue
+        shard_tickers, counts, data = read_shard(out_dir, shard, columns)
+        block = np.stack([data[c] for c in columns], axis=1) if columns else np.zeros((int(counts.sum()), 0))
+        if wanted is not None:
+            block = block[np.repeat([t in wanted for t in shard_tickers], counts)]
+        stats.update(block)
+    means, stds = stats.stats()
+    return FeatureSchema(temporal, tabular, means, stds, window_size, source="streaming")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream market_data.csv into ticker-partitioned shards for out-of-core training.")
+    parser.add_argument("--csv", type=str, default="market_data.csv", help="Path to the source CSV (rows grouped by ticker).")
+    parser.add_argument("--out", type=str, default=None, help="Shard directory (default: <csv dir>/cache/shards/<stem>).")
+    parser.add_argument("--tickers-per-shard", type=int, default=DEFAULT_TICKERS_PER_SHARD, help="Tickers per shard (default: 64).")
+    parser.add_argument("--format", type=str, default="npz", choices=SHARD_FORMATS, help="Shard file format (parquet needs pyarrow).")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="CSV rows read per chunk.")
+    args = parser.parse_args()
+
+    out_dir = args.out or shard_dir_for(args.csv)
+    manifest = write_shards(args.csv, out_dir, tickers_per_shard=args.tickers_per_shard, fmt=args.format,
+                            chunksize=args.chunksize)
+    print(f"Shards written to {out_dir}: {len(manifest['shards'])} shards, {manifest['rows']} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+# String columns with at most this share of distinct values are dictionary-encoded
+CATEGORY_MAX_RATIO = 0.5
+
+
+def snapshot_dir_for(csv_path):
+    """Default snapshot location: <csv dir>/cache/snapshots/<csv stem>."""
+    base_dir = os.path.dirname(os.path.abspath(csv_path))
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(base_dir, "cache", "snapshots", stem)
+
+
+def source_signature(path):
+    """Cheap identity of the source CSV (no hashing, so checks stay O(1) as the file grows)."""
+    stat = os.stat(path)
+    return {"path": os.path.basename(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def clean_market_frame(df):
+    """The cleanup every loader used to redo after read_csv: column case, identifiers, gaps."""
+    df.columns = [str(c).lower() for c in df.columns]
+    df = df.ffill().bfill().fillna(0)
+    if 'ticker' in df.columns:
+        df['ticker'] = df['ticker'].astype(str).str.strip().str.upper()
+    if 'date' in df.columns:
+        df['date'] = df['date'].astype(str)
+    return df
+
+
+def write_snapshot(df, out_dir, source=None):
+    """
+    Writes one .npy per column plus a schema manifest. Numeric columns are stored as-is,
+    low-cardinality strings as int32 codes + a categories array, other strings as fixed-width
+    unicode. Data goes into a fresh versioned directory and the manifest is swapped in last,
+    so concurrent readers see either the old or the new snapshot.
+    """
+    columns = []
+    tag = hashlib.sha1(json.dumps(source or {}, sort_keys=True).encode()).hexdigest()[:12]
+    data_name = f"data-{tag}-{os.getpid()}"
+    data_dir = os.path.join(out_dir, data_name)
+    os.makedirs(data_dir, exist_ok=True)
+
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        fname = f"{i:03d}"
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            values = series.to_numpy()
+            np.save(os.path.join(data_dir, f"{fname}.npy"), values)
+            columns.append({"name": col, "kind": "numeric", "dtype": values.dtype.str, "file": f"{fname}.npy"})
+            continue
+
+        values = series.astype(str).to_numpy(dtype=str)
+        codes, categories = pd.factorize(values, sort=True)
+        if len(values) and len(categories) <= CATEGORY_MAX_RATIO * len(values):
+            np.save(os.path.join(data_dir, f"{fname}.codes.npy"), codes.astype(np.int32))
+            np.save(os.path.join(data_dir, f"{fname}.categories.npy"), np.asarray(categories, dtype=str))
+            columns.append({
+                "name": col, "kind": "category", "dtype": "str",
+                "file": f"{fname}.codes.npy", "categories": f"{fname}.categories.npy",
+            })
+        else:
+            np.save(os.path.join(data_dir, f"{fname}.npy"), values)
+            columns.append({"name": col, "kind": "string", "dtype": values.dtype.str, "file": f"{fname}.npy"})
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "rows": int(len(df)),
+        "columns": columns,
+        "data_dir": data_name,
+        "source": source,
+        "cleaning": "ffill,bfill,fill0;ticker upper;lowercase columns",
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + f".tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    # Old data dirs can go: open mmaps keep their pages alive until readers drop them
+    for name in os.listdir(out_dir):
+        if name.startswith("data-") and name != data_name:
+            shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+    return manifest
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return manifest
+
+
+def read_snapshot(out_dir, manifest=None, mmap=True):
+    """Builds a DataFrame whose numeric columns and category codes are mmap views (no copies)."""
+    manifest = manifest or read_manifest(out_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {out_dir}")
+    data_dir = os.path.join(out_dir, manifest["data_dir"])
+    mmap_mode = 'r' if mmap else None
+
+    data = {}
+    for col in manifest["columns"]:
+        # asarray: plain ndarray view over the mapping, so results of ops aren't np.memmap
+        values = np.asarray(np.load(os.path.join(data_dir, col["file"]), mmap_mode=mmap_mode, allow_pickle=False))
+        if col["kind"] == "category":
+            categories = np.load(os.path.join(data_dir, col["categories"]), allow_pickle=False)
+            data[col["name"]] = pd.Categorical.from_codes(values, categories=categories.astype(str))
+        else:
+            data[col["name"]] = values
+    df = pd.DataFrame(data, copy=False)
+    if len(df) != manifest["rows"]:
+        raise ValueError(f"Snapshot in {out_dir} has {len(df)} rows, manifest says {manifest['rows']}")
+    return df
+
+
+def load_market_frame(csv_path, snapshot_dir=None, refresh=True):
+    """
+    Cleaned market data for any loader. Served from the mmap snapshot when it matches the CSV;
+    otherwise the CSV is parsed and cleaned once and (with refresh) the snapshot rebuilt.
+    """
+    snapshot_dir = snapshot_dir or snapshot_dir_for(csv_path)
+    source = source_signature(csv_path)
+    try:
+        manifest = read_manifest(snapshot_dir)
+        if manifest is not None and manifest.get("source") == source:
+            return read_snapshot(snapshot_dir, manifest)
+    except Exception as e:
+        print(f"WARNING: Ignoring unreadable snapshot in {snapshot_dir}: {e}")
+
+    df = clean_market_frame(pd.read_csv(csv_path))
+    if refresh:
+        try:
+            write_snapshot(df, snapshot_dir, source=source)
+            print(f"Wrote market data snapshot to {snapshot_dir}")
+        except OSError as e:
+            # Read-only deployments still work, just without the fast path
+            print(f"WARNING: Could not write snapshot to {snapshot_dir}: {e}")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert market_data.csv into a memory-mappable columnar snapshot.")
+    parser.add_argument("--csv", type=str, default="market_data.csv", help="Path to the source CSV.")
+    parser.add_argument("--out", type=str, default=None, help="Snapshot directory (default: <csv dir>/cache/snapshots/<stem>).")
+    args = parser.parse_args()
+
+    out_dir = args.out or snapshot_dir_for(args.csv)
+    df = clean_market_frame(pd.read_csv(args.csv))
+    manifest = write_snapshot(df, out_dir, source=source_signature(args.csv))
+    print(f"Snapshot written to {out_dir}: {manifest['rows']} rows, {len(manifest['columns'])} columns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Feature column lists shared with MarketDataset / train.py
+TEMPORAL_FEATURES = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr', 'ema_20']
+NON_TABULAR_COLUMNS = TEMPORAL_FEATURES + ['ticker', 'date', 'return_5d_forward', 'return_20d_forward', 'volatility_5d', 'trend_label', 'bb_middle']
+
+
+def tabular_columns_for(columns):
+    """Tabular features are every column that is not temporal, an identifier or a target."""
+    return [col for col in columns if col not in NON_TABULAR_COLUMNS]
+
+
+def _float_block(df, columns):
+    """Returns a contiguous float32 (rows, len(columns)) block; missing columns are zero-filled."""
+    block = np.zeros((len(df), len(columns)), dtype=np.float32)
+    for i, col in enumerate(columns):
+        if col in df.columns:
+            block[:, i] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+    np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return block
+
+
+class TickerSlice:
+    """Read-only view of a single ticker's rows inside a TickerIndex (no copies)."""
+    __slots__ = ("ticker", "temporal", "tabular", "dates", "close", "open")
+
+    def __init__(self, ticker, temporal, tabular, dates, close, open_):
+        self.ticker = ticker
+        self.temporal = temporal
+        self.tabular = tabular
+        self.dates = dates
+        self.close = close
+        self.open = open_
+
+    def __len__(self):
+        return len(self.close)
+
+    @classmethod
+    def from_frame(cls, df, ticker, temporal_columns=TEMPORAL_FEATURES, tabular_columns=()):
+        """Builds a standalone slice from an ad-hoc frame (e.g. the yfinance fallback history)."""
+        if 'date' in df.columns:
+            dates = df['date'].astype(str).to_numpy(dtype=object)
+        else:
+            dates = np.full(len(df), pd.Timestamp.now().isoformat(), dtype=object)
+        close = df['close'].to_numpy(dtype=np.float64) if 'close' in df.columns else np.zeros(len(df))
+        open_ = df['open'].to_numpy(dtype=np.float64) if 'open' in df.columns else close
+        return cls(
+            ticker,
+            _float_block(df, temporal_columns),
+            _float_block(df, tabular_columns),
+            dates,
+            close,
+            open_,
+        )
+
+
+class TickerIndex:
+    """
+    Per-ticker index over market_data, built once per data load.
+    Rows are grouped by ticker (original row order kept inside each group) into contiguous
+    blocks, so a lookup is a dict hit plus basic slicing that returns views.
+    """
+
+    def __init__(self, offsets, temporal, tabular, dates, close, open_,
+                 temporal_columns, tabular_columns):
+        self._offsets = offsets
+        self.temporal = temporal
+        self.tabular = tabular
+        self.dates = dates
+        self.close = close
+        self.open = open_
+        self.temporal_columns = list(temporal_columns)
+        self.tabular_columns = list(tabular_columns)
+
+    @classmethod
+    def from_frame(cls, df, temporal_columns=TEMPORAL_FEATURES, tabular_columns=None):
+        if tabular_columns is None:
+            tabular_columns = tabular_columns_for(df.columns)
+
+        codes, uniques = pd.factorize(df['ticker'], sort=False)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(uniques))
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        offsets = {
+            str(t): (int(bounds[i]), int(bounds[i + 1]))
+            for i, t in enumerate(uniques)
+        }
+
+        ordered = df.iloc[order]
+        if 'date' in ordered.columns:
+            dates = ordered['date'].astype(str).to_numpy(dtype=object)
+        else:
+            dates = np.full(len(ordered), "", dtype=object)
+        close = ordered['close'].to_numpy(dtype=np.float64)
+        open_ = ordered['open'].to_numpy(dtype=np.float64) if 'open' in ordered.columns else close
+
+        return cls(
+            offsets,
+            _float_block(ordered, temporal_columns),
+            _float_block(ordered, tabular_columns),
+            dates,
+            close,
+            open_,
+            temporal_columns,
+            tabular_columns,
+        )
+
+    @property
+    def tickers(self):
+        return list(self._offsets.keys())
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, ticker):
+        return ticker in self._offsets
+
+    def get(self, ticker):
+        bounds = self._offsets.get(ticker)
+        if bounds is None:
+            return None
+        start, stop = bounds
+        return TickerSlice(
+            ticker,
+            self.temporal[start:stop],
+            self.tabular[start:stop],
+            self.dates[start:stop],
+            self.close[start:stop],
+            self.open[start:stop],
+        )
+
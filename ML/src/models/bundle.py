@@ -0,0 +1,50 @@
+import json
+import os
+
+FINBERT_MODEL_NAME = 'yiyanghkust/finbert-pretrain'
+BUNDLE_MANIFEST = "bundle.json"
+
+# ML/bundles/finbert-pretrain, independent of the caller's working directory
+_ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_FINBERT_BUNDLE_DIR = os.path.join(_ML_DIR, "bundles", "finbert-pretrain")
+
+# bundle dir -> manifest signature already verified in this process (files are hashed once)
+_verified = {}
+
+
+def finbert_bundle_dir():
+    return os.getenv("FINBERT_BUNDLE_DIR", DEFAULT_FINBERT_BUNDLE_DIR)
+
+
+def verify_bundle(bundle_dir):
+    """Checks every file against the sha256 recorded in bundle.json; raises ValueError on a mismatch."""
+    from src.models.registry import sha256_file
+    manifest_path = os.path.join(bundle_dir, BUNDLE_MANIFEST)
+    if not os.path.exists(manifest_path):
+        print(f"WARNING: FinBERT bundle {bundle_dir} has no {BUNDLE_MANIFEST}; loading it unverified.")
+        return
+    stat = os.stat(manifest_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _verified.get(bundle_dir) == signature:
+        return
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    for name, digest in manifest.get("files", {}).items():
+        path = os.path.join(bundle_dir, name)
+        if not os.path.exists(path) or sha256_file(path) != digest:
+            raise ValueError(f"FinBERT bundle file {path} does not match {BUNDLE_MANIFEST}; rebuild it with bundle_finbert.py")
+    _verified[bundle_dir] = signature
+
+
+def pretrained_source(model_name=FINBERT_MODEL_NAME):
+    """
+    Where to load `model_name` from: (path_or_name, from_pretrained kwargs).
+    FinBERT comes from the pinned local bundle (written by bundle_finbert.py, hashes checked once
+    per process) without touching the network when one is present; anything else falls back to
+    the HF hub / HF cache.
+    """
+    bundle_dir = finbert_bundle_dir()
+    if model_name == FINBERT_MODEL_NAME and os.path.exists(os.path.join(bundle_dir, "config.json")):
+        verify_bundle(bundle_dir)
+        return bundle_dir, {"local_files_only": True}
+    return model_name, {}
@@ -1,6 +1,7 @@
 import torch
 import torch.nn as nn
 from transformers import AutoModel, AutoConfig
+from src.models.bundle import pretrained_source
 
 class TemporalEncoder(nn.Module):
     """Transformer-based encoder for sequence data (Price, Volume, RSI)."""
@@ -38,7 +39,9 @@ class TextEncoder(nn.Module):
     """FinBERT-based encoder for news headlines and reports."""
     def __init__(self, model_name='yiyanghkust/finbert-pretrain', latent_dim=128, freeze=True):
         super().__init__()
-        self.bert = AutoModel.from_pretrained(model_name)
+        # Local pinned bundle when available (no hub access), hub otherwise
+        source, load_kwargs = pretrained_source(model_name)
+        self.bert = AutoModel.from_pretrained(source, **load_kwargs)
         
         if freeze:
             for param in self.bert.parameters():
@@ -50,4 +53,8 @@ class TextEncoder(nn.Module):
         outputs = self.bert(input_ids=input_ids, attention_mask=attention_mask)
         # Use [CLS] token representation
         cls_emb = outputs.last_hidden_state[:, 0, :]
+        return self.project(cls_emb)
+
+    def project(self, cls_emb):
+        """z_text from a (precomputed) [CLS] embedding; the only trainable part when BERT is frozen."""
         return self.projection(cls_emb)
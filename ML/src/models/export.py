@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import time
+import warnings
+
+import torch
+import torch.nn as nn
+
+from src.models.registry import CheckpointRegistry, sha256_file
+from src.utils.loss import calculate_reliability_score
+
+EXPORT_VERSION = 1
+FORMATS = {"torchscript": "pt", "onnx": "onnx"}
+OUTPUT_NAMES = ("prediction", "reliability_score", "z_shared")
+
+# numeric: the serving path (z_text comes from the embedding cache); full: BERT included
+GRAPH_INPUTS = {
+    "numeric": ("temporal", "tabular", "z_text"),
+    "full": ("temporal", "tabular", "text_input_ids", "text_attn_mask"),
+}
+
+# ML/exports/<checkpoint id>, independent of the caller's working directory
+_ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_EXPORT_ROOT = os.path.join(_ML_DIR, "exports")
+
+
+def export_root():
+    return os.getenv("INFERENCE_EXPORT_DIR", DEFAULT_EXPORT_ROOT)
+
+
+def export_dir_for(checkpoint_path, root=None):
+    """Artifacts of one checkpoint live under its registry id (first 16 hex of the sha256)."""
+    return os.path.join(root or export_root(), sha256_file(checkpoint_path)[:16])
+
+
+class NumericGraph(nn.Module):
+    """
+    Tensor-in/tensor-out view of FinancialIntelligencePipeline.forward for tracing/export:
+    positional inputs, (prediction, reliability_score, z_shared) out. Shares the pipeline's
+    submodules; the parity check guards against it drifting from forward().
+    """
+
+    def __init__(self, pipeline):
+        super().__init__()
+        self.temporal_encoder = pipeline.temporal_encoder
+        self.tabular_encoder = pipeline.tabular_encoder
+        self.numeric_projection = pipeline.numeric_projection
+        self.predictor = pipeline.predictor
+        self.eval()
+
+    def fuse(self, temporal, tabular, z_text):
+        z_temporal = self.temporal_encoder(temporal)
+        z_tabular = self.tabular_encoder(tabular)
+        z_numeric = self.numeric_projection(torch.cat([z_temporal, z_tabular], dim=-1))
+        prediction = self.predictor(torch.cat([z_numeric, z_text], dim=-1))
+        return prediction, calculate_reliability_score(z_text, z_numeric), z_numeric
+
+    def forward(self, temporal, tabular, z_text):
+        return self.fuse(temporal, tabular, z_text)
+
+
+class FullGraph(NumericGraph):
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        self.text_encoder = pipeline.text_encoder
+        self.eval()
+
+    def forward(self, temporal, tabular, text_input_ids, text_attn_mask):
+        return self.fuse(temporal, tabular, self.text_encoder(text_input_ids, text_attn_mask))
+
+
+GRAPHS = {"numeric": NumericGraph, "full": FullGraph}
+
+
+def pipeline_outputs(prediction, reliability_score, z_shared):
+    """The dict FinancialIntelligencePipeline.forward returns, rebuilt from exported outputs."""
+    return {
+        "prediction": prediction,
+        "reliability_score": reliability_score,
+        "regime_id": 0,
+        "is_consistent": reliability_score > 0.7,
+        "z_shared": z_shared,
+    }
+
+
+def example_batch(model, graph, batch_size=2, window_size=5, seq_len=64, seed=0):
+    """Random inputs shaped like a serving batch of `graph` (a dict keyed by input name)."""
+    generator = torch.Generator().manual_seed(seed)
+    hparams = model.hparams
+    batch = {
+        "temporal": torch.randn(batch_size, window_size, hparams.temporal_dim, generator=generator),
+        "tabular": torch.randn(batch_size, hparams.tabular_dim, generator=generator),
+    }
+    if graph == "numeric":
+        batch["z_text"] = torch.randn(batch_size, hparams.latent_dim, generator=generator)
+    else:
+        vocab_size = model.text_encoder.bert.config.vocab_size
+        batch["text_input_ids"] = torch.randint(0, vocab_size, (batch_size, seq_len), generator=generator)
+        batch["text_attn_mask"] = torch.ones(batch_size, seq_len, dtype=torch.long)
+    return batch
+
+
+def artifact_name(graph, fmt):
+    return f"{graph}.{FORMATS[fmt]}"
+
+
+def export_torchscript(module, example, path):
+    with torch.no_grad():
+        traced = torch.jit.trace(module, example, check_trace=False)
+    traced = torch.jit.freeze(traced.eval())
+    traced.save(path)
+
+
+def export_onnx(module, example, input_names, path, opset_version=18):
+    """torch.export-based ONNX export with a dynamic batch dimension (needs onnx + onnxscript)."""
+    batch = torch.export.Dim("batch", min=1, max=4096)
+    with warnings.catch_warnings(), torch.no_grad():
+        warnings.simplefilter("ignore")
+        torch.onnx.export(
+            module, example, path,
+            input_names=list(input_names),
+            output_names=list(OUTPUT_NAMES),
+            dynamic_shapes=tuple({0: batch} for _ in input_names),
+            opset_version=opset_version,
+            dynamo=True,
+            verbose=False,
+            external_data=False,
+        )
+
+
+def parity_check(model, backend, graph, batch_sizes=(1, 7, 64), atol=1e-4):
+    """Max |exported - eager| per output over a few batch sizes; ok when all are within atol."""
+    worst = {name: 0.0 for name in OUTPUT_NAMES}
+    for i, batch_size in enumerate(batch_sizes):
+        batch = example_batch(model, graph, batch_size=batch_size, seed=100 + i)
+        with torch.no_grad():
+            expected = model(batch)
+            actual = backend(batch)
+        for name in OUTPUT_NAMES:
+            diff = (expected[name].float() - actual[name].float()).abs().max().item()
+            worst[name] = max(worst[name], diff)
+    return {
+        "ok": all(d <= atol for d in worst.values()),
+        "atol": atol,
+        "batch_sizes": list(batch_sizes),
+        "max_abs_diff": worst,
+    }
+
+
+def export_pipeline(model, out_dir, formats=("torchscript", "onnx"), graphs=("numeric", "full"),
+                    checkpoint_path=None, atol=1e-4):
+    """
+    Exports each graph in each format to `out_dir`, parity-checks every artifact against the
+    eager model and writes manifest.json. Artifacts failing parity are recorded (ok=false)
+    and refused by serving. Returns the manifest.
+    """
+    from src.serving.backends import load_backend
+
+    model.eval()
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint_sha256 = sha256_file(checkpoint_path) if checkpoint_path else None
+    manifest = read_export_manifest(out_dir)
+    if manifest is None or manifest.get("checkpoint_sha256") != checkpoint_sha256:
+        manifest = {"version": EXPORT_VERSION, "checkpoint_sha256": checkpoint_sha256, "artifacts": {}}
+    # Artifacts of other graphs/formats already in out_dir are kept
+    manifest.update({
+        "checkpoint": os.path.abspath(checkpoint_path) if checkpoint_path else None,
+        "torch": torch.__version__,
+        "dims": {k: model.hparams[k] for k in ("temporal_dim", "tabular_dim", "latent_dim")},
+        "updated_at": time.time(),
+    })
+    for graph in graphs:
+        module = GRAPHS[graph](model)
+        example = tuple(example_batch(model, graph).values())
+        for fmt in formats:
+            key = f"{graph}.{fmt}"
+            path = os.path.join(out_dir, artifact_name(graph, fmt))
+            start = time.perf_counter()
+            try:
+                if fmt == "torchscript":
+                    export_torchscript(module, example, path)
+                else:
+                    export_onnx(module, example, GRAPH_INPUTS[graph], path)
+                seconds = time.perf_counter() - start
+                backend = load_backend(fmt, model, out_dir, graph=graph, manifest=None)
+                parity = parity_check(model, backend, graph, atol=atol)
+                manifest["artifacts"][key] = {
+                    "file": os.path.basename(path),
+                    "bytes": os.path.getsize(path),
+                    "export_seconds": round(seconds, 3),
+                    "parity": parity,
+                    "ok": parity["ok"],
+                }
+                status = "ok" if parity["ok"] else "PARITY FAILED"
+                print(f"Exported {key} in {seconds:.1f}s: {status} (max diff {max(parity['max_abs_diff'].values()):.2e})")
+            except Exception as e:
+                manifest["artifacts"][key] = {"file": os.path.basename(path), "ok": False, "error": str(e)}
+                print(f"WARNING: Export of {key} failed: {e}")
+
+    tmp_path = os.path.join(out_dir, f"manifest.json.tmp{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, "manifest.json"))
+    return manifest
+
+
+def read_export_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == EXPORT_VERSION else None
+
+
+def load_pipeline(checkpoint_path):
+    """The pipeline built from a checkpoint's hyperparameters with its weights, in eval mode."""
+    from src.models.pipeline import FinancialIntelligencePipeline
+    checkpoint = torch.load(checkpoint_path, map_location="cpu")
+    model = FinancialIntelligencePipeline(**checkpoint["hyper_parameters"])
+    model.load_state_dict(checkpoint["state_dict"])
+    model.eval()
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the pipeline to TorchScript / ONNX with a parity check against eager PyTorch.")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Checkpoint to export (default: best registered checkpoint).")
+    parser.add_argument("--out", type=str, default=None, help="Output directory (default: INFERENCE_EXPORT_DIR/<checkpoint id>).")
+    parser.add_argument("--formats", type=str, default="torchscript,onnx", help="Comma-separated formats (torchscript, onnx).")
+    parser.add_argument("--graphs", type=str, default="numeric,full", help="Comma-separated graphs (numeric = cached z_text, full = with BERT).")
+    parser.add_argument("--atol", type=float, default=1e-4, help="Parity tolerance vs. the eager model (default: 1e-4).")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint
+    if checkpoint_path is None:
+        registry = CheckpointRegistry()
+        entry = registry.best()
+        if entry is None:
+            parser.error("no registered checkpoint; pass --checkpoint")
+        checkpoint_path = registry.resolve(entry)
+
+    model = load_pipeline(checkpoint_path)
+    out_dir = args.out or export_dir_for(checkpoint_path)
+    manifest = export_pipeline(
+        model, out_dir,
+        formats=[f.strip() for f in args.formats.split(",") if f.strip()],
+        graphs=[g.strip() for g in args.graphs.split(",") if g.strip()],
+        checkpoint_path=checkpoint_path,
+        atol=args.atol,
+    )
+    failed = [k for k, a in manifest["artifacts"].items() if not a["ok"]]
+    print(f"Exports for {checkpoint_path} in {out_dir}: {len(manifest['artifacts']) - len(failed)} ok, {len(failed)} failed")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,8 @@ class FinancialIntelligencePipeline(L.LightningModule):
                  latent_dim=128, 
                  lr=1e-4, 
                  lambda_consis=0.5,
-                 drift_threshold=10.0):
+                 drift_threshold=10.0,
+                 feature_schema=None):
         super().__init__()
         self.save_hyperparameters()
         
@@ -36,11 +37,20 @@ class FinancialIntelligencePipeline(L.LightningModule):
         self.criterion = ConsistencyLoss(lambda_consis=lambda_consis)
         self.drift_monitoring_buffer = []
 
+    def encode_text(self, batch):
+        if "z_text" in batch:
+            # Precomputed narrative embedding (serving cache): skips BERT entirely
+            return batch["z_text"]
+        if "text_cls" in batch:
+            # Precomputed frozen-BERT [CLS] (training text cache): only the projection runs
+            return self.text_encoder.project(batch["text_cls"])
+        return self.text_encoder(batch["text_input_ids"], batch["text_attn_mask"])
+
     def forward(self, batch):
         # 1. Encode modalities
         z_temporal = self.temporal_encoder(batch["temporal"])
         z_tabular = self.tabular_encoder(batch["tabular"])
-        z_text = self.text_encoder(batch["text_input_ids"], batch["text_attn_mask"])
+        z_text = self.encode_text(batch)
         
         # 2. Shared Latent Space Alignment
         z_numeric = self.numeric_projection(torch.cat([z_temporal, z_tabular], dim=-1))
@@ -67,7 +77,7 @@ class FinancialIntelligencePipeline(L.LightningModule):
     def training_step(self, batch, batch_idx):
         z_temporal = self.temporal_encoder(batch["temporal"])
         z_tabular = self.tabular_encoder(batch["tabular"])
-        z_text = self.text_encoder(batch["text_input_ids"], batch["text_attn_mask"])
+        z_text = self.encode_text(batch)
         
         z_numeric = self.numeric_projection(torch.cat([z_temporal, z_tabular], dim=-1))
         z_combined = torch.cat([z_numeric, z_text], dim=-1)
@@ -121,4 +131,5 @@ class FinancialIntelligencePipeline(L.LightningModule):
             self.drift_monitoring_buffer = []
 
     def configure_optimizers(self):
-        return torch.optim.Adam(self.parameters(), lr=self.hparams.lr)
+        # Frozen BERT weights carry no gradients; keep them out of the optimizer state
+        return torch.optim.Adam((p for p in self.parameters() if p.requires_grad), lr=self.hparams.lr)
@@ -0,0 +1,172 @@
+import argparse
+import copy
+import io
+import json
+import re
+import time
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+# FinBERT (~440 MB fp32) dominates memory and latency; the TemporalEncoder and the head follow.
+# The z_text projection stays fp32 (the text cache fingerprints its weights).
+QUANTIZED_MODULES = ("text_encoder.bert", "temporal_encoder", "predictor")
+DEFAULT_MAX_PREDICTION_DRIFT = 0.01
+DEFAULT_MAX_RELIABILITY_DRIFT = 0.05
+# torch >= 1.12 runs TransformerEncoderLayer through a fused fast path at inference time
+FAST_PATH_TORCH_VERSION = (1, 12)
+
+
+def torch_version():
+    return tuple(int(part) for part in re.findall(r"\d+", torch.__version__)[:2])
+
+
+def quantize_pipeline(model, modules=QUANTIZED_MODULES):
+    """
+    Dynamic int8 copy of a FinancialIntelligencePipeline: nn.Linear weights of `modules` are
+    stored as int8, activations are quantized on the fly. The fp32 model is left untouched.
+    """
+    from torch.ao.quantization import quantize_dynamic
+
+    quantized = copy.deepcopy(model)
+    with warnings.catch_warnings():
+        # torch.ao dynamic quantization is deprecated in favour of torchao, still the CPU path that ships with torch
+        warnings.filterwarnings("ignore", message=r"torch\.ao\.quantization is deprecated", category=DeprecationWarning)
+        warnings.filterwarnings("ignore", message=r"torch\.quantize_per_tensor.* are deprecated", category=UserWarning)
+        for name in modules:
+            parent_name, _, attr = name.rpartition(".")
+            parent = quantized.get_submodule(parent_name)
+            setattr(parent, attr, quantize_dynamic(getattr(parent, attr), {nn.Linear}, dtype=torch.qint8))
+    if "temporal_encoder" in modules and torch_version() >= FAST_PATH_TORCH_VERSION:
+        # The fused fast path reads linear weights as tensors, which quantized Linear only exposes
+        # through a method ("'function' object has no attribute 'device'"). The layer skips the
+        # fast path when this flag is False; it is an internal attribute, so recheck it on torch
+        # upgrades (a changed fast path fails the drift gate rather than silently serving).
+        for layer in quantized.temporal_encoder.transformer.layers:
+            if hasattr(layer, "activation_relu_or_gelu"):
+                layer.activation_relu_or_gelu = False
+    quantized.eval()
+    return quantized
+
+
+def serialized_size(model):
+    """Bytes of the model's state_dict as torch.save writes it (packed int8 weights included)."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def _run(model, batch, batch_size):
+    predictions, reliability = [], []
+    start = time.perf_counter()
+    with torch.no_grad():
+        for i in range(0, len(batch["temporal"]), batch_size):
+            outputs = model({k: v[i:i + batch_size] for k, v in batch.items()})
+            predictions.append(outputs["prediction"].reshape(-1).float().numpy())
+            reliability.append(outputs["reliability_score"].reshape(-1).float().numpy())
+    return np.concatenate(predictions), np.concatenate(reliability), time.perf_counter() - start
+
+
+def _drift(reference, candidate, tickers):
+    diff = np.abs(reference - candidate)
+    worst = int(np.argmax(diff)) if len(diff) else 0
+    return {
+        "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+        "mean_abs_diff": float(diff.mean()) if len(diff) else 0.0,
+        "worst_ticker": tickers[worst] if len(diff) else None,
+    }
+
+
+def compare_models(reference, candidate, batch, tickers, batch_size=64):
+    """
+    Runs the full pipeline (BERT included) of both models over one row per ticker and reports
+    the drift of `prediction` and `reliability_score` plus the time each model took.
+    """
+    ref_pred, ref_rel, ref_seconds = _run(reference, batch, batch_size)
+    cand_pred, cand_rel, cand_seconds = _run(candidate, batch, batch_size)
+    return {
+        "tickers": len(tickers),
+        "prediction": _drift(ref_pred, cand_pred, tickers),
+        "reliability_score": _drift(ref_rel, cand_rel, tickers),
+        "reference_ms": round(ref_seconds * 1000, 2),
+        "candidate_ms": round(cand_seconds * 1000, 2),
+    }
+
+
+def drift_problems(report, max_prediction_drift=DEFAULT_MAX_PREDICTION_DRIFT,
+                   max_reliability_drift=DEFAULT_MAX_RELIABILITY_DRIFT):
+    """Tolerance violations of a compare_models report (empty list = accepted)."""
+    problems = []
+    if report["tickers"] == 0:
+        problems.append("no tickers to evaluate")
+    for key, limit in (("prediction", max_prediction_drift), ("reliability_score", max_reliability_drift)):
+        drift = report[key]
+        if not np.isfinite(drift["max_abs_diff"]) or drift["max_abs_diff"] > limit:
+            problems.append(f"{key} drift {drift['max_abs_diff']:.4g} > {limit:g} (worst: {drift['worst_ticker']})")
+    return problems
+
+
+def evaluation_batch(inputs, narrative_text, tokenize):
+    """
+    Full-pipeline batch with one row per ticker of a ModelInputs: its normalized rows plus the
+    tokens of narrative_text(ticker); tokenize(texts) -> (input_ids, attention_mask).
+    """
+    tickers = list(inputs.index)
+    temporal, tabular = inputs.rows(tickers)
+    input_ids, attention_mask = tokenize([narrative_text(t) for t in tickers])
+    batch = {"temporal": temporal, "tabular": tabular, "text_input_ids": input_ids, "text_attn_mask": attention_mask}
+    return batch, tickers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare int8 dynamic quantization against fp32 on every ticker in market_data.csv.")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Checkpoint to evaluate (default: best registered checkpoint).")
+    parser.add_argument("--csv", type=str, default="market_data.csv", help="Path to market_data.csv.")
+    parser.add_argument("--json", type=str, default="narratives.json", help="Path to narratives.json.")
+    parser.add_argument("--max-prediction-drift", type=float, default=DEFAULT_MAX_PREDICTION_DRIFT, help="Max |int8 - fp32| prediction.")
+    parser.add_argument("--max-reliability-drift", type=float, default=DEFAULT_MAX_RELIABILITY_DRIFT, help="Max |int8 - fp32| reliability_score.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Evaluation batch size.")
+    args = parser.parse_args()
+
+    from src.data.features import FeatureSchema, ModelInputs
+    from src.data.feature_store import load_feature_store
+    from src.data.narrative_store import load_narrative_store
+    from src.data.snapshot import load_market_frame
+    from src.models.export import load_pipeline
+    from src.models.registry import CheckpointRegistry
+
+    checkpoint_path = args.checkpoint
+    if checkpoint_path is None:
+        registry = CheckpointRegistry()
+        entry = registry.best()
+        if entry is None:
+            parser.error("no registered checkpoint; pass --checkpoint")
+        checkpoint_path = registry.resolve(entry)
+
+    model = load_pipeline(checkpoint_path)
+    df = load_market_frame(args.csv)
+    schema = FeatureSchema.from_dict(model.hparams.get("feature_schema"))
+    if schema is None:
+        schema = FeatureSchema.for_legacy_checkpoint(df, model.hparams.tabular_dim)
+    inputs = ModelInputs.from_store(load_feature_store(args.csv, schema))
+    with open(args.json, "r") as f:
+        transcripts = {n["ticker"]: n.get("transcript", "") for n in json.load(f)}
+    token_store = load_narrative_store(args.json)
+    batch, tickers = evaluation_batch(inputs, lambda t: transcripts.get(t, ""), token_store.encode)
+
+    quantized = quantize_pipeline(model)
+    report = compare_models(model, quantized, batch, tickers, batch_size=args.batch_size)
+    report["fp32_bytes"] = serialized_size(model)
+    report["int8_bytes"] = serialized_size(quantized)
+    problems = drift_problems(report, args.max_prediction_drift, args.max_reliability_drift)
+    report["accepted"] = not problems
+    report["problems"] = problems
+    print(json.dumps(report, indent=2))
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+
+REGISTRY_VERSION = 1
+
+# ML/checkpoints/registry.json, independent of the caller's working directory
+_ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_REGISTRY_PATH = os.path.join(_ML_DIR, "checkpoints", "registry.json")
+
+
+def registry_path():
+    return os.getenv("CHECKPOINT_REGISTRY", DEFAULT_REGISTRY_PATH)
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def count_nan_tensors(state_dict):
+    """Number of tensors containing NaN/Inf (a poisoned run; see check_checkpoints.py)."""
+    import torch
+    return sum(
+        1 for v in state_dict.values()
+        if torch.is_tensor(v) and v.is_floating_point() and not torch.isfinite(v).all()
+    )
+
+
+class CheckpointRegistry:
+    """
+    JSON manifest of trained checkpoints, appended to by train.py after a successful fit.
+    Each entry records path, model dims, val loss, a NaN scan and a sha256. The best valid entry
+    (finite val loss, no NaN tensors, lowest loss, newest on ties) is stored as a pointer, so
+    serving resolves the checkpoint with one small file read instead of walking mlruns/.
+    Paths are stored relative to the registry file so the tree can be mounted elsewhere.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or registry_path()
+        self.base_dir = os.path.dirname(os.path.abspath(self.path))
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {"version": REGISTRY_VERSION, "best": None, "entries": []}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _save(self, data):
+        os.makedirs(self.base_dir, exist_ok=True)
+        tmp_path = self.path + f".tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def resolve(self, entry):
+        """Absolute path of an entry's checkpoint file."""
+        return os.path.normpath(os.path.join(self.base_dir, entry["path"]))
+
+    @staticmethod
+    def is_valid(entry):
+        val_loss = entry.get("val_loss")
+        return entry.get("nan_tensors", 1) == 0 and val_loss is not None and math.isfinite(val_loss)
+
+    @classmethod
+    def pick_best(cls, entries):
+        valid = [e for e in entries if cls.is_valid(e)]
+        if not valid:
+            return None
+        return min(valid, key=lambda e: (e["val_loss"], -e.get("created_at", 0)))
+
+    def register(self, checkpoint_path, val_loss=None, temporal_dim=None, tabular_dim=None,
+                 latent_dim=None, run_id=None):
+        """Scans a checkpoint (NaN check, hash, hparams) and records it; returns the new entry."""
+        import torch
+        checkpoint = torch.load(checkpoint_path, map_location="cpu")
+        hparams = checkpoint.get("hyper_parameters", {})
+        state_dict = checkpoint.get("state_dict", {})
+
+        entry = {
+            "id": None,
+            "path": os.path.relpath(os.path.abspath(checkpoint_path), self.base_dir),
+            "sha256": sha256_file(checkpoint_path),
+            "temporal_dim": temporal_dim if temporal_dim is not None else hparams.get("temporal_dim"),
+            "tabular_dim": tabular_dim if tabular_dim is not None else hparams.get("tabular_dim"),
+            "latent_dim": latent_dim if latent_dim is not None else hparams.get("latent_dim", 128),
+            "val_loss": float(val_loss) if val_loss is not None else None,
+            "nan_tensors": count_nan_tensors(state_dict),
+            "total_tensors": len(state_dict),
+            "run_id": run_id,
+            "created_at": time.time(),
+        }
+        entry["id"] = entry["sha256"][:16]
+
+        data = self.load()
+        data["entries"] = [e for e in data["entries"] if e["id"] != entry["id"]] + [entry]
+        best = self.pick_best(data["entries"])
+        data["best"] = best["id"] if best else None
+        self._save(data)
+        return entry
+
+    def best(self):
+        """Best valid entry whose file still exists, or None. No directory scanning."""
+        data = self.load()
+        entries = {e["id"]: e for e in data["entries"]}
+        best = entries.get(data.get("best"))
+        if best is not None and os.path.exists(self.resolve(best)):
+            return best
+        # Pointer is stale (file pruned): fall back to the best remaining entry
+        remaining = [e for e in data["entries"] if os.path.exists(self.resolve(e))]
+        return self.pick_best(remaining)
+
+    def get(self, entry_id):
+        """Entry with this id whose file still exists, or None."""
+        for entry in self.load()["entries"]:
+            if entry["id"] == entry_id and os.path.exists(self.resolve(entry)):
+                return entry
+        return None
+
+    def latest(self):
+        """Most recently registered valid entry whose file still exists, or None."""
+        valid = [e for e in self.load()["entries"] if self.is_valid(e) and os.path.exists(self.resolve(e))]
+        return max(valid, key=lambda e: e.get("created_at", 0)) if valid else None
+
+    def verify(self, entry):
+        """True if the checkpoint file still matches the recorded hash."""
+        return sha256_file(self.resolve(entry)) == entry["sha256"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Register existing checkpoints or show the checkpoint registry.")
+    parser.add_argument("checkpoints", nargs="*", help="Checkpoint files to register (omit to list the registry).")
+    parser.add_argument("--val-loss", type=float, default=None, help="Validation loss to record for the given checkpoints.")
+    parser.add_argument("--registry", type=str, default=None, help="Registry file (default: CHECKPOINT_REGISTRY or ML/checkpoints/registry.json).")
+    args = parser.parse_args()
+
+    registry = CheckpointRegistry(args.registry)
+    for path in args.checkpoints:
+        entry = registry.register(path, val_loss=args.val_loss)
+        print(f"Registered {entry['id']}: val_loss={entry['val_loss']} NaN={entry['nan_tensors']}/{entry['total_tensors']}")
+
+    data = registry.load()
+    for e in data["entries"]:
+        marker = "*" if e["id"] == data.get("best") else " "
+        print(f"{marker} {e['id']} val_loss={e['val_loss']} NaN={e['nan_tensors']}/{e['total_tensors']} "
+              f"dims=({e['temporal_dim']}, {e['tabular_dim']}) {e['path']}")
+
+
+if __name__ == "__main__":
+    main()
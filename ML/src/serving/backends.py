@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+from src.models.export import GRAPH_INPUTS, OUTPUT_NAMES, artifact_name, pipeline_outputs
+
+BACKENDS = ("eager", "torchscript", "onnx")
+
+
+class EagerBackend:
+    """The PyTorch module itself (the default)."""
+    name = "eager"
+    graph = None
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, batch):
+        return self.model(batch)
+
+    def describe(self):
+        return {"name": self.name}
+
+
+class _ExportedBackend:
+    """
+    Runs batches matching the exported graph's inputs through the artifact and returns the
+    same output dict as the eager model. Anything else (e.g. raw token batches when only the
+    numeric graph is served) falls back to eager.
+    """
+    name = None
+
+    def __init__(self, model, path, graph="numeric"):
+        self.model = model
+        self.path = path
+        self.graph = graph
+        self.input_names = GRAPH_INPUTS[graph]
+        self.fallbacks = 0
+
+    def _run(self, inputs):
+        raise NotImplementedError
+
+    def __call__(self, batch):
+        if any(name not in batch for name in self.input_names):
+            self.fallbacks += 1
+            return self.model(batch)
+        return pipeline_outputs(*self._run([batch[name] for name in self.input_names]))
+
+    def describe(self):
+        return {"name": self.name, "graph": self.graph, "path": self.path, "eager_fallbacks": self.fallbacks}
+
+
+class TorchScriptBackend(_ExportedBackend):
+    name = "torchscript"
+
+    def __init__(self, model, path, graph="numeric"):
+        import torch
+        super().__init__(model, path, graph)
+        self.module = torch.jit.load(path, map_location="cpu").eval()
+
+    def _run(self, inputs):
+        import torch
+        with torch.no_grad():
+            return self.module(*inputs)
+
+
+class OnnxBackend(_ExportedBackend):
+    name = "onnx"
+
+    def __init__(self, model, path, graph="numeric", intra_op_threads=None):
+        import torch
+        if onnxruntime is None:
+            raise RuntimeError("onnxruntime is not installed")
+        super().__init__(model, path, graph)
+        options = onnxruntime.SessionOptions()
+        # Same intra-op budget as torch, so switching backends doesn't change CPU usage
+        options.intra_op_num_threads = int(intra_op_threads or torch.get_num_threads())
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def _run(self, inputs):
+        import torch
+        feeds = {}
+        for name, tensor in zip(self.input_names, inputs):
+            array = tensor.detach().cpu().numpy()
+            feeds[name] = array if array.dtype != np.float64 else array.astype(np.float32)
+        outputs = self.session.run(list(OUTPUT_NAMES), feeds)
+        return tuple(torch.from_numpy(o) for o in outputs)
+
+
+def load_backend(name, model, export_dir=None, graph="numeric", manifest=None):
+    """
+    Backend `name` for `model` from the artifacts in `export_dir`. With a manifest, artifacts that
+    failed their parity check are refused (ValueError).
+    """
+    if name == "eager":
+        return EagerBackend(model)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r} (expected one of {', '.join(BACKENDS)})")
+    if manifest is not None:
+        artifact = manifest.get("artifacts", {}).get(f"{graph}.{name}")
+        if artifact is None or not artifact.get("ok"):
+            raise ValueError(f"{graph}.{name} export missing or failed its parity check")
+    path = os.path.join(export_dir, artifact_name(graph, name))
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if name == "torchscript":
+        return TorchScriptBackend(model, path, graph)
+    return OnnxBackend(model, path, graph)
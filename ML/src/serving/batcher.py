@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import Counter
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching for model inference.
+    Concurrent requests are queued and flushed as one stacked batch when either
+    `max_batch_size` requests are pending or the oldest one has waited `max_wait_ms`.
+    """
+
+    def __init__(self, run_batch, max_batch_size=32, max_wait_ms=5.0, executor=None):
+        # run_batch: blocking callable(dict of stacked tensors, context) -> dict of batched outputs
+        self.run_batch = run_batch
+        # Optional InferenceExecutor; defaults to asyncio's shared thread pool
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = None
+        self._worker = None
+
+        # Stats
+        self.total_requests = 0
+        self.total_batches = 0
+        self.max_observed_batch = 0
+        self.batch_size_counts = Counter()
+        self.last_batch_ms = 0.0
+
+    def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, inputs, context=None):
+        """
+        Queues one request (tensors with a leading batch dim of 1) and waits for its outputs.
+        Only requests with the same `context` (e.g. the model version) share a batch; it is
+        passed through to run_batch.
+        """
+        if self._worker is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((inputs, context, future))
+        return await future
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Requests that arrived during the wait but exceed max_batch_size stay queued
+            for context, group in self._group(batch):
+                await self._dispatch(context, group)
+
+    @staticmethod
+    def _group(batch):
+        """Splits a batch by context and input signature so only compatible tensors are stacked together."""
+        groups = {}
+        for inputs, context, future in batch:
+            if future.cancelled():
+                continue
+            signature = tuple(sorted((k, tuple(v.shape[1:])) for k, v in inputs.items()))
+            groups.setdefault((id(context), signature), (context, []))[1].append((inputs, future))
+        return list(groups.values())
+
+    async def _dispatch(self, context, group):
+        # torch is imported on first use so importing the serving stack stays cheap
+        import torch
+        size = len(group)
+        start = time.perf_counter()
+        try:
+            stacked = {
+                key: torch.cat([inputs[key] for inputs, _ in group], dim=0)
+                for key in group[0][0]
+            }
+            if self.executor is not None:
+                outputs = await self.executor.run(self.run_batch, stacked, context)
+            else:
+                outputs = await asyncio.to_thread(self.run_batch, stacked, context)
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.last_batch_ms = (time.perf_counter() - start) * 1000
+
+        self.total_requests += size
+        self.total_batches += 1
+        self.max_observed_batch = max(self.max_observed_batch, size)
+        self.batch_size_counts[size] += 1
+
+        for i, (_, future) in enumerate(group):
+            if not future.done():
+                future.set_result(self._split(outputs, i, size))
+
+    @staticmethod
+    def _split(outputs, i, size):
+        """Takes row i of every batched output; non-batched values (e.g. regime_id) are shared."""
+        import torch
+        result = {}
+        for key, value in outputs.items():
+            if isinstance(value, torch.Tensor) and value.dim() > 0 and value.shape[0] == size:
+                result[key] = value[i:i + 1]
+            else:
+                result[key] = value
+        return result
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "mean_batch_size": round(self.total_requests / self.total_batches, 2) if self.total_batches else 0.0,
+            "max_observed_batch_size": self.max_observed_batch,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_size_counts.items())},
+        }
@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the inference backlog is full; carries a Retry-After hint in seconds."""
+    def __init__(self, retry_after):
+        super().__init__(f"Inference capacity exhausted, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def configure_torch_threads(intra_op_threads=None, interop_threads=None):
+    """Applies explicit torch thread counts; must run before the first parallel torch op."""
+    import torch
+    if intra_op_threads:
+        torch.set_num_threads(int(intra_op_threads))
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(int(interop_threads))
+        except RuntimeError as e:
+            # Only settable once, before any inter-op work has started
+            print(f"WARNING: Could not set torch interop threads: {e}")
+    print(f"INFO: torch threads intra-op={torch.get_num_threads()} interop={torch.get_num_interop_threads()}")
+
+
+class InferenceExecutor:
+    """
+    Dedicated thread pool for CPU-bound inference work (forward passes, tokenization),
+    so the event loop keeps serving /tickers, /news and the broadcaster.
+    Requests are admitted against a bounded in-flight budget; beyond it callers get
+    ExecutorSaturated immediately instead of queueing with unbounded latency.
+    """
+
+    def __init__(self, workers=1, max_pending=64):
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self.in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+        self._avg_task_seconds = 0.0
+
+    @property
+    def saturated(self):
+        return self.in_flight >= self.max_pending
+
+    def retry_after(self):
+        """Rough time for the current backlog to drain, never less than one second."""
+        backlog = self.in_flight / self.workers
+        return max(1, math.ceil(self._avg_task_seconds * backlog))
+
+    def check_capacity(self):
+        if self.saturated:
+            self.rejected += 1
+            raise ExecutorSaturated(self.retry_after())
+
+    @contextmanager
+    def admission(self):
+        """Counts the enclosed request section against the in-flight budget (event-loop side only)."""
+        self.check_capacity()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs a blocking callable on the inference pool."""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            elapsed = time.perf_counter() - start
+            # Exponential moving average used for Retry-After estimates
+            self._avg_task_seconds = elapsed if self.completed == 0 else 0.8 * self._avg_task_seconds + 0.2 * elapsed
+            self.completed += 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "avg_task_ms": round(self._avg_task_seconds * 1000, 2),
+        }
@@ -0,0 +1,268 @@
+import abc
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+HISTORY_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+
+def normalize_history(hist):
+    """Standard shape for provider output: a `date` (YYYY-MM-DD str) column plus lowercase OHLCV."""
+    if hist is None or hist.empty:
+        return pd.DataFrame(columns=['date'] + HISTORY_COLUMNS)
+    hist = hist.reset_index()
+    # Standardize columns
+    hist.columns = [str(c).lower() for c in hist.columns]
+    # Rename Date to date if needed
+    if 'date' not in hist.columns and 'datetime' in hist.columns:
+        hist = hist.rename(columns={'datetime': 'date'})
+    if pd.api.types.is_datetime64_any_dtype(hist['date']):
+        hist['date'] = hist['date'].dt.strftime('%Y-%m-%d')
+    else:
+        hist['date'] = hist['date'].astype(str)
+    for col in HISTORY_COLUMNS:
+        if col not in hist.columns:
+            hist[col] = 0.0
+    return hist[['date'] + HISTORY_COLUMNS]
+
+
+class HistoryProvider(abc.ABC):
+    """Source of daily OHLCV history; fetch() is blocking and returns a normalized frame."""
+    @abc.abstractmethod
+    def fetch(self, ticker, period):
+        ...
+
+
+class YahooHistoryProvider(HistoryProvider):
+    def fetch(self, ticker, period):
+        import yfinance as yf
+        return normalize_history(yf.Ticker(ticker).history(period=period))
+
+
+class LocalHistoryProvider(HistoryProvider):
+    """Offline stand-in for Yahoo: serves in-memory frames or `<directory>/<TICKER>.csv` files."""
+    def __init__(self, frames=None, directory=None):
+        self.frames = frames or {}
+        self.directory = directory
+
+    def fetch(self, ticker, period):
+        if ticker in self.frames:
+            return normalize_history(self.frames[ticker])
+        if self.directory:
+            path = os.path.join(self.directory, f"{ticker}.csv")
+            if os.path.exists(path):
+                return normalize_history(pd.read_csv(path).set_index('date'))
+        return normalize_history(None)
+
+
+def session_expiry(now=None, intraday_ttl=900):
+    """
+    Expiry tied to the US market session: while the market is open, daily bars change,
+    so entries live `intraday_ttl` seconds (capped at the close); otherwise they stay valid
+    until the next session opens. Exchange holidays are not modelled.
+    """
+    now = now or datetime.now(MARKET_TZ)
+    is_weekday = now.weekday() < 5
+    open_at = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    close_at = now.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
+
+    if is_weekday and open_at <= now < close_at:
+        # Refresh once more right after the close to pick up the final bar
+        return min(now + timedelta(seconds=intraday_ttl), close_at + timedelta(minutes=5)).timestamp()
+
+    next_open = open_at if (is_weekday and now < open_at) else open_at + timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return next_open.timestamp()
+
+
+class HistoryCache:
+    """
+    Local cache of fallback price history keyed by (ticker, period), persisted as .npz.
+    Fresh entries are served directly; stale ones are served immediately while a single
+    background refresh runs; concurrent misses for the same key share one provider call.
+    Memory holds at most `max_entries` keys (LRU); on disk, files more than `max_stale_seconds`
+    past their expiry are deleted and only the newest `max_entries` files are kept.
+    """
+
+    def __init__(self, provider, cache_dir, intraday_ttl=900, empty_ttl=300, timeout=15.0,
+                 max_entries=512, max_stale_seconds=3 * 86400, prune_interval=3600):
+        self.provider = provider
+        self.cache_dir = cache_dir
+        self.intraday_ttl = intraday_ttl
+        # Unknown tickers are remembered briefly so they don't hit the provider on every request
+        self.empty_ttl = empty_ttl
+        self.timeout = timeout
+        self.max_entries = max(1, int(max_entries))
+        # Stale entries are still served (while refreshing) for this long, then dropped
+        self.max_stale_seconds = max_stale_seconds
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self._entries = OrderedDict()  # (ticker, period) -> (expires_at, frame), LRU order
+        self._inflight = {}  # (ticker, period) -> asyncio.Task
+
+        # Stats
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetch_errors = 0
+        self.evictions = 0
+        self.pruned_files = 0
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, ticker, period):
+        safe = re.sub(r'[^A-Za-z0-9._-]', '_', f"{ticker}_{period}")
+        return os.path.join(self.cache_dir, f"{safe}.npz")
+
+    def _load_disk(self, key):
+        path = self._path(*key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                frame = pd.DataFrame({'date': data['date'].astype(str)})
+                for col in HISTORY_COLUMNS:
+                    frame[col] = data[col]
+                return float(data['expires_at']), frame
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable history cache {path}: {e}")
+            return None
+
+    def _save_disk(self, key, expires_at, frame):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(*key)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            date=frame['date'].astype(str).to_numpy(dtype=str),
+            expires_at=np.float64(expires_at),
+            **{col: frame[col].to_numpy(dtype=np.float64) for col in HISTORY_COLUMNS}
+        )
+        os.replace(tmp_path, path)
+
+    def prune_disk(self):
+        """Deletes files long past their expiry, then the oldest ones beyond max_entries."""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        cutoff = time.time() - self.max_stale_seconds
+        kept, removed = [], 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz") or ".tmp" in name:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    expires_at = float(data['expires_at'])
+                mtime = os.path.getmtime(path)
+            except Exception:
+                expires_at, mtime = 0.0, 0.0
+            if expires_at < cutoff:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, path))
+        kept.sort()
+        for _, path in kept[:max(0, len(kept) - self.max_entries)]:
+            removed += self._remove(path)
+        self.pruned_files += removed
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def _fetch_and_store(self, key):
+        """Blocking provider call + persistence (runs in a worker thread)."""
+        ticker, period = key
+        frame = self.provider.fetch(ticker, period)
+        ttl_expiry = session_expiry(intraday_ttl=self.intraday_ttl)
+        if frame.empty:
+            ttl_expiry = min(ttl_expiry, time.time() + self.empty_ttl)
+        self._save_disk(key, ttl_expiry, frame)
+        if time.time() - self._last_prune > self.prune_interval:
+            self._last_prune = time.time()
+            self.prune_disk()
+        return ttl_expiry, frame
+
+    def _refresh(self, key):
+        """Starts (or joins) the single in-flight fetch for key."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run_fetch(key))
+            self._inflight[key] = task
+        return task
+
+    async def _run_fetch(self, key):
+        try:
+            entry = await asyncio.to_thread(self._fetch_and_store, key)
+            self._remember(key, entry)
+            return entry
+        except Exception as e:
+            self.fetch_errors += 1
+            print(f"WARNING: History fetch failed for {key[0]}: {e}", flush=True)
+            return None
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get(self, ticker, period="3mo"):
+        """Returns the normalized history frame (empty if unavailable within the timeout)."""
+        key = (ticker, period)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_disk(key)
+        if entry is not None and entry[0] < time.time() - self.max_stale_seconds:
+            # Too old to serve even while revalidating
+            entry = None
+            self._entries.pop(key, None)
+
+        if entry is not None:
+            self._remember(key, entry)
+            expires_at, frame = entry
+            if expires_at > time.time():
+                self.hits += 1
+            else:
+                # Stale-while-revalidate
+                self.stale_hits += 1
+                self._refresh(key)
+            return frame
+
+        self.misses += 1
+        try:
+            # shield: a timed-out caller leaves the fetch running so it still lands in the cache
+            entry = await asyncio.wait_for(asyncio.shield(self._refresh(key)), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            print(f"WARNING: History fetch timed out for {ticker}.", flush=True)
+            entry = None
+        return entry[1] if entry is not None else normalize_history(None)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "pruned_files": self.pruned_files,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fetch_errors": self.fetch_errors,
+        }
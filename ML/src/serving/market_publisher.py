@@ -0,0 +1,97 @@
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEFAULT_CHANNEL = "market_updates"
+
+# Fields that define whether a quote "moved"; timestamps alone never trigger a publish
+CHANGE_FIELDS = ("price", "change_percent")
+
+
+class MarketPublisher:
+    """
+    Async Redis publisher for live quotes.
+    Every changed ticker's latest quote is written to a hash (`<prefix>:<TICKER>`, indexed by
+    the `<prefix>:tickers` set) so late subscribers can read a full snapshot, and only the
+    tickers whose price or change moved are sent on the pub/sub channel. All commands for
+    one cycle go out in a single pipeline round trip.
+    Without an explicit `channel`, JSON goes to 'market_updates' and binary encodings to
+    'market_updates:<encoding>', decided after the msgpack fallback so JSON never lands on the
+    binary channel.
+    """
+
+    def __init__(self, client, channel=None, state_prefix="quote", encoding="json"):
+        self.client = client
+        self.state_prefix = state_prefix
+        if encoding == "msgpack" and msgpack is None:
+            print("WARNING: msgpack not installed, publishing market updates as JSON")
+            encoding = "json"
+        self.encoding = encoding
+        self.channel = channel or (DEFAULT_CHANNEL if encoding == "json" else f"{DEFAULT_CHANNEL}:{encoding}")
+        self._last_published = {}
+
+        # Stats
+        self.cycles = 0
+        self.published_tickers = 0
+        self.skipped_tickers = 0
+        self.bytes_published = 0
+        self.errors = 0
+
+    def encode(self, payload):
+        if self.encoding == "msgpack":
+            return msgpack.packb(payload, use_bin_type=True)
+        return json.dumps(payload)
+
+    def diff(self, updates):
+        """Returns only the quotes whose price or change differ from what was last published."""
+        changed = {}
+        for ticker, quote in updates.items():
+            last = self._last_published.get(ticker)
+            if last is None or any(last.get(f) != quote.get(f) for f in CHANGE_FIELDS):
+                changed[ticker] = quote
+        return changed
+
+    async def publish(self, updates):
+        """Writes state hashes and publishes the delta; returns the number of tickers sent."""
+        self.cycles += 1
+        changed = self.diff(updates)
+        self.skipped_tickers += len(updates) - len(changed)
+        if not changed:
+            return 0
+
+        message = self.encode(changed)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for ticker, quote in changed.items():
+                    pipe.hset(f"{self.state_prefix}:{ticker}", mapping={
+                        "price": quote["price"],
+                        "change_percent": quote["change_percent"],
+                        "timestamp": quote["timestamp"],
+                    })
+                pipe.sadd(f"{self.state_prefix}:tickers", *changed.keys())
+                pipe.publish(self.channel, message)
+                await pipe.execute()
+        except Exception:
+            # Nothing is marked as published, so the same delta is retried next cycle
+            self.errors += 1
+            raise
+
+        for ticker, quote in changed.items():
+            self._last_published[ticker] = {f: quote.get(f) for f in CHANGE_FIELDS}
+        self.published_tickers += len(changed)
+        self.bytes_published += len(message)
+        return len(changed)
+
+    def stats(self):
+        return {
+            "channel": self.channel,
+            "encoding": self.encoding,
+            "cycles": self.cycles,
+            "published_tickers": self.published_tickers,
+            "skipped_tickers": self.skipped_tickers,
+            "bytes_published": self.bytes_published,
+            "errors": self.errors,
+        }
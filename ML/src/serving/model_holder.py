@@ -0,0 +1,117 @@
+import asyncio
+import math
+import time
+
+
+class ModelVersion:
+    """
+    Everything a request needs from one loaded checkpoint, swapped as a unit: the model, its
+    tokenizer, its own z_text cache and the normalized inputs built for its feature schema.
+    Requests take one reference at the start and use it throughout, so a swap never mixes
+    inputs shaped for one model with another's weights.
+    """
+
+    def __init__(self, model, tokenizer, checkpoint_id, checkpoint_path, text_cache):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.checkpoint_id = checkpoint_id
+        self.checkpoint_path = checkpoint_path
+        self.text_cache = text_cache
+        self.tabular_dim = model.hparams.tabular_dim
+        self.latent_dim = model.hparams.latent_dim
+        self.schema = None
+        self.inputs = None
+        self.backend = None
+        # "int8" once a quantized model passed its drift gate (see src/models/quantize.py)
+        self.precision = "fp32"
+        self.quantization = None
+        self.loaded_at = time.time()
+        self.validation = None
+
+    @property
+    def ready(self):
+        return self.tokenizer is not None
+
+    @property
+    def model_key(self):
+        """Scopes caches to the served weights: same checkpoint at another precision answers differently."""
+        return self.checkpoint_id if self.precision == "fp32" else f"{self.checkpoint_id}:{self.precision}"
+
+    @property
+    def trained(self):
+        """False for the randomly initialised fallback model served before any checkpoint exists."""
+        return bool(self.checkpoint_path)
+
+    def describe(self):
+        return {
+            "checkpoint_id": self.checkpoint_id,
+            "checkpoint_path": self.checkpoint_path,
+            "tabular_dim": self.tabular_dim,
+            "inputs": self.inputs.stats() if self.inputs is not None else None,
+            "precision": self.precision,
+            "quantization": self.quantization,
+            "backend": self.backend.describe() if self.backend is not None else {"name": "eager"},
+            "loaded_at": self.loaded_at,
+            "validation": self.validation,
+        }
+
+
+def validate_outputs(outputs):
+    """Returns a list of problems with a forward pass (non-finite predictions / scores)."""
+    problems = []
+    for key in ("prediction", "reliability_score"):
+        value = outputs.get(key)
+        if value is None:
+            problems.append(f"missing {key}")
+            continue
+        values = value.detach().cpu().flatten().tolist()
+        if not all(math.isfinite(v) for v in values):
+            problems.append(f"non-finite {key}")
+    return problems
+
+
+class ModelHolder:
+    """
+    Double-buffered model slot. `current` serves traffic; a replacement is loaded, warmed
+    and validated off to the side and then swapped in with a single reference assignment.
+    The replaced version stays in `previous` for instant rollback.
+    """
+
+    def __init__(self):
+        self.current = None
+        self.previous = None
+        self.loading = False
+        # Serializes reloads; callers that must not be dropped wait on it instead of bailing out
+        self.reload_lock = asyncio.Lock()
+        self.swaps = 0
+        self.rollbacks = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def swap(self, version):
+        self.previous, self.current = self.current, version
+        self.swaps += 1
+        return self.previous
+
+    def reject(self, reason):
+        self.rejected += 1
+        self.last_error = reason
+
+    def rollback(self):
+        """Swaps the previous version back in (the rolled-back one becomes `previous`)."""
+        if self.previous is None:
+            return False
+        self.current, self.previous = self.previous, self.current
+        self.rollbacks += 1
+        return True
+
+    def stats(self):
+        return {
+            "current": self.current.describe() if self.current else None,
+            "previous": self.previous.describe() if self.previous else None,
+            "loading": self.loading,
+            "swaps": self.swaps,
+            "rollbacks": self.rollbacks,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
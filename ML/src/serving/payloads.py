@@ -0,0 +1,112 @@
+import hashlib
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+HISTORY_POINTS = 30
+
+
+def dumps(obj):
+    """Compact JSON bytes; orjson when installed (NaN/Inf become null there, as browsers require)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """Default response class: orjson encoding, and pre-serialized bytes are sent untouched."""
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+
+def make_etag(*parts):
+    return '"' + hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """RFC 7232 If-None-Match check (weak comparison, lists and `*` supported)."""
+    if not if_none_match or etag is None:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def history_points(ticker_slice, points=HISTORY_POINTS):
+    """Chart history as sent to the frontend: the last `points` closes as {date, price}."""
+    return [
+        {"date": str(d), "price": float(p)}
+        for d, p in zip(ticker_slice.dates[-points:], ticker_slice.close[-points:])
+    ]
+
+
+def with_history(result, history):
+    """Splices pre-serialized history bytes into a serialized result object as its `history` field."""
+    body = dumps(result)
+    separator = b"," if len(body) > 2 else b""
+    return body[:-1] + separator + b'"history":' + history + b"}"
+
+
+class HistoryPayloads:
+    """
+    Chart history of every indexed ticker, serialized once per data load so /predict only
+    splices ready bytes into its response. ETags derive from the data version, so they change
+    exactly when the underlying CSV does.
+    """
+
+    def __init__(self, data_version="none", points=HISTORY_POINTS):
+        self.data_version = data_version
+        self.points = points
+        self._payloads = {}
+
+    @classmethod
+    def build(cls, ticker_index, data_version, points=HISTORY_POINTS):
+        payloads = cls(data_version, points)
+        for ticker in ticker_index.tickers:
+            payloads._payloads[ticker] = dumps(history_points(ticker_index.get(ticker), points))
+        return payloads
+
+    def __contains__(self, ticker):
+        return ticker in self._payloads
+
+    def get(self, ticker):
+        return self._payloads.get(ticker)
+
+    def etag(self, ticker):
+        return make_etag("history", ticker, self.data_version, self.points)
+
+    def stats(self):
+        return {
+            "data_version": self.data_version,
+            "tickers": len(self._payloads),
+            "bytes": sum(len(p) for p in self._payloads.values()),
+        }
+
+
+class PayloadCache:
+    """Last serialized body for a key (e.g. quote + data version); rebuilt only when the key changes."""
+
+    def __init__(self):
+        self.key = None
+        self.body = None
+        self.etag = None
+        self.builds = 0
+
+    def get(self, key, build):
+        if key != self.key or self.body is None:
+            self.body = dumps(build())
+            self.etag = make_etag(*key)
+            self.key = key
+            self.builds += 1
+        return self.body, self.etag
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Two-tier cache for /predict responses.
+    Tier 1 is an in-process LRU with TTL; tier 2 is an optional Redis store shared by replicas.
+    Keys embed the data version and checkpoint id, so a reload naturally misses old entries;
+    concurrent misses for the same key are coalesced into a single computation (single-flight).
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=300, redis_client=None, prefix="prediction",
+                 remote_backoff_seconds=30.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.redis_client = redis_client
+        self.prefix = prefix
+        # After a Redis error the remote tier is skipped for a while instead of failing every request
+        self.remote_backoff_seconds = remote_backoff_seconds
+        self._remote_retry_at = 0.0
+        self.generation = 0
+        self._local = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> asyncio.Task shared by concurrent misses
+        self._writes = set()  # background Redis writes (kept referenced until done)
+
+        # Stats
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.remote_errors = 0
+
+    @staticmethod
+    def make_key(ticker, data_version, checkpoint_id):
+        return f"{ticker}:{data_version}:{checkpoint_id}"
+
+    def invalidate(self):
+        """Drops every local entry; results still being computed for the old generation are not stored."""
+        self.generation += 1
+        self._local.clear()
+
+    # ---- Local tier ----
+    def _get_local(self, key):
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _put_local(self, key, value):
+        self._local[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    # ---- Remote tier (sync redis client, run off the event loop) ----
+    def _remote_available(self):
+        return self.redis_client is not None and time.monotonic() >= self._remote_retry_at
+
+    def _remote_failed(self, action, e):
+        self.remote_errors += 1
+        self._remote_retry_at = time.monotonic() + self.remote_backoff_seconds
+        print(f"WARNING: Prediction cache Redis {action} failed ({e}); skipping Redis for {self.remote_backoff_seconds:.0f}s")
+
+    async def _get_remote(self, key):
+        if not self._remote_available():
+            return None
+        try:
+            raw = await asyncio.to_thread(self.redis_client.get, f"{self.prefix}:{key}")
+        except Exception as e:
+            self._remote_failed("read", e)
+            return None
+        return json.loads(raw) if raw else None
+
+    async def _put_remote(self, key, value):
+        if not self._remote_available():
+            return
+        try:
+            await asyncio.to_thread(
+                self.redis_client.setex, f"{self.prefix}:{key}", max(1, int(self.ttl_seconds)), json.dumps(value)
+            )
+        except Exception as e:
+            self._remote_failed("write", e)
+
+    async def get_many(self, keys):
+        """Batch lookup (local tier, then one Redis MGET); returns {key: value} for the hits only."""
+        found = {}
+        remote_keys = []
+        for key in keys:
+            value = self._get_local(key)
+            if value is not None:
+                self.local_hits += 1
+                found[key] = value
+            else:
+                remote_keys.append(key)
+
+        if remote_keys and self._remote_available():
+            try:
+                raws = await asyncio.to_thread(
+                    self.redis_client.mget, [f"{self.prefix}:{key}" for key in remote_keys]
+                )
+            except Exception as e:
+                self._remote_failed("read", e)
+                raws = [None] * len(remote_keys)
+            for key, raw in zip(remote_keys, raws):
+                if raw:
+                    value = json.loads(raw)
+                    self.remote_hits += 1
+                    self._put_local(key, value)
+                    found[key] = value
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def put(self, key, value):
+        """Stores a value computed outside get_or_compute (e.g. by a batched forward pass)."""
+        self._put_local(key, value)
+        await self._put_remote(key, value)
+
+    async def get_or_compute(self, key, compute, cacheable=lambda value: True):
+        """
+        Returns the cached value for key, or awaits compute() once for all concurrent callers.
+        The lookup runs in its own task that every caller shields, so a cancelled caller (e.g. a
+        disconnected client) never cancels the result the others are waiting for.
+        """
+        value = self._get_local(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._lookup(key, compute, cacheable))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._lookup_done(key, t))
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key, compute, cacheable):
+        generation = self.generation
+        value = await self._get_remote(key)
+        if value is not None:
+            self.remote_hits += 1
+            if generation == self.generation:
+                self._put_local(key, value)
+            return value
+        self.misses += 1
+        value = await compute()
+        if cacheable(value) and generation == self.generation:
+            self._put_local(key, value)
+            # Callers get the value now; the Redis write finishes in the background
+            write = asyncio.ensure_future(self._put_remote(key, value))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+        return value
+
+    def _lookup_done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark as retrieved so a failure nobody is left waiting for does not log a warning
+            task.exception()
+
+    def stats(self):
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "entries": len(self._local),
+            "generation": self.generation,
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "remote_errors": self.remote_errors,
+            "hit_rate": round((self.local_hits + self.remote_hits) / lookups, 4) if lookups else 0.0,
+            "redis_enabled": self.redis_client is not None,
+        }
@@ -0,0 +1,263 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Top-level children of FinancialIntelligencePipeline, shown as named ranges in the trace
+PIPELINE_MODULES = ("temporal_encoder", "tabular_encoder", "text_encoder", "numeric_projection", "predictor")
+
+ARTIFACTS = {
+    "trace": ("trace.json", "application/json"),
+    "pstats": ("pstats", "application/octet-stream"),
+    "ops": ("ops.txt", "text/plain"),
+    "python": ("python.txt", "text/plain"),
+}
+
+_CAPTURE_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+class ProfilingSession:
+    """An armed window: profile up to `requests` requests until `expires_at`."""
+
+    def __init__(self, requests, seconds, text_encoder=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.requests = requests
+        self.remaining = requests
+        self.started_at = time.time()
+        self.expires_at = self.started_at + seconds
+        self.text_encoder = text_encoder
+
+    @property
+    def active(self):
+        return self.remaining > 0 and time.time() < self.expires_at
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "requests": self.requests,
+            "remaining": self.remaining,
+            "started_at": self.started_at,
+            "expires_at": self.expires_at,
+            "text_encoder": self.text_encoder,
+            "active": self.active,
+        }
+
+
+class ProfilingController:
+    """
+    Opt-in capture of torch.profiler + cProfile for live /predict requests. A session is armed
+    for the next N requests or a time window (whichever ends first), or a single request opts in
+    with the profiling token. Limits keep it safe to leave enabled: N and the window are clamped,
+    only one request is profiled at a time, captures are spaced by `min_interval_seconds`, and only
+    the newest `max_captures` are kept on disk.
+    """
+
+    def __init__(self, out_dir, token=None, max_requests=20, max_seconds=600.0,
+                 min_interval_seconds=1.0, max_captures=20):
+        self.out_dir = out_dir
+        self.token = token
+        self.max_requests = max(1, int(max_requests))
+        self.max_seconds = float(max_seconds)
+        self.min_interval_seconds = float(min_interval_seconds)
+        self.max_captures = max(1, int(max_captures))
+        self.session = None
+        self.captures_total = 0
+        self.skipped = 0
+        self._busy = threading.Lock()
+        self._last_capture_at = 0.0
+
+    def arm(self, requests=5, seconds=60.0, text_encoder=False):
+        requests = min(max(1, int(requests)), self.max_requests)
+        seconds = min(max(1.0, float(seconds)), self.max_seconds)
+        self.session = ProfilingSession(requests, seconds, text_encoder)
+        return self.session
+
+    def disarm(self):
+        session, self.session = self.session, None
+        return session
+
+    def authorized(self, token):
+        """True if `token` matches the configured profiling token (never true when none is set)."""
+        return bool(self.token) and token is not None and hmac.compare_digest(token, self.token)
+
+    def claim(self, header_token=None):
+        """
+        Decides whether the current request is profiled. Returns a ProfileCapture or None; the slot
+        is taken immediately so concurrent requests can't overshoot. Call only for requests that
+        will actually run the capture.
+        """
+        requested = self.authorized(header_token)
+        session = self.session
+        armed = session is not None and session.active
+        if not (requested or armed):
+            return None
+        if time.monotonic() - self._last_capture_at < self.min_interval_seconds:
+            self.skipped += 1
+            return None
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        self._last_capture_at = time.monotonic()
+        if armed and not requested:
+            session.remaining -= 1
+        return ProfileCapture(self, session.id if armed and not requested else None,
+                              text_encoder=armed and session.text_encoder)
+
+    def _finish(self):
+        self.captures_total += 1
+        self._busy.release()
+        self._prune()
+
+    def path(self, capture_id, artifact):
+        if not _CAPTURE_ID.match(capture_id) or artifact not in ARTIFACTS:
+            return None
+        path = os.path.join(self.out_dir, f"{capture_id}.{ARTIFACTS[artifact][0]}")
+        return path if os.path.exists(path) else None
+
+    def captures(self):
+        """Metadata of the captures on disk, newest first."""
+        if not os.path.isdir(self.out_dir):
+            return []
+        out = []
+        for name in os.listdir(self.out_dir):
+            if not name.endswith(".meta.json"):
+                continue
+            try:
+                with open(os.path.join(self.out_dir, name), "r") as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(out, key=lambda m: m.get("created_at", 0), reverse=True)
+
+    def _prune(self):
+        for meta in self.captures()[self.max_captures:]:
+            for artifact in list(ARTIFACTS) + ["meta"]:
+                suffix = "meta.json" if artifact == "meta" else ARTIFACTS[artifact][0]
+                try:
+                    os.remove(os.path.join(self.out_dir, f"{meta['id']}.{suffix}"))
+                except OSError:
+                    pass
+
+    def stats(self):
+        return {
+            "session": self.session.describe() if self.session else None,
+            "header_enabled": bool(self.token),
+            "busy": self._busy.locked(),
+            "captures_total": self.captures_total,
+            "skipped": self.skipped,
+            "limits": {
+                "max_requests": self.max_requests,
+                "max_seconds": self.max_seconds,
+                "min_interval_seconds": self.min_interval_seconds,
+                "max_captures": self.max_captures,
+            },
+        }
+
+
+class ProfileCapture:
+    """One profiled request. `run` executes a blocking callable under both profilers and writes the artifacts."""
+
+    def __init__(self, controller, session_id, text_encoder=False):
+        self.controller = controller
+        self.session_id = session_id
+        self.text_encoder = text_encoder
+        self.id = uuid.uuid4().hex[:12]
+        self.meta = None
+
+    def run(self, model, label, fn, *args, **kwargs):
+        try:
+            return self._run(model, label, fn, *args, **kwargs)
+        finally:
+            self.controller._finish()
+
+    def _run(self, model, label, fn, *args, **kwargs):
+        import torch
+        from torch.profiler import profile, ProfilerActivity
+
+        python_profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with profile(activities=[ProfilerActivity.CPU], record_shapes=True, with_stack=False) as torch_profiler:
+            with module_ranges(model, PIPELINE_MODULES):
+                python_profiler.enable()
+                try:
+                    result = fn(*args, **kwargs)
+                finally:
+                    python_profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        out_dir = self.controller.out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, self.id)
+        torch_profiler.export_chrome_trace(f"{base}.{ARTIFACTS['trace'][0]}")
+        python_profiler.dump_stats(f"{base}.{ARTIFACTS['pstats'][0]}")
+        with open(f"{base}.{ARTIFACTS['ops'][0]}", "w") as f:
+            f.write(torch_profiler.key_averages().table(sort_by="cpu_time_total", row_limit=40))
+        buffer = io.StringIO()
+        pstats.Stats(python_profiler, stream=buffer).sort_stats("cumulative").print_stats(40)
+        with open(f"{base}.{ARTIFACTS['python'][0]}", "w") as f:
+            f.write(buffer.getvalue())
+
+        self.meta = {
+            "id": self.id,
+            "label": label,
+            "session_id": self.session_id,
+            "created_at": time.time(),
+            "seconds": round(elapsed, 6),
+            "text_encoder": self.text_encoder,
+            "torch_threads": torch.get_num_threads(),
+            "artifacts": sorted(ARTIFACTS),
+        }
+        tmp_path = f"{base}.meta.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, f"{base}.meta.json")
+        print(f"INFO: Profile {self.id} captured for {label} ({elapsed * 1000:.1f} ms).", flush=True)
+        return result
+
+
+@contextmanager
+def module_ranges(model, names):
+    """
+    Wraps the forward of each named child in a profiler range (e.g. `text_encoder`), so the
+    Chrome trace shows BERT vs. TemporalEncoder time. Only the capturing thread is labelled;
+    forwards running concurrently on other inference workers are left alone.
+    """
+    from torch.autograd.profiler import record_function
+
+    owner = threading.get_ident()
+    stack = []
+    handles = []
+
+    def make_hooks(name):
+        def pre_hook(module, args):
+            if threading.get_ident() == owner:
+                rf = record_function(name)
+                rf.__enter__()
+                stack.append(rf)
+
+        def post_hook(module, args, output):
+            if threading.get_ident() == owner and stack:
+                stack.pop().__exit__(None, None, None)
+        return pre_hook, post_hook
+
+    for name in names:
+        module = getattr(model, name, None)
+        if module is None:
+            continue
+        pre_hook, post_hook = make_hooks(name)
+        handles.append(module.register_forward_pre_hook(pre_hook))
+        handles.append(module.register_forward_hook(post_hook))
+    try:
+        yield
+    finally:
+        for handle in handles:
+            handle.remove()
+        while stack:
+            stack.pop().__exit__(None, None, None)
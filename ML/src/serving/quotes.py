@@ -0,0 +1,44 @@
+import time
+
+
+class QuoteSnapshot:
+    """
+    Latest live quotes, written by the market data broadcaster and read by /tickers.
+    Each update builds a new dict and swaps the reference, so readers never see a
+    half-applied batch and never need a lock.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.updated_at = None  # epoch seconds of the last successful update
+        self._quotes = {}
+
+    def update(self, quotes):
+        """Merges a fetched batch; tickers missing from this batch keep their previous quote."""
+        if not quotes:
+            return
+        merged = dict(self._quotes)
+        merged.update(quotes)
+        self._quotes = merged
+        self.updated_at = time.time()
+        self.version += 1
+
+    @property
+    def quotes(self):
+        return self._quotes
+
+    def get(self, ticker):
+        return self._quotes.get(ticker)
+
+    def age_seconds(self):
+        if self.updated_at is None:
+            return None
+        return round(time.time() - self.updated_at, 3)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "tickers": len(self._quotes),
+            "updated_at": self.updated_at,
+            "age_seconds": self.age_seconds(),
+        }
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+
+
+class ReadinessTracker:
+    """
+    Per-stage startup progress for /ready.
+    A stage is "ready" once it has succeeded at least once; later re-runs (reload after
+    retraining) update the timings but never take a live capability away again.
+    """
+
+    def __init__(self, stages, capabilities):
+        self.started_at = time.time()
+        self.capabilities = capabilities  # capability -> stages it needs
+        self._stages = {
+            name: {"status": "pending", "seconds": None, "ready_at": None, "error": None}
+            for name in stages
+        }
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as one run of `name`; exceptions mark it failed and propagate."""
+        entry = self._stages[name]
+        entry["status"] = "running"
+        entry["error"] = None
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            raise
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+        entry["status"] = "ok"
+        if entry["ready_at"] is None:
+            entry["ready_at"] = round(time.time() - self.started_at, 3)
+
+    def is_ready(self, names=None):
+        """True once every stage in `names` (default: all stages) has succeeded."""
+        names = self._stages if names is None else names
+        return all(self._stages[name]["ready_at"] is not None for name in names)
+
+    def capability_ready(self, capability):
+        return self.is_ready(self.capabilities[capability])
+
+    def report(self):
+        return {
+            "ready": self.is_ready(),
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "capabilities": {cap: self.capability_ready(cap) for cap in self.capabilities},
+            "stages": {name: dict(entry) for name, entry in self._stages.items()},
+        }
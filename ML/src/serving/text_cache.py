@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+
+from src.data.narrative_store import text_hash
+
+
+def model_fingerprint(model, checkpoint_id):
+    """Identifies the text path of a model: checkpoint id + the projection weights that produce z_text."""
+    h = hashlib.sha256(str(checkpoint_id).encode("utf-8"))
+    for name, tensor in sorted(model.text_encoder.projection.state_dict().items()):
+        h.update(name.encode("utf-8"))
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class TextEmbeddingCache:
+    """
+    Serving cache of z_text (projected FinBERT [CLS] embeddings) per narrative.
+    Entries are keyed by the transcript's content hash and scoped to a model fingerprint,
+    so a new checkpoint or changed projection weights start from a fresh (or previously
+    persisted) file instead of reusing stale embeddings.
+    """
+
+    def __init__(self, cache_dir, max_length=64, batch_size=16, token_store=None):
+        self.cache_dir = cache_dir
+        self.max_length = max_length
+        self.batch_size = batch_size
+        # NarrativeTokenStore: known transcripts skip the tokenizer entirely
+        self.token_store = token_store
+        self.fingerprint = None
+        self._embeddings = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def path(self):
+        return os.path.join(self.cache_dir, f"text_embeddings_{self.fingerprint}.pt")
+
+    def bind(self, model, checkpoint_id):
+        """Scopes the cache to a model; loads the persisted entries for it if present."""
+        # torch is imported on first use so importing the serving stack stays cheap
+        import torch
+        fingerprint = model_fingerprint(model, checkpoint_id)
+        with self._lock:
+            if fingerprint == self.fingerprint:
+                return
+            self.fingerprint = fingerprint
+            self._embeddings = {}
+            if os.path.exists(self.path):
+                try:
+                    payload = torch.load(self.path, map_location="cpu")
+                    if payload.get("fingerprint") == fingerprint:
+                        self._embeddings = payload["embeddings"]
+                except Exception as e:
+                    print(f"WARNING: Ignoring unreadable text embedding cache {self.path}: {e}")
+        print(f"INFO: Text embedding cache bound to {fingerprint} ({len(self._embeddings)} entries on disk)")
+
+    def __len__(self):
+        return len(self._embeddings)
+
+    def get(self, text):
+        z = self._embeddings.get(text_hash(text))
+        if z is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return z
+
+    def compute(self, model, tokenizer, texts):
+        """Encodes every text not yet cached through model.text_encoder and persists the result."""
+        with self._lock:
+            fingerprint = self.fingerprint
+            pending = {}
+            for text in texts:
+                key = text_hash(text)
+                if key not in self._embeddings:
+                    pending[key] = text
+        if not pending:
+            return 0
+
+        import torch
+        keys = list(pending.keys())
+        with torch.no_grad():
+            for i in range(0, len(keys), self.batch_size):
+                chunk = keys[i:i + self.batch_size]
+                input_ids, attention_mask = self.tokenize(tokenizer, [pending[k] for k in chunk])
+                z_text = model.text_encoder(input_ids, attention_mask)
+                with self._lock:
+                    if self.fingerprint != fingerprint:
+                        # Rebound to another model mid-way; these embeddings belong to the old one
+                        return 0
+                    for j, key in enumerate(chunk):
+                        self._embeddings[key] = z_text[j:j + 1].clone()
+
+        self.save()
+        return len(keys)
+
+    def tokenize(self, tokenizer, texts):
+        """(input_ids, attention_mask) for texts: token store rows when available, else the tokenizer."""
+        if self.token_store is not None:
+            return self.token_store.encode(texts, tokenizer)
+        encoding = tokenizer(
+            texts,
+            add_special_tokens=True,
+            max_length=self.max_length,
+            padding='max_length',
+            truncation=True,
+            return_attention_mask=True,
+            return_tensors='pt'
+        )
+        return encoding['input_ids'], encoding['attention_mask']
+
+    def encode(self, model, tokenizer, text):
+        """Lazy path for a single narrative that was not warmed at load time."""
+        self.compute(model, tokenizer, [text])
+        return self._embeddings[text_hash(text)]
+
+    def save(self):
+        if self.fingerprint is None:
+            return
+        import torch
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            torch.save({"fingerprint": self.fingerprint, "embeddings": dict(self._embeddings)}, tmp_path)
+            os.replace(tmp_path, self.path)
+
+    def stats(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "entries": len(self._embeddings),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
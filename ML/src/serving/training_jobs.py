@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from collections import deque
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+
+class TrainingBusy(Exception):
+    """Raised when a run is already active here or another replica holds the training lock."""
+
+
+class LocalTrainingLock:
+    """In-process stand-in for RedisTrainingLock (single replica, tests)."""
+
+    _held = {}  # key -> token, shared by every instance in the process
+
+    def __init__(self, key="training:lock", ttl_seconds=120):
+        self.key = key
+        self.ttl_seconds = ttl_seconds
+        self.token = None
+
+    def acquire(self):
+        token, expires_at = self._held.get(self.key, (None, 0))
+        if token is not None and expires_at > time.time():
+            return False
+        self.token = uuid.uuid4().hex
+        self._held[self.key] = (self.token, time.time() + self.ttl_seconds)
+        return True
+
+    def extend(self):
+        token, _ = self._held.get(self.key, (None, 0))
+        if token != self.token:
+            return False
+        self._held[self.key] = (self.token, time.time() + self.ttl_seconds)
+        return True
+
+    def release(self):
+        token, _ = self._held.get(self.key, (None, 0))
+        if token == self.token:
+            self._held.pop(self.key, None)
+        self.token = None
+
+
+class RedisTrainingLock:
+    """
+    Cluster-wide training lock: SET NX with a TTL, renewed while the run is alive, so a
+    crashed replica's lock expires on its own. Built on redis-py's Lock (token-checked
+    extend/release), so one replica can never release another's lock.
+    """
+
+    def __init__(self, client, key="training:lock", ttl_seconds=120):
+        self.key = key
+        self.ttl_seconds = ttl_seconds
+        self._lock = client.lock(key, timeout=ttl_seconds, thread_local=False)
+
+    def acquire(self):
+        return self._lock.acquire(blocking=False)
+
+    def extend(self):
+        try:
+            return self._lock.extend(self.ttl_seconds, replace_ttl=True)
+        except Exception:
+            return False
+
+    def release(self):
+        try:
+            self._lock.release()
+        except Exception:
+            # Already expired or taken over; nothing to release
+            pass
+
+
+class TrainingJob:
+    def __init__(self, job_id, reason, progress_path, max_events=2000):
+        self.id = job_id
+        self.reason = reason
+        self.progress_path = progress_path
+        self.state = "starting"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.return_code = None
+        self.error = None
+        self.process = None
+        self.events = deque(maxlen=max_events)
+        self.events_total = 0
+        self.progress = None  # latest event
+        self.checkpoint = None  # "registered" event of the checkpoint this run produced
+        self.result = None  # post-training hook outcome (e.g. whether the model was swapped in)
+        self._progress_offset = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self):
+        return self.state in TERMINAL_STATES
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "state": self.state,
+            "reason": self.reason,
+            "pid": self.process.pid if self.process else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "return_code": self.return_code,
+            "error": self.error,
+            "progress": self.progress,
+            "events": self.events_total,
+            "checkpoint": self.checkpoint,
+            "result": self.result,
+        }
+
+    def read_progress(self):
+        """Picks up new JSONL lines written by the training run's ProgressFileCallback."""
+        if not os.path.exists(self.progress_path):
+            return
+        with open(self.progress_path, "r") as f:
+            f.seek(self._progress_offset)
+            chunk = f.read()
+        # Only consume complete lines; a partial last line is re-read next poll
+        complete = chunk[:chunk.rfind("\n") + 1]
+        self._progress_offset += len(complete.encode("utf-8"))
+        for line in complete.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            self.events.append(event)
+            self.events_total += 1
+            self.progress = event
+            if event.get("event") == "registered":
+                self.checkpoint = event
+        if complete:
+            self.notify()
+
+    def notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class TrainingJobManager:
+    """
+    Runs train.py as managed jobs: one at a time per cluster (lock), at lowered priority on a
+    restricted CPU set with capped thread counts, with progress parsed from the run's JSONL
+    stream and cancellation via SIGTERM (SIGKILL after a grace period).
+    """
+
+    def __init__(self, lock_factory, command=None, cwd=None, progress_dir="cache/training",
+                 nice=10, cpus=None, threads=None, num_workers=None, poll_seconds=1.0,
+                 cancel_grace_seconds=10.0, history=20, on_success=None):
+        self.lock_factory = lock_factory
+        self.command = command or [sys.executable, "train.py"]
+        self.cwd = cwd
+        self.progress_dir = progress_dir
+        self.nice = nice
+        self.cpus = cpus
+        self.threads = threads
+        self.num_workers = num_workers
+        self.poll_seconds = poll_seconds
+        self.cancel_grace_seconds = cancel_grace_seconds
+        self.on_success = on_success
+        self.jobs = {}
+        self._order = deque(maxlen=history)
+        self.active = None
+        self.finishing = False  # post-training hook running
+        self._lock = None
+        self._watcher = None
+
+    @property
+    def running(self):
+        return self.active is not None and not self.active.done
+
+    @property
+    def busy(self):
+        """Running, or done but its post-training hook has not finished yet."""
+        return self.running or self.finishing
+
+    def _env(self):
+        env = dict(os.environ)
+        if self.threads:
+            for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "TORCH_NUM_THREADS"):
+                env[var] = str(self.threads)
+        if self.num_workers is not None:
+            env["TRAINING_NUM_WORKERS"] = str(self.num_workers)
+        return env
+
+    def _limit_resources(self, pid):
+        """Applied right after spawn; DataLoader workers forked later inherit both settings."""
+        try:
+            if self.nice:
+                os.setpriority(os.PRIO_PROCESS, pid, self.nice)
+            if self.cpus and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(pid, self.cpus)
+        except OSError as e:
+            print(f"WARNING: Could not apply training resource limits: {e}")
+
+    async def start(self, reason="manual"):
+        if self.running:
+            raise TrainingBusy(f"Training job {self.active.id} is already {self.active.state}")
+
+        lock = self.lock_factory()
+        try:
+            acquired = await asyncio.to_thread(lock.acquire)
+        except Exception as e:
+            # Fail open like the other Redis-backed features: train, but only locally guarded
+            print(f"WARNING: Training lock unavailable ({e}), using a local lock.")
+            lock = LocalTrainingLock(lock.key, lock.ttl_seconds)
+            acquired = lock.acquire()
+        if not acquired:
+            raise TrainingBusy("Another replica is training")
+
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(self.progress_dir, exist_ok=True)
+        job = TrainingJob(job_id, reason, os.path.join(self.progress_dir, f"{job_id}.jsonl"))
+        env = self._env()
+        env["TRAINING_PROGRESS_FILE"] = os.path.abspath(job.progress_path)
+        try:
+            job.process = subprocess.Popen(self.command, cwd=self.cwd, env=env)
+        except Exception as e:
+            await asyncio.to_thread(lock.release)
+            raise RuntimeError(f"Could not start training: {e}") from e
+        self._limit_resources(job.process.pid)
+
+        job.state = "running"
+        job.started_at = time.time()
+        self._lock = lock
+        self.active = job
+        self.jobs[job_id] = job
+        if len(self._order) == self._order.maxlen:
+            self.jobs.pop(self._order[0], None)
+        self._order.append(job_id)
+        self._watcher = asyncio.create_task(self._watch(job))
+        print(f"INFO: Training job {job_id} started (pid {job.process.pid}, reason: {reason}).", flush=True)
+        return job
+
+    async def _watch(self, job):
+        last_extend = time.monotonic()
+        try:
+            while True:
+                job.read_progress()
+                ret_code = job.process.poll()
+                if ret_code is not None:
+                    break
+                if time.monotonic() - last_extend > self._lock.ttl_seconds / 3:
+                    if not await asyncio.to_thread(self._lock.extend):
+                        print("WARNING: Lost the training lock; another replica may start training.")
+                    last_extend = time.monotonic()
+                await asyncio.sleep(self.poll_seconds)
+
+            job.read_progress()
+            job.return_code = ret_code
+            if job.state != "cancelling":
+                job.state = "succeeded" if ret_code == 0 else "failed"
+            else:
+                job.state = "cancelled"
+            job.finished_at = time.time()
+            print(f"INFO: Training job {job.id} {job.state} (code {ret_code}).", flush=True)
+            self.finishing = job.state == "succeeded" and self.on_success is not None
+        finally:
+            await asyncio.to_thread(self._lock.release)
+            job.notify()
+
+        if self.finishing:
+            try:
+                job.result = await self.on_success(job)
+            except Exception as e:
+                job.result = {"error": f"post-training hook failed: {e}"}
+                print(f"ERROR: Post-training hook failed: {e}")
+            finally:
+                self.finishing = False
+            job.notify()
+
+    async def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.done or job.state == "cancelling":
+            return job
+        job.state = "cancelling"
+        job.process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(job.process.wait), self.cancel_grace_seconds)
+        except asyncio.TimeoutError:
+            job.process.kill()
+        return job
+
+    async def stream_events(self, job_id, follow=True):
+        """Yields progress events (replaying the buffered ones first) until the job ends."""
+        job = self.jobs[job_id]
+        sent = 0
+        while True:
+            # events is a bounded deque; skip whatever fell off the front
+            dropped = job.events_total - len(job.events)
+            for event in list(job.events)[max(0, sent - dropped):]:
+                yield event
+            sent = job.events_total
+            if job.done or not follow:
+                yield {"event": "status", **job.describe()}
+                return
+            await job.wait_for_change(timeout=self.poll_seconds * 5)
+
+    async def shutdown(self):
+        if self.running:
+            await self.cancel(self.active.id)
+        if self._watcher is not None:
+            await self._watcher
+
+    def status(self):
+        return {
+            "active": self.active.describe() if self.running else None,
+            "jobs": [self.jobs[j].describe() for j in reversed(self._order) if j in self.jobs],
+        }
@@ -0,0 +1,69 @@
+import json
+import math
+import os
+import time
+
+import pytorch_lightning as L
+
+
+def append_event(path, event, **fields):
+    """Appends one event line to a progress file outside the Lightning run (e.g. after fit)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps({"event": event, "time": time.time(), **fields}) + "\n")
+
+
+class ProgressFileCallback(L.Callback):
+    """
+    Appends training progress to a JSONL file (one event per line, flushed immediately)
+    so the serving process can stream it without touching the Lightning run.
+    Events: start, step (every `every_n_steps`), epoch_end, validation, end.
+    """
+
+    def __init__(self, path, every_n_steps=10):
+        super().__init__()
+        self.path = path
+        self.every_n_steps = max(1, int(every_n_steps))
+        self._file = None
+
+    def _emit(self, event, trainer, **fields):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "a", buffering=1)
+        record = {
+            "event": event,
+            "time": time.time(),
+            "epoch": trainer.current_epoch,
+            "step": trainer.global_step,
+            "max_epochs": trainer.max_epochs,
+            **fields,
+        }
+        self._file.write(json.dumps(record) + "\n")
+
+    @staticmethod
+    def _metric(trainer, name):
+        value = trainer.callback_metrics.get(name)
+        return float(value) if value is not None else None
+
+    def on_train_start(self, trainer, pl_module):
+        # Unsized (streaming) loaders report inf, which json.dumps would write as invalid `Infinity`
+        total = trainer.num_training_batches
+        self._emit("start", trainer, total_batches=int(total) if math.isfinite(total) else None)
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx):
+        if (batch_idx + 1) % self.every_n_steps == 0:
+            loss = outputs["loss"] if isinstance(outputs, dict) else outputs
+            self._emit("step", trainer, batch=batch_idx + 1,
+                       loss=float(loss) if loss is not None else None)
+
+    def on_train_epoch_end(self, trainer, pl_module):
+        self._emit("epoch_end", trainer, loss=self._metric(trainer, "train/total_loss"))
+
+    def on_validation_epoch_end(self, trainer, pl_module):
+        if not trainer.sanity_checking:
+            self._emit("validation", trainer, val_loss=self._metric(trainer, "val/loss"))
+
+    def on_train_end(self, trainer, pl_module):
+        self._emit("end", trainer, val_loss=self._metric(trainer, "val/loss"))
+        self._file.close()
+        self._file = None
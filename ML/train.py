@@ -2,9 +2,10 @@ import torch
 import pytorch_lightning as L
 from pytorch_lightning.loggers import MLFlowLogger
 import os
-import pandas as pd
 from src.models.pipeline import FinancialIntelligencePipeline
 from src.data.datamodule import FinancialDataModule
+from src.models.registry import CheckpointRegistry
+from src.utils.progress import ProgressFileCallback, append_event
 
 def train():
     # 1. Paths to synthetic data - support running from both project root and ML directory
@@ -18,31 +19,46 @@ def train():
         return
 
     # 2. Setup DataModule
-    dm = FinancialDataModule(csv_path, json_path, window_size=5, batch_size=128, num_workers=4, persistent_workers=True)
+    # Worker count is capped by the serving-side job manager so training leaves CPUs for inference
+    num_workers = int(os.getenv("TRAINING_NUM_WORKERS", "4"))
+    # Frozen FinBERT runs once per transcript (cached [CLS]) instead of on every batch; 0 = full BERT per step
+    text_cache = os.getenv("TRAINING_TEXT_CACHE", "1") == "1"
+    # Out-of-core mode: stream ticker-partitioned shards instead of loading the whole CSV
+    streaming = os.getenv("TRAINING_STREAMING", "0") == "1"
+    dm = FinancialDataModule(csv_path, json_path, window_size=5, batch_size=128, num_workers=num_workers,
+                             persistent_workers=num_workers > 0, text_cache=text_cache, streaming=streaming)
     
-    # 3. Determine dimensions from data
-    df = pd.read_csv(csv_path)
-    temporal_features = ['close', 'high', 'low', 'volume', 'rsi', 'macd', 'atr', 'ema_20']
-    exclude = temporal_features + ['ticker', 'date', 'return_5d_forward', 'return_20d_forward', 'volatility_5d', 'trend_label', 'bb_middle']
-    tabular_features = [col for col in df.columns if col not in exclude]
-    
-    temporal_dim = len(temporal_features)
-    tabular_dim = len(tabular_features)
+    # 3. Determine dimensions from data: the feature schema (names + training normalization
+    #    stats) is saved in the checkpoint so serving builds its inputs by name
+    dm.setup()
+    schema = dm.feature_schema
+    temporal_dim = schema.temporal_dim
+    tabular_dim = schema.tabular_dim
     print(f"Training with dimensions: temporal={temporal_dim}, tabular={tabular_dim}")
+    if dm.feature_store is not None:
+        print(f"Feature store {dm.feature_store.version} ({dm.feature_store.rows} rows), shared with serving")
 
     # 4. Setup Model
     model = FinancialIntelligencePipeline(
         temporal_dim=temporal_dim,
         tabular_dim=tabular_dim,
         latent_dim=128,
-        lr=1e-4
+        lr=1e-4,
+        feature_schema=schema.to_dict()
     )
     
     # 5. Setup Logger
     mlf_logger = MLFlowLogger(experiment_name="Heisenbug_Enhanced_Pipeline_Aggressive")
     
+    # Progress stream (epoch/step/loss) for the serving job manager
+    callbacks = []
+    progress_file = os.getenv("TRAINING_PROGRESS_FILE")
+    if progress_file:
+        callbacks.append(ProgressFileCallback(progress_file))
+
     # 6. Trainer with extreme optimizations
     trainer = L.Trainer(
+        callbacks=callbacks,
         max_epochs=1, 
         logger=mlf_logger,
         accelerator="auto",
@@ -58,5 +74,24 @@ def train():
     # 7. Execute
     trainer.fit(model, datamodule=dm)
 
+    # 8. Register the checkpoint (dims, val loss, NaN scan, hash) so serving can pick the
+    #    best valid one from checkpoints/registry.json instead of walking mlruns/
+    checkpoint_path = trainer.checkpoint_callback.best_model_path if trainer.checkpoint_callback else ""
+    if checkpoint_path:
+        val_loss = trainer.callback_metrics.get("val/loss")
+        entry = CheckpointRegistry().register(
+            checkpoint_path,
+            val_loss=float(val_loss) if val_loss is not None else None,
+            temporal_dim=temporal_dim,
+            tabular_dim=tabular_dim,
+            latent_dim=128,
+            run_id=mlf_logger.run_id
+        )
+        print(f"Registered checkpoint {entry['id']} (val_loss={entry['val_loss']}, NaN tensors={entry['nan_tensors']})")
+        # Tells the job manager which checkpoint this run produced, so exactly that one is swapped in
+        if progress_file:
+            append_event(progress_file, "registered", checkpoint_id=entry["id"], checkpoint=checkpoint_path,
+                         val_loss=entry["val_loss"])
+
 if __name__ == "__main__":
     train()
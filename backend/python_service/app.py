@@ -6,13 +6,15 @@ ml_path = os.path.join(project_root, 'ML')
 if ml_path not in sys.path:
     sys.path.append(ml_path)
 
-import json
-import pandas as pd
 import torch
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from src.models.pipeline import FinancialIntelligencePipeline
 from src.data.datamodule import MarketDataset
+from src.data.snapshot import load_market_frame
+from src.data.narrative_store import load_narrative_store
+from src.data.features import FeatureSchema
+from src.data.feature_store import load_feature_store
 
 app = FastAPI()
 
@@ -36,16 +38,20 @@ if not os.path.isfile(CHECKPOINT_PATH):
     raise FileNotFoundError(f"Checkpoint not found: {CHECKPOINT_PATH}")
 model = FinancialIntelligencePipeline.load_from_checkpoint(CHECKPOINT_PATH)
 model.eval()
+# Feature names + training normalization stats saved with the checkpoint (None for older ones)
+FEATURE_SCHEMA = FeatureSchema.from_dict(model.hparams.get("feature_schema"))
+if FEATURE_SCHEMA is None:
+    FEATURE_SCHEMA = FeatureSchema.for_legacy_checkpoint(load_market_frame(CSV_PATH), model.hparams.tabular_dim, WINDOW_SIZE)
 
 # Helper functions (same as inference.py)
 def prepare_sample(ticker: str):
-    df = pd.read_csv(CSV_PATH)
-    with open(JSON_PATH, "r") as f:
-        narratives = json.load(f)
-    ticker_df = df[df["ticker"] == ticker]
-    if ticker_df.empty:
+    # Normalized inputs from the versioned feature store (materialized once per data + schema)
+    store = load_feature_store(CSV_PATH, FEATURE_SCHEMA, window_size=WINDOW_SIZE)
+    if ticker not in store:
         raise ValueError(f"Ticker '{ticker}' not found in market data.")
-    dataset = MarketDataset(ticker_df.reset_index(drop=True), narratives, window_size=WINDOW_SIZE)
+    # Pre-tokenized narratives, shared across requests (rebuilt only when JSON_PATH changes)
+    token_store = load_narrative_store(JSON_PATH)
+    dataset = MarketDataset.from_store(store, [ticker], token_store=token_store)
     sample = dataset[len(dataset) - 1]
     # Add batch dimensions expected by the model
     sample["temporal"] = sample["temporal"].unsqueeze(0)
@@ -12,6 +12,18 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 CSV_PATH = os.path.join(DATA_DIR, "market_data.csv")
 JSON_PATH = os.path.join(DATA_DIR, "narratives.json")
 
+# Parsed market data, reused across tool calls until the CSV changes on disk
+_market_frame_cache = {"signature": None, "df": None}
+
+def _load_market_frame():
+    stat = os.stat(CSV_PATH)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    if _market_frame_cache["signature"] != signature:
+        _market_frame_cache["df"] = pd.read_csv(CSV_PATH)
+        _market_frame_cache["signature"] = signature
+    # The agent executes generated code against its frame, so never hand out the cached one
+    return _market_frame_cache["df"].copy()
+
 # Initialize LLM for the Pandas Agent
 # Note: GROQ_API_KEY should be in environment variables
 llm = ChatGroq(
@@ -26,7 +38,7 @@ def financial_comparator_tool(query: str) -> str:
     or querying the dataset using market_data.csv.
     Can handle queries like 'Compare AAPL and AMD' or 'What companies are in the data?'.
     """
-    df = pd.read_csv(CSV_PATH)
+    df = _load_market_frame()
     
     agent = create_pandas_dataframe_agent(
         llm,